@@ -2,33 +2,77 @@
 Flask web application for the AI Project Refiner
 Modern HTML/CSS interface replacing Streamlit
 """
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, g
+from flask_compress import Compress
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
+import orjson
 import logging
 from datetime import datetime
 from multi_agent_orchestrator import ProjectRefinerAPI
+from response_cache import ResponseCache, SingleFlight
+from config import Config
+
+# Configure logging (stdout by default so gunicorn/Vercel capture it; set LOG_FILE to also write a file)
+log_handlers = [logging.StreamHandler()]
+if os.getenv('LOG_FILE'):
+    log_handlers.append(logging.FileHandler(os.getenv('LOG_FILE')))
 
-# Configure comprehensive logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('project_refiner.log'),
-        logging.StreamHandler()
-    ]
+    handlers=log_handlers,
+    force=True  # The agent modules configure logging on import; the app's settings win
 )
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+app.config.update(
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIN_SIZE=Config.COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL=Config.COMPRESS_LEVEL,
+    COMPRESS_BR_LEVEL=Config.COMPRESS_LEVEL,
+    COMPRESS_STREAMS=False,  # Compressing would buffer the NDJSON stream
+    MAX_CONTENT_LENGTH=Config.MAX_REQUEST_BYTES
+)
+Compress(app)
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _json(obj, status=200):
+    """Serialize a response payload with orjson instead of flask.jsonify"""
+    return _json_bytes(orjson.dumps(obj, option=_ORJSON_OPTIONS), status)
+
+def _json_bytes(body, status=200):
+    """Wrap an already serialized JSON body in a response"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+# Serialized roadmap responses keyed by description hash
+response_cache = ResponseCache(maxsize=Config.RESPONSE_CACHE_SIZE, enabled=Config.CACHE_ENABLED)
+inflight_requests = SingleFlight(timeout=Config.SINGLE_FLIGHT_TIMEOUT)
+
+@app.before_request
+def _stamp_request():
+    """Compute the request timestamp once per request"""
+    g.now_iso = datetime.now().isoformat(timespec='seconds')
+
 # Initialize the Project Refiner API
 try:
     project_api = ProjectRefinerAPI()
     logger.info("Project Refiner API initialized successfully")
 except Exception as e:
-    logger.error(f"Failed to initialize Project Refiner API: {str(e)}")
+    logger.error("Failed to initialize Project Refiner API: %s", e)
     project_api = None
 
+# Health status only changes at startup, so serialize the body once.
+# Probes that need a timestamp can read the server's Date header.
+_HEALTH_BODY = orjson.dumps({
+    'status': 'healthy',
+    'api_status': Config.api_key_status(),
+    'project_api_available': project_api is not None
+})
+
 @app.route('/')
 def index():
     """Serve the main HTML interface"""
@@ -48,91 +92,147 @@ def refine_project():
         # Check if API is available
         if project_api is None:
             logger.error("Project Refiner API is not available")
-            return jsonify({
+            return _json({
                 'error': 'Project Refiner API not available. Please check your API keys in .env file.'
-            }), 500
+            }, 500)
 
         # Get request data
-        data = request.get_json()
-        logger.debug(f"Request data: {data}")
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            return _json({'error': 'Invalid JSON in request body'}, 400)
+        logger.debug("Request keys: %s", list(data) if isinstance(data, dict) else None)
         
-        if not data or 'project_description' not in data:
+        if not isinstance(data, dict) or 'project_description' not in data:
             logger.error("Missing project_description in request")
-            return jsonify({
+            return _json({
                 'error': 'Missing project_description in request'
-            }), 400
+            }, 400)
 
         project_description = data['project_description'].strip()
         if not project_description:
             logger.error("Project description is empty")
-            return jsonify({
+            return _json({
                 'error': 'Project description cannot be empty'
-            }), 400
+            }, 400)
 
         detailed = data.get('detailed', False)
         
-        logger.info(f"Processing project refinement request (detailed: {detailed})")
-        logger.debug(f"Project description: {project_description[:100]}...")
+        logger.info("Processing project refinement request (detailed: %s)", detailed)
+        logger.debug("Project description: %.100s...", project_description)
         
-        # Process the project
-        if detailed:
-            logger.debug("Processing detailed project refinement")
-            result = project_api.refine_project_detailed(project_description)
-            logger.info("Detailed project refinement completed successfully")
-            return jsonify(result)
-        else:
-            logger.debug("Processing standard project refinement")
-            roadmap = project_api.refine_project(project_description)
-            logger.info("Standard project refinement completed successfully")
-            return jsonify({
-                'roadmap': roadmap,
-                'metadata': {
-                    'processing_type': 'standard',
-                    'timestamp': datetime.now().isoformat()
-                }
-            })
+        cache_key = ResponseCache.make_key(project_description, detailed)
+        cached_body = response_cache.get(cache_key)
+        if cached_body is not None:
+            logger.info("Serving cached project refinement")
+            return _json_bytes(cached_body)
 
+        # Duplicate in-flight requests wait for the first one instead of re-running the agents
+        body = inflight_requests.do(
+            cache_key, lambda: _process_refinement(project_description, detailed, cache_key)
+        )
+        return _json_bytes(body)
+
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        logger.error(f"Error processing project refinement: {str(e)}", exc_info=True)
-        return jsonify({
+        logger.error("Error processing project refinement: %s", e, exc_info=True)
+        return _json({
             'error': f'Failed to process project: {str(e)}'
-        }), 500
+        }, 500)
+
+def _process_refinement(project_description, detailed, cache_key):
+    """Run the refinement and return the serialized response body"""
+    if detailed:
+        logger.debug("Processing detailed project refinement")
+        result = project_api.refine_project_detailed(project_description)
+        # A run with failed agent sections is served once, not replayed from the cache
+        cacheable = not result.get('metadata', {}).get('degraded')
+        logger.info("Detailed project refinement completed successfully")
+    else:
+        logger.debug("Processing standard project refinement")
+        try:
+            detailed_result = project_api.refine_project_detailed(project_description)
+        except Exception as e:
+            # Same failure text as refine_project, which reports errors inside the roadmap
+            roadmap, cacheable = f"Error processing project: {str(e)}", False
+        else:
+            roadmap = detailed_result['roadmap']
+            cacheable = not detailed_result.get('metadata', {}).get('degraded')
+        logger.info("Standard project refinement completed successfully")
+        result = {
+            'roadmap': roadmap,
+            'metadata': {
+                'processing_type': 'standard',
+                'timestamp': g.now_iso
+            }
+        }
+
+    body = orjson.dumps(result, option=_ORJSON_OPTIONS)
+    if cacheable:
+        response_cache.put(cache_key, body)
+    return body
+
+@app.route('/api/refine-project/stream', methods=['POST'])
+def refine_project_stream():
+    """Stream a detailed refinement as NDJSON, one top-level section per line"""
+    if project_api is None:
+        logger.error("Project Refiner API is not available")
+        return _json({
+            'error': 'Project Refiner API not available. Please check your API keys in .env file.'
+        }, 500)
+
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return _json({'error': 'Invalid JSON in request body'}, 400)
+    if not isinstance(data, dict) or not str(data.get('project_description', '')).strip():
+        return _json({
+            'error': 'Missing project_description in request'
+        }, 400)
+
+    project_description = data['project_description'].strip()
+    logger.info("Streaming detailed project refinement")
+    return Response(_ndjson_sections(project_description), mimetype='application/x-ndjson')
+
+def _ndjson_sections(project_description):
+    """Yield each section of the detailed result as an NDJSON line"""
+    # Send a first line right away so clients and proxies see the stream is alive
+    yield orjson.dumps({'key': 'status', 'value': 'processing'}) + b'\n'
+    try:
+        for key, value in project_api.refine_project_stream(project_description):
+            yield orjson.dumps({'key': key, 'value': value}, option=_ORJSON_OPTIONS) + b'\n'
+    except Exception as e:
+        logger.error("Error streaming project refinement: %s", e, exc_info=True)
+        yield orjson.dumps({'key': 'error', 'value': f'Failed to process project: {str(e)}'}) + b'\n'
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    try:
-        # Check if API keys are configured
-        from config import Config
-        Config.validate_config()
-        api_status = "configured"
-    except Exception as e:
-        api_status = f"error: {str(e)}"
-    
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'api_status': api_status,
-        'project_api_available': project_api is not None
-    })
+    return _json_bytes(_HEALTH_BODY)
 
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return _json({'error': 'Endpoint not found'}, 404)
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Handle oversized request bodies"""
+    return _json({'error': 'Request body too large'}, 413)
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
-    logger.error(f"Internal server error: {str(error)}")
-    return jsonify({'error': 'Internal server error'}), 500
+    logger.error("Internal server error: %s", error)
+    return _json({'error': 'Internal server error'}, 500)
 
 if __name__ == '__main__':
     # Check if running in development mode
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     port = int(os.getenv('FLASK_PORT', 5000))
     
-    logger.info(f"Starting Flask application on port {port} (debug: {debug_mode})")
+    logger.info("Starting Flask application on port %s (debug: %s)", port, debug_mode)
     
     # Print startup information
     print("🤖 AI Project Refiner - Web Interface")
@@ -141,6 +241,7 @@ if __name__ == '__main__':
     print("📁 Static files: /static/")
     print("📄 Templates: /templates/")
     print("🔧 API endpoint: /api/refine-project")
+    print("📡 Streaming endpoint: /api/refine-project/stream")
     print("❤️  Health check: /api/health")
     print("=" * 50)
     
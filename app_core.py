@@ -0,0 +1,203 @@
+"""
+Vercel-compatible Flask application for AI Project Refiner
+Routes and shared state live here so api/index.py stays a thin entry point
+"""
+import os
+import logging
+import orjson
+from datetime import datetime
+from functools import lru_cache
+from flask import Flask, Response, render_template, request, g
+from flask_compress import Compress
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import Config
+from response_cache import ResponseCache, SingleFlight
+
+# Configure logging for Vercel
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+app = Flask(__name__,
+            template_folder=os.path.join(_ROOT, 'templates'),
+            static_folder=os.path.join(_ROOT, 'static'))
+
+app.config.update(
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIN_SIZE=Config.COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL=Config.COMPRESS_LEVEL,
+    COMPRESS_BR_LEVEL=Config.COMPRESS_LEVEL,
+    COMPRESS_STREAMS=False,  # Compressing would buffer the NDJSON stream
+    MAX_CONTENT_LENGTH=Config.MAX_REQUEST_BYTES
+)
+Compress(app)
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _json(obj, status=200):
+    """Serialize a response payload with orjson instead of flask.jsonify"""
+    return _json_bytes(orjson.dumps(obj, option=_ORJSON_OPTIONS), status)
+
+def _json_bytes(body, status=200):
+    """Wrap an already serialized JSON body in a response"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+# Serialized roadmap responses keyed by description hash
+response_cache = ResponseCache(maxsize=Config.RESPONSE_CACHE_SIZE, enabled=Config.CACHE_ENABLED)
+inflight_requests = SingleFlight(timeout=Config.SINGLE_FLIGHT_TIMEOUT)
+
+@app.before_request
+def _stamp_request():
+    """Compute the request timestamp once per request"""
+    g.now_iso = datetime.now().isoformat(timespec='seconds')
+
+@lru_cache(maxsize=1)
+def _get_api():
+    """Import and build the Project Refiner API on first use rather than at import"""
+    # The orchestrator pulls in the OpenAI and Gemini SDKs, so keep it off the cold-start path
+    try:
+        from multi_agent_orchestrator import ProjectRefinerAPI
+    except ImportError as e:
+        logger.error("Failed to import ProjectRefinerAPI: %s", e)
+
+        # Check if required files exist to help debug the deployment bundle
+        files = os.listdir(_ROOT)
+        for file in ['multi_agent_orchestrator.py', 'config.py', 'llm_agents.py']:
+            if file not in files:
+                logger.error("✗ Missing %s", file)
+        return None
+
+    try:
+        logger.info("Attempting to initialize ProjectRefinerAPI...")
+        project_api = ProjectRefinerAPI()
+        logger.info("Project Refiner API initialized successfully")
+        return project_api
+    except Exception as e:
+        logger.error("Failed to initialize Project Refiner API: %s", e, exc_info=True)
+        return None
+
+# Health bodies are serialized once per possible API state; the Date header carries the time
+_HEALTH_BODIES = {
+    api_status: orjson.dumps({'status': 'healthy', 'api_status': api_status})
+    for api_status in ('not_initialized', 'initialized', 'failed')
+}
+
+def _api_status():
+    """Report API state without triggering initialization"""
+    if _get_api.cache_info().currsize == 0:
+        return 'not_initialized'
+    return 'initialized' if _get_api() else 'failed'
+
+@app.route('/')
+def index():
+    """Render the main interface"""
+    return render_template('index.html')
+
+@app.route('/api/health')
+def health_check():
+    """Health check endpoint"""
+    return _json_bytes(_HEALTH_BODIES[_api_status()])
+
+@app.route('/api/refine-project', methods=['POST'])
+def refine_project():
+    """Process project refinement request"""
+    try:
+        project_api = _get_api()
+        if not project_api:
+            return _json({'error': 'Project Refiner API not initialized'}, 500)
+
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            return _json({'error': 'Invalid JSON in request body'}, 400)
+        if not isinstance(data, dict) or 'project_description' not in data:
+            return _json({'error': 'Missing project_description in request'}, 400)
+
+        project_description = data['project_description']
+        detailed = data.get('detailed', False)
+
+        logger.info("Processing project refinement request (detailed: %s)", detailed)
+
+        cache_key = ResponseCache.make_key(project_description, detailed)
+        cached_body = response_cache.get(cache_key)
+        if cached_body is not None:
+            logger.info("Serving cached project refinement")
+            return _json_bytes(cached_body)
+
+        # Duplicate in-flight requests wait for the first one instead of re-running the agents
+        body = inflight_requests.do(
+            cache_key, lambda: _process_refinement(project_api, project_description, detailed, cache_key)
+        )
+
+        logger.info("Project refinement completed successfully")
+        return _json_bytes(body)
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error("Error processing project refinement: %s", e)
+        return _json({'error': f'Processing failed: {str(e)}'}, 500)
+
+def _process_refinement(project_api, project_description, detailed, cache_key):
+    """Run the refinement and return the serialized response body"""
+    if detailed:
+        result = project_api.refine_project_detailed(project_description)
+        # A run with failed agent sections is served once, not replayed from the cache
+        cacheable = not result.get('metadata', {}).get('degraded')
+    else:
+        try:
+            detailed_result = project_api.refine_project_detailed(project_description)
+        except Exception as e:
+            # Same failure text as refine_project, which reports errors inside the roadmap
+            roadmap, cacheable = f"Error processing project: {str(e)}", False
+        else:
+            roadmap = detailed_result['roadmap']
+            cacheable = not detailed_result.get('metadata', {}).get('degraded')
+        result = {
+            'roadmap': roadmap,
+            'metadata': {
+                'processing_type': 'standard',
+                'timestamp': g.now_iso
+            }
+        }
+
+    body = orjson.dumps(result, option=_ORJSON_OPTIONS)
+    if cacheable:
+        response_cache.put(cache_key, body)
+    return body
+
+@app.route('/api/refine-project/stream', methods=['POST'])
+def refine_project_stream():
+    """Stream a detailed refinement as NDJSON, one top-level section per line"""
+    project_api = _get_api()
+    if not project_api:
+        return _json({'error': 'Project Refiner API not initialized'}, 500)
+
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return _json({'error': 'Invalid JSON in request body'}, 400)
+    if not isinstance(data, dict) or 'project_description' not in data:
+        return _json({'error': 'Missing project_description in request'}, 400)
+
+    project_description = data['project_description']
+    logger.info("Streaming detailed project refinement")
+    return Response(_ndjson_sections(project_api, project_description), mimetype='application/x-ndjson')
+
+def _ndjson_sections(project_api, project_description):
+    """Yield each section of the detailed result as an NDJSON line"""
+    # Send a first line right away so clients and proxies see the stream is alive
+    yield orjson.dumps({'key': 'status', 'value': 'processing'}) + b'\n'
+    try:
+        for key, value in project_api.refine_project_stream(project_description):
+            yield orjson.dumps({'key': key, 'value': value}, option=_ORJSON_OPTIONS) + b'\n'
+    except Exception as e:
+        logger.error("Error streaming project refinement: %s", e, exc_info=True)
+        yield orjson.dumps({'key': 'error', 'value': f'Processing failed: {str(e)}'}) + b'\n'
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Handle oversized request bodies"""
+    return _json({'error': 'Request body too large'}, 413)
@@ -0,0 +1,178 @@
+"""
+Batch API helpers for non-interactive runs
+Submits many prompts as one job at the providers' discounted batch rate and waits for
+the results; use these only where nobody is waiting on the response
+"""
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+import requests
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+OPENAI_API_BASE = "https://api.openai.com/v1"
+
+# Gemini reports batch state as BATCH_STATE_* over REST and JOB_STATE_* in the SDKs
+_GEMINI_DONE_STATES = {'SUCCEEDED', 'FAILED', 'CANCELLED', 'EXPIRED'}
+_OPENAI_DONE_STATES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+def _gemini_state(operation: Dict) -> str:
+    """Normalize the batch state reported on a Gemini batch operation"""
+    state = operation.get('metadata', {}).get('state', '')
+    return state.rsplit('_STATE_', 1)[-1]
+
+
+def _gemini_text(response: Dict) -> Optional[str]:
+    """Join the text parts of the first candidate in a GenerateContentResponse"""
+    candidates = response.get('candidates') or []
+    if not candidates:
+        return None
+    parts = candidates[0].get('content', {}).get('parts', [])
+    return "".join(part.get('text', '') for part in parts) or None
+
+
+def run_gemini_batch(model_name: str, prompts: List[str], temperature: float,
+                     max_output_tokens: int = 4000) -> List[Optional[str]]:
+    """
+    Run prompts through the Gemini Batch API and wait for completion
+
+    Args:
+        model_name: Gemini model to run the batch on
+        prompts: Prompt texts, one request each
+        temperature: Sampling temperature applied to every request
+        max_output_tokens: Output cap applied to every request
+
+    Returns:
+        Response texts in the same order as prompts (None where a request failed)
+    """
+    session = requests.Session()
+    session.headers.update({'x-goog-api-key': Config.GEMINI_API_KEY})
+
+    batch_requests = [
+        {
+            'request': {
+                'contents': [{'parts': [{'text': prompt}]}],
+                'generationConfig': {
+                    'temperature': temperature,
+                    'maxOutputTokens': max_output_tokens
+                }
+            },
+            'metadata': {'key': f"req_{i}"}
+        }
+        for i, prompt in enumerate(prompts)
+    ]
+
+    response = session.post(
+        f"{GEMINI_API_BASE}/models/{model_name}:batchGenerateContent",
+        json={'batch': {
+            'display_name': f"roadmap-refiner-{int(time.time())}",
+            'input_config': {'requests': {'requests': batch_requests}}
+        }},
+        timeout=60
+    )
+    response.raise_for_status()
+    operation = response.json()
+    name = operation['name']
+    logger.info("Submitted Gemini batch %s with %d requests", name, len(prompts))
+
+    deadline = time.monotonic() + Config.BATCH_TIMEOUT
+    while not operation.get('done') and _gemini_state(operation) not in _GEMINI_DONE_STATES:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Gemini batch {name} did not finish within {Config.BATCH_TIMEOUT}s")
+        time.sleep(Config.BATCH_POLL_INTERVAL)
+        response = session.get(f"{GEMINI_API_BASE}/{name}", timeout=60)
+        response.raise_for_status()
+        operation = response.json()
+
+    state = _gemini_state(operation)
+    if state != 'SUCCEEDED' and 'response' not in operation:
+        raise RuntimeError(f"Gemini batch {name} ended in state {state}: {operation.get('error')}")
+
+    # Results may come back in any order, map them back through the request keys
+    results: List[Optional[str]] = [None] * len(prompts)
+    inlined = operation.get('response', {}).get('inlinedResponses', {}).get('inlinedResponses', [])
+    for position, item in enumerate(inlined):
+        key = item.get('metadata', {}).get('key', f"req_{position}")
+        index = int(key.rsplit('_', 1)[-1])
+        if 'response' in item:
+            results[index] = _gemini_text(item['response'])
+        else:
+            logger.warning("Gemini batch request %s failed: %s", key, item.get('error'))
+
+    return results
+
+
+def run_openai_batch(bodies: List[Dict]) -> List[Optional[str]]:
+    """
+    Run chat completion requests through the OpenAI Batch API and wait for completion
+
+    Args:
+        bodies: Chat completion request bodies (model, messages, ...), one request each
+        
+    Returns:
+        Response texts in the same order as bodies (None where a request failed)
+    """
+    # The pinned openai SDK predates the Batch API, so talk to it over REST
+    session = requests.Session()
+    session.headers.update({'Authorization': f"Bearer {Config.OPENAI_API_KEY}"})
+
+    lines = [
+        json.dumps({'custom_id': f"req_{i}", 'method': 'POST', 'url': '/v1/chat/completions', 'body': body})
+        for i, body in enumerate(bodies)
+    ]
+    response = session.post(
+        f"{OPENAI_API_BASE}/files",
+        data={'purpose': 'batch'},
+        files={'file': ('batch.jsonl', "\n".join(lines).encode(), 'application/jsonl')},
+        timeout=60
+    )
+    response.raise_for_status()
+    input_file_id = response.json()['id']
+
+    response = session.post(
+        f"{OPENAI_API_BASE}/batches",
+        json={
+            'input_file_id': input_file_id,
+            'endpoint': '/v1/chat/completions',
+            'completion_window': '24h'
+        },
+        timeout=60
+    )
+    response.raise_for_status()
+    batch = response.json()
+    batch_id = batch['id']
+    logger.info("Submitted OpenAI batch %s with %d requests", batch_id, len(bodies))
+
+    deadline = time.monotonic() + Config.BATCH_TIMEOUT
+    while batch['status'] not in _OPENAI_DONE_STATES:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"OpenAI batch {batch_id} did not finish within {Config.BATCH_TIMEOUT}s")
+        time.sleep(Config.BATCH_POLL_INTERVAL)
+        response = session.get(f"{OPENAI_API_BASE}/batches/{batch_id}", timeout=60)
+        response.raise_for_status()
+        batch = response.json()
+
+    if batch['status'] != 'completed' or not batch.get('output_file_id'):
+        raise RuntimeError(f"OpenAI batch {batch_id} ended in state {batch['status']}: {batch.get('errors')}")
+
+    response = session.get(f"{OPENAI_API_BASE}/files/{batch['output_file_id']}/content", timeout=300)
+    response.raise_for_status()
+
+    # Output lines are not ordered, map them back through the custom ids
+    results: List[Optional[str]] = [None] * len(bodies)
+    for line in response.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        index = int(item['custom_id'].rsplit('_', 1)[-1])
+        result = item.get('response') or {}
+        if result.get('status_code') == 200:
+            results[index] = result['body']['choices'][0]['message']['content']
+        else:
+            logger.warning("OpenAI batch request %s failed: %s", item['custom_id'], item.get('error'))
+
+    return results
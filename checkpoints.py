@@ -0,0 +1,88 @@
+"""
+Stage checkpoints for long pipeline runs
+Appends each completed workflow stage to a JSONL file so a run that fails midway
+resumes from the last finished stage instead of paying for every LLM call again
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CheckpointStore:
+    """Thread-safe, append-only JSONL record of (input hash, stage) -> stage output"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._done: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        # Set when an interrupted run left the file without a final newline
+        self._torn = False
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        """Read back the stages recorded by earlier runs, skipping a torn last line"""
+        line = ""
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._done[(record['hash'], record['stage'])] = record['content']
+                except (ValueError, KeyError):
+                    continue
+        self._torn = bool(line) and not line.endswith("\n")
+        logger.info("Loaded %d checkpointed stages from %s", len(self._done), self.path)
+
+    def scope(self, pipeline_input: str) -> "CheckpointScope":
+        """Checkpoints for one pipeline run, keyed by a hash of its input"""
+        return CheckpointScope(self, hashlib.sha256(pipeline_input.encode()).hexdigest())
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        return self._done.get(key)
+
+    def put(self, key: Tuple[str, str], content: str):
+        """Record a finished stage; a no-op when checkpointing is disabled"""
+        if not self.path:
+            return
+        line = json.dumps({'hash': key[0], 'stage': key[1], 'content': content, 'ts': time.time()})
+        with self._lock:
+            self._done[key] = content
+            with open(self.path, 'a', encoding='utf-8') as f:
+                # Start on a fresh line, or the record would be glued to the torn one and lost
+                f.write(("\n" if self._torn else "") + line + "\n")
+            self._torn = False
+
+
+class CheckpointScope:
+    """Stage lookups and records for a single pipeline input"""
+
+    def __init__(self, store: CheckpointStore, input_hash: str):
+        self.store = store
+        self.input_hash = input_hash
+
+    def get(self, stage: str) -> Optional[str]:
+        return self.store.get((self.input_hash, stage))
+
+    def put(self, stage: str, content: str):
+        self.store.put((self.input_hash, stage), content)
+
+    def run(self, stage: str, fn: Callable[[], str]) -> str:
+        """Return the checkpointed output of stage, or run fn and record its result"""
+        content = self.get(stage)
+        if content is not None:
+            logger.info("Resuming from checkpoint: %s", stage)
+            return content
+        content = fn()
+        self.put(stage, content)
+        return content
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Checkpoint store for Config.CHECKPOINT_PATH (disabled when unset)"""
+    return CheckpointStore(Config.CHECKPOINT_PATH)
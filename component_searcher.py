@@ -2,16 +2,89 @@
 Component Search and Pricing Module
 Searches for electronic components across multiple suppliers and provides cost-efficient recommendations
 """
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
-from typing import Dict, List, Optional
 import re
+import requests
+import orjson
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from llm_cache import get_prompt_cache
+from response_cache import ResponseCache
+
+# Sentinel for price lookups on results missing a price
+_INF = float('inf')
+
+# Supplier reliability tiers used when scoring recommendations
+_TIER = {'Adafruit': 3, 'SparkFun': 3, 'Amazon': 2}
+
+# Component keywords recognised in project descriptions -> searchable part names
+_COMPONENT_KEYWORDS = {
+    'esp32': 'ESP32',
+    'esp8266': 'ESP8266',
+    'arduino': 'Arduino Uno',
+    'raspberry pi': 'Raspberry Pi',
+    'ds18b20': 'DS18B20 Temperature Sensor',
+    'dht22': 'DHT22 Temperature Humidity Sensor',
+    'dht11': 'DHT11 Temperature Humidity Sensor',
+    'temperature sensor': 'Temperature Sensor',
+    'humidity sensor': 'Humidity Sensor',
+    'ph sensor': 'pH Sensor',
+    'soil moisture sensor': 'Soil Moisture Sensor',
+    'water level sensor': 'Water Level Sensor',
+    'pir sensor': 'PIR Motion Sensor',
+    'motion sensor': 'PIR Motion Sensor',
+    'ultrasonic sensor': 'Ultrasonic Distance Sensor',
+    'gas sensor': 'Gas Sensor',
+    'water pump': 'Water Pump',
+    'relay': 'Relay Module',
+    'servo': 'Servo Motor',
+    'stepper motor': 'Stepper Motor',
+    'oled': 'OLED Display',
+    'lcd': 'LCD Display',
+    'camera': 'Camera Module',
+    'gps': 'GPS Module',
+    'lora': 'LoRa Module',
+    'led strip': 'LED Strip',
+    'solar panel': 'Solar Panel',
+    'battery': 'Battery Pack',
+    'sd card': 'SD Card Module'
+}
+
+# One alternation scanned in a single pass; longest keywords first so phrases win over prefixes
+_COMPONENT_RE = re.compile(
+    r'\b(' + '|'.join(map(re.escape, sorted(_COMPONENT_KEYWORDS, key=len, reverse=True))) + r')s?\b',
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=256)
+def _match_components(text: str) -> Tuple[str, ...]:
+    """Part names mentioned in text, in order of first mention"""
+    return tuple(dict.fromkeys(_COMPONENT_KEYWORDS[match.lower()] for match in _COMPONENT_RE.findall(text)))
+
+def _build_session() -> requests.Session:
+    """Create the keep-alive HTTP session shared by every searcher"""
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    })
+    # Keep-alive pool sized for the concurrent fan-out
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 class ComponentSearcher:
     """Search for electronic components and pricing across multiple suppliers"""
     
+    # Shared by all instances so supplier fan-out doesn't spawn threads per search
+    _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='component-search')
+    # One connection pool per process, so new searchers reuse warm connections
+    _session = _build_session()
+    # Supplier results per component, so repeats across projects skip the suppliers
+    _results_cache = ResponseCache(maxsize=512)
+    
     def __init__(self):
         self.suppliers = {
             'adafruit': 'https://www.adafruit.com',
@@ -19,34 +92,99 @@ class ComponentSearcher:
             'amazon': 'https://www.amazon.com',
             'aliexpress': 'https://www.aliexpress.com'
         }
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session = self._session
+        
+        # Supplier key -> search method, resolved once instead of per call
+        self._dispatch = {
+            'adafruit': self._search_adafruit,
+            'sparkfun': self._search_sparkfun,
+            'amazon': self._search_amazon,
+            'aliexpress': self._search_aliexpress
+        }
+    
+    def extract_components(self, text: str) -> List[str]:
+        """Find the hardware components mentioned in a project description"""
+        return list(_match_components(text))
+    
+    def search_components(self, components: List[str]) -> str:
+        """Search each component and summarize the pricing for a prompt ("" unless COMPONENT_PRICING_ENABLED)"""
+        if not Config.COMPONENT_PRICING_ENABLED:
+            return ""
+        lines = []
+        # Every (component, supplier) pair is searched concurrently in one batch
+        prefetched = self._submit_all(components)
+        for component in dict.fromkeys(components):
+            result = self._build_search_result(component, "", prefetched[component])
+            best = result['best_price']
+            recommended = result['recommended']
+            if best:
+                lines.append(
+                    f"- {component}: best price ${best['price']:.2f} ({best['supplier']}), "
+                    f"recommended {recommended['supplier']} at ${recommended['price']:.2f}"
+                )
+        return "\n".join(lines)
     
     def search_component(self, component_name: str, component_type: str = "") -> Dict:
         """Search for a specific component across suppliers"""
+        supplier_results = self._submit_all([component_name])[component_name]
+        return self._build_search_result(component_name, component_type, supplier_results)
+    
+    def _submit_all(self, components: List[str]) -> Dict[str, List[Dict]]:
+        """Search every (component, supplier) pair concurrently on the shared pool"""
+        results = {}
+        # Also kept on disk for COMPONENT_CACHE_TTL in the shared prompt cache, so results survive
+        # restarts and are shared across workers without a second connection to the file
+        disk_cache = get_prompt_cache()
+        for component in dict.fromkeys(components):
+            cached = self._results_cache.get(component)
+            if cached is None:
+                stored = disk_cache.get(f"component:{component}", ttl=Config.COMPONENT_CACHE_TTL)
+                if stored is not None:
+                    cached = orjson.loads(stored)
+                    self._results_cache.put(component, cached)
+            if cached is not None:
+                # Copies, since scoring annotates the result dicts
+                results[component] = [dict(item) for item in cached]
+        
+        futures = [
+            (component, supplier_name, self._executor.submit(self._search_supplier, supplier_name, component))
+            for component in dict.fromkeys(components) if component not in results
+            for supplier_name in self.suppliers
+        ]
+        
+        # Collect in submission order so supplier ordering stays deterministic
+        failed = set()
+        for component, supplier_name, future in futures:
+            component_results = results.setdefault(component, [])
+            try:
+                supplier_results = future.result()
+                if supplier_results:
+                    component_results.extend(supplier_results)
+            except Exception as e:
+                failed.add(component)
+                print(f"Error searching {supplier_name}: {str(e)}")
+        
+        # Only freshly searched components need storing
+        for component in dict.fromkeys(component for component, _, _ in futures):
+            if component not in failed:
+                component_results = results[component]
+                self._results_cache.put(component, [dict(item) for item in component_results])
+                disk_cache.set(f"component:{component}", orjson.dumps(component_results).decode())
+        return results
+    
+    def _build_search_result(self, component_name: str, component_type: str, supplier_results: List[Dict]) -> Dict:
+        """Analyze fetched supplier results and find the best options"""
         results = {
             'component_name': component_name,
             'component_type': component_type,
-            'suppliers': [],
+            'suppliers': supplier_results,
             'best_price': None,
             'recommended': None,
             'alternatives': []
         }
         
-        # Search each supplier
-        for supplier_name, base_url in self.suppliers.items():
-            try:
-                supplier_results = self._search_supplier(supplier_name, component_name)
-                if supplier_results:
-                    results['suppliers'].extend(supplier_results)
-            except Exception as e:
-                print(f"Error searching {supplier_name}: {str(e)}")
-        
-        # Analyze results and find best options
         if results['suppliers']:
-            results['best_price'] = min(results['suppliers'], key=lambda x: x.get('price', float('inf')))
+            results['best_price'] = min(results['suppliers'], key=lambda x: x.get('price', _INF))
             results['recommended'] = self._get_recommended_component(results['suppliers'])
             results['alternatives'] = self._get_alternatives(results['suppliers'])
         
@@ -54,15 +192,8 @@ class ComponentSearcher:
     
     def _search_supplier(self, supplier: str, component: str) -> List[Dict]:
         """Search a specific supplier for components"""
-        if supplier == 'adafruit':
-            return self._search_adafruit(component)
-        elif supplier == 'sparkfun':
-            return self._search_sparkfun(component)
-        elif supplier == 'amazon':
-            return self._search_amazon(component)
-        elif supplier == 'aliexpress':
-            return self._search_aliexpress(component)
-        return []
+        search = self._dispatch.get(supplier)
+        return search(component) if search else []
     
     def _search_adafruit(self, component: str) -> List[Dict]:
         """Search Adafruit for components"""
@@ -156,37 +287,24 @@ class ComponentSearcher:
     
     def _get_recommended_component(self, suppliers: List[Dict]) -> Dict:
         """Get the recommended component based on price, quality, and availability"""
-        # Score components based on multiple factors
+        # Score components on price, supplier reliability and availability in one pass
+        best = None
+        best_score = -1
         for component in suppliers:
-            score = 0
-            
-            # Price factor (lower is better)
-            if component.get('price', 0) < 10:
-                score += 3
-            elif component.get('price', 0) < 20:
-                score += 2
-            else:
-                score += 1
-            
-            # Supplier reliability
-            if component.get('supplier') in ['Adafruit', 'SparkFun']:
-                score += 3
-            elif component.get('supplier') == 'Amazon':
-                score += 2
-            else:
-                score += 1
-            
-            # Availability
-            if component.get('in_stock'):
-                score += 2
-            
+            price = component.get('price', 0)
+            score = (3 if price < 10 else 2 if price < 20 else 1) \
+                + _TIER.get(component.get('supplier'), 1) \
+                + (2 if component.get('in_stock') else 0)
             component['recommendation_score'] = score
+            
+            if score > best_score:
+                best, best_score = component, score
         
-        return max(suppliers, key=lambda x: x.get('recommendation_score', 0))
+        return best
     
     def _get_alternatives(self, suppliers: List[Dict]) -> List[Dict]:
         """Get alternative components sorted by value"""
-        sorted_suppliers = sorted(suppliers, key=lambda x: x.get('price', float('inf')))
+        sorted_suppliers = sorted(suppliers, key=lambda x: x.get('price', _INF))
         return sorted_suppliers[:3]  # Return top 3 alternatives
     
     def get_cost_analysis(self, components: List[str]) -> Dict:
@@ -195,15 +313,18 @@ class ComponentSearcher:
         budget_alternatives = []
         premium_options = []
         
+        # Fetch all components from all suppliers in one batch
+        prefetched = self._submit_all(components)
+        
         for component in components:
-            search_result = self.search_component(component)
+            search_result = self._build_search_result(component, "", prefetched[component])
             if search_result['best_price']:
                 total_cost += search_result['best_price']['price']
                 
                 # Find budget and premium alternatives
                 suppliers = search_result['suppliers']
                 if suppliers:
-                    cheapest = min(suppliers, key=lambda x: x.get('price', float('inf')))
+                    cheapest = min(suppliers, key=lambda x: x.get('price', _INF))
                     most_expensive = max(suppliers, key=lambda x: x.get('price', 0))
                     
                     budget_alternatives.append(cheapest)
@@ -229,9 +350,9 @@ if __name__ == "__main__":
     
     # Test component search
     result = searcher.search_component("DS18B20 Temperature Sensor", "temperature_sensor")
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
     
     # Test cost analysis
     components = ["ESP32", "DS18B20", "pH Sensor", "Water Pump"]
     cost_analysis = searcher.get_cost_analysis(components)
-    print(json.dumps(cost_analysis, indent=2))
+    print(orjson.dumps(cost_analysis, option=orjson.OPT_INDENT_2).decode())
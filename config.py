@@ -2,6 +2,7 @@
 Configuration settings for the Multi-Agent Project Refiner AI System
 """
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,19 +15,78 @@ class Config:
     # Model Settings
     GPT_MODEL = "gpt-4-turbo-preview"  # GPT-4.1
     GEMINI_MODEL = "gemini-1.5-flash"
+    FAST_GEMINI_MODEL = os.getenv('FAST_GEMINI_MODEL', "gemini-1.5-flash")  # Final formatting pass
     
     # System Settings
     MAX_ITERATIONS = 3
     CHUNK_SIZE = 3000  # Characters per chunk for large inputs
     OVERLAP_SIZE = 200  # Overlap between chunks to maintain context
+    CHUNK_THRESHOLD_TOKENS = int(os.getenv('CHUNK_THRESHOLD_TOKENS', '2000'))  # Larger inputs are chunked and summarized
     
     # Temperature settings for different phases
     STRATEGIST_TEMPERATURE = 0.7
     REFINER_TEMPERATURE = 0.8
     
+    # Response cache for the refinement endpoints (disable for stateless deployments)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_SIZE = 256
+    SINGLE_FLIGHT_TIMEOUT = 300  # Seconds a duplicate request waits on the in-flight one
+    
+    # Critique roadmap sections while the Strategist is still streaming them (one Gemini call per section)
+    STREAM_SECTION_CRITIQUE = os.getenv('STREAM_SECTION_CRITIQUE', 'false').lower() == 'true'
+    # Refine and present the roadmap in one Strategist call instead of a refine pass plus a Gemini pass
+    FUSE_STAGES = os.getenv('FUSE_STAGES', 'false').lower() == 'true'
+    
+    # LLM call limits (full 4000-token roadmaps routinely take over a minute to generate)
+    LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '120'))
+    LLM_MAX_ATTEMPTS = 3
+    LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))  # Projects refined at once by arefine_projects
+    MAX_CONCURRENT_WORKFLOWS = int(os.getenv('MAX_CONCURRENT_WORKFLOWS', '8'))  # Async workflows per event loop
+    LLM_RETRY_BASE_DELAY = 1.0  # Seconds; doubles per attempt, with jitter
+    # Threads for blocking SDK calls bounded by call_with_timeout; a stalled call keeps its thread until it returns
+    LLM_CALL_WORKERS = int(os.getenv('LLM_CALL_WORKERS', '32'))
+    # Per-minute limits of the API accounts, used to pace calls ahead of 429s (0 disables pacing)
+    OPENAI_RPM = int(os.getenv('OPENAI_RPM', '0'))
+    OPENAI_TPM = int(os.getenv('OPENAI_TPM', '0'))
+    GEMINI_RPM = int(os.getenv('GEMINI_RPM', '0'))
+    GEMINI_TPM = int(os.getenv('GEMINI_TPM', '0'))
+    # Async calls each provider may have in flight at once per event loop, so bursts queue instead of hitting 429s
+    OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '16'))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+    # Open the Gemini client in the background at startup with a real, if 1-token, request
+    LLM_WARMUP = os.getenv('LLM_WARMUP', 'false').lower() == 'true'
+    
+    # Persistent LLM completion cache (point LLM_CACHE_PATH at /tmp on read-only hosts)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.llm_cache.sqlite3')
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds
+    COMPONENT_CACHE_TTL = int(os.getenv('COMPONENT_CACHE_TTL', str(24 * 3600)))  # Supplier pricing, in the same file
+    # Supplier lookups still return demonstration prices, so they stay out of prompts unless enabled
+    COMPONENT_PRICING_ENABLED = os.getenv('COMPONENT_PRICING_ENABLED', 'false').lower() == 'true'
+    # Serve a stored initial roadmap for a rephrased request (costs one embedding call per request)
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))  # Cosine similarity
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', "text-embedding-3-small")
+    
+    # Batch API jobs for offline runs
+    BATCH_POLL_INTERVAL = 30  # Seconds between status checks
+    BATCH_TIMEOUT = 24 * 3600  # Providers complete batches within 24 hours
+    BATCH_MIN_SIZE = 4  # Fewer uncached requests than this are sent interactively instead
+    
+    # JSONL file of completed workflow stages for resumable offline runs (unset disables it)
+    CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH')
+    
+    # Response compression (bodies below the minimum size are sent as-is)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 4
+    
+    # Largest request body the web endpoints will read
+    MAX_REQUEST_BYTES = 1 << 20
+    
     @classmethod
+    @lru_cache(maxsize=1)
     def validate_config(cls):
-        """Validate that required API keys are present"""
+        """Validate that required API keys are present (cached after the first success)"""
         missing_keys = []
         if not cls.OPENAI_API_KEY:
             missing_keys.append('OPENAI_API_KEY')
@@ -37,3 +97,13 @@ class Config:
             raise ValueError(f"Missing required API keys: {', '.join(missing_keys)}")
         
         return True
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def api_key_status(cls) -> str:
+        """Cached key status for health checks ('configured' or the validation error)"""
+        try:
+            cls.validate_config()
+            return "configured"
+        except ValueError as e:
+            return f"error: {str(e)}"
@@ -2,8 +2,11 @@
 Example usage of the Multi-Agent Project Refiner AI System
 """
 import os
+import sys
 from multi_agent_orchestrator import ProjectRefinerAPI
 
+SEP = "=" * 60
+
 def main():
     # Set up API keys (you'll need to provide these)
     # os.environ['OPENAI_API_KEY'] = 'your-openai-api-key'
@@ -52,24 +55,34 @@ def main():
         api = ProjectRefinerAPI()
         
         print("🤖 Starting multi-agent project refinement...")
-        print("=" * 60)
+        print(SEP, flush=True)
         
         # Get detailed result
-        result = api.refine_project_detailed(project_description)
+        if '--batch' in sys.argv:
+            # Offline run through the Batch APIs: half the cost, results within 24 hours
+            result = api.refine_projects_batch([project_description])[0]
+        else:
+            result = api.refine_project_detailed(project_description)
         
-        print("📋 REFINED PROJECT ROADMAP")
-        print("=" * 60)
-        print(result['roadmap'])
+        # Write the roadmap in one go rather than line by line
+        sys.stdout.write("\n".join(["📋 REFINED PROJECT ROADMAP", SEP, result['roadmap'], ""]))
         
-        print("\n" + "=" * 60)
-        print("📊 PROCESSING METADATA")
-        print("=" * 60)
+        # Each processing path reports its own subset of these fields
         metadata = result['metadata']
-        print(f"Processing Type: {metadata['processing_type']}")
-        print(f"Total Tokens: {metadata['total_tokens']:,}")
-        print(f"Iterations: {metadata['iterations_completed']}")
-        print(f"Processing Time: {metadata['processing_time']:.2f} seconds")
-        print(f"Timestamp: {metadata['timestamp']}")
+        total_tokens = metadata.get('total_tokens')
+        sys.stdout.write("\n".join([
+            "",
+            SEP,
+            "📊 PROCESSING METADATA",
+            SEP,
+            f"Processing Type: {metadata.get('processing_type', 'standard')}",
+            f"Total Tokens: {total_tokens:,}" if total_tokens is not None else "Total Tokens: n/a",
+            f"Iterations: {metadata.get('iterations_completed', metadata.get('iterations', 'n/a'))}",
+            f"Processing Time: {metadata.get('processing_time', 0.0):.2f} seconds",
+            f"Timestamp: {metadata.get('timestamp', 'n/a')}",
+            ""
+        ]))
+        sys.stdout.flush()
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -1,10 +1,24 @@
 """
 LLM Agent implementations for GPT-4.1 (Strategist) and Gemini (Refiner)
 """
+import asyncio
+import hashlib
+import json
+import re
+import string
+import threading
 import openai
 import google.generativeai as genai
-from typing import Dict, Optional, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, List, Tuple, Union
 from config import Config
+from llm_cache import PromptCache, get_prompt_cache, get_semantic_cache
+from batch_jobs import run_gemini_batch, run_openai_batch
+from llm_clients import (
+    awith_retry, call_with_timeout, configure_openai, estimate_tokens, gemini_limiter, get_gemini_model,
+    openai_limiter, use_shared_aiosession, with_retry
+)
 import logging
 
 # Optional import for component searcher
@@ -17,121 +31,75 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-class StrategistAgent:
-    """GPT-4.1 Agent acting as the Strategist - Initial high-level analysis and roadmap creation"""
-    
-    def __init__(self):
-        # Use legacy OpenAI client (v0.28.1)
-        openai.api_key = Config.OPENAI_API_KEY
-        self.client = None  # Use module-level functions
-        self.model = Config.GPT_MODEL
-        self.temperature = Config.STRATEGIST_TEMPERATURE
-        self.component_searcher = ComponentSearcher() if COMPONENT_SEARCH_AVAILABLE else None
+# Markdown headings that delimit roadmap sections for patching
+_SECTION_HEADING_RE = re.compile(r'^#{1,4}\s+.+$', re.MULTILINE)
+
+def _normalize_heading(heading: str) -> str:
+    """Reduce a heading to lowercase words for matching"""
+    return re.sub(r'[#*`:\s]+', ' ', heading).strip().lower()
+
+def parse_patches(feedback: str) -> Optional[List[Dict]]:
+    """Parse the Refiner's structured critique, or return None for free-text feedback"""
+    start, end = feedback.find('{'), feedback.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        data = json.loads(feedback[start:end + 1])
+    except ValueError:
+        return None
+    patches = data.get('patches') if isinstance(data, dict) else None
+    if not isinstance(patches, list):
+        return None
+    return [patch for patch in patches if isinstance(patch, dict) and patch.get('section')]
+
+def split_sections(roadmap: str) -> List[List[str]]:
+    """Split a markdown roadmap into [normalized heading, text] pairs; text keeps its heading line"""
+    starts = [match.start() for match in _SECTION_HEADING_RE.finditer(roadmap)]
+    if not starts:
+        return []
     
-    def generate_initial_roadmap(self, user_input: str) -> str:
-        """
-        Generate initial project roadmap based on user requirements
-        
-        Args:
-            user_input: User's project description and requirements
-            
-        Returns:
-            Detailed project roadmap as string
-        """
-        
-        # Extract components for pricing research if applicable
-        component_data = ""
-        
-        if self.component_searcher:
-            try:
-                components = self.component_searcher.extract_components(user_input)
-                if components:
-                    logger.info(f"Found {len(components)} components to research: {components}")
-                    pricing_data = self.component_searcher.search_components(components)
-                    if pricing_data:
-                        component_data = f"\n\nCOMPONENT PRICING DATA:\n{pricing_data}"
-                        logger.info("Successfully retrieved component pricing data")
-            except Exception as e:
-                logger.warning(f"Could not retrieve component pricing: {e}")
-        
-        # Determine project type and create appropriate system prompt
-        project_type = self._detect_project_type(user_input)
-        system_prompt = self._get_system_prompt_for_project_type(project_type)
-        
-        user_prompt = f"""Create a comprehensive project roadmap for the following requirements:
+    sections = []
+    if starts[0] > 0:
+        sections.append(['', roadmap[:starts[0]]])
+    for start, end in zip(starts, starts[1:] + [len(roadmap)]):
+        text = roadmap[start:end]
+        sections.append([_normalize_heading(text.split('\n', 1)[0]), text])
+    return sections
 
-PROJECT REQUIREMENTS: {user_input}
+def _split_finished_section(buffer: str) -> Tuple[Optional[str], str]:
+    """Split a streamed buffer at the first heading after its start, once that heading's line is complete"""
+    complete = buffer[:buffer.rfind('\n') + 1]
+    for match in _SECTION_HEADING_RE.finditer(complete):
+        if match.start() > 0:
+            return buffer[:match.start()], buffer[match.start():]
+    return None, buffer
 
-INSTRUCTIONS:
-1. Analyze the project requirements and create a detailed, actionable roadmap
-2. Include specific technologies, frameworks, and tools (NO generic placeholders)
-3. Provide realistic timelines and milestones
-4. Include technical architecture and implementation details
-5. Consider scalability, security, and best practices
-6. If hardware/IoT components are involved, include specific part numbers and pricing
-7. Structure the roadmap with clear phases and deliverables
+async def _as_async_iter(items: Iterable[str]) -> AsyncIterator[str]:
+    """Adapt a plain iterable for code that consumes async streams"""
+    for item in items:
+        yield item
 
-{component_data}
+def _find_section(sections: List[List[str]], name: str) -> Optional[int]:
+    """Index of the section whose heading matches name (exact first, then containment)"""
+    target = _normalize_heading(name)
+    if not target:
+        return None
+    for i, (heading, _) in enumerate(sections):
+        if heading == target:
+            return i
+    for i, (heading, _) in enumerate(sections):
+        if heading and (target in heading or heading in target):
+            return i
+    return None
 
-Provide a detailed roadmap that a developer can immediately start implementing."""
+def _dyn_max_tokens(text: str, ratio: float = 1.5, cap: int = 4000, floor: int = 500) -> int:
+    """Output budget proportional to the text being reworked (~4 characters per token)"""
+    return min(cap, max(floor, int(len(text) // 4 * ratio)))
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=4000
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            logger.error(f"Strategist Agent error: {str(e)}")
-            raise Exception(f"Strategist Agent error: {str(e)}")
-    
-    def _detect_project_type(self, user_input: str) -> str:
-        """Detect the type of project to customize the system prompt"""
-        user_lower = user_input.lower()
-        
-        # IoT/Hardware project detection
-        iot_keywords = ['iot', 'sensor', 'arduino', 'raspberry pi', 'esp32', 'monitoring', 'smart', 'automation']
-        if any(keyword in user_lower for keyword in iot_keywords):
-            return 'iot_hardware'
-        
-        # Mobile app detection
-        mobile_keywords = ['mobile app', 'ios', 'android', 'smartphone', 'app store', 'mobile']
-        if any(keyword in user_lower for keyword in mobile_keywords):
-            return 'mobile_app'
-        
-        # Web platform detection
-        web_keywords = ['website', 'web app', 'dashboard', 'portal', 'online platform', 'web']
-        if any(keyword in user_lower for keyword in web_keywords):
-            return 'web_platform'
-        
-        # AI/ML project detection
-        ai_keywords = ['ai', 'machine learning', 'chatbot', 'recommendation', 'prediction', 'nlp']
-        if any(keyword in user_lower for keyword in ai_keywords):
-            return 'ai_ml'
-        
-        # E-commerce detection
-        ecommerce_keywords = ['e-commerce', 'marketplace', 'shopping', 'payment', 'cart', 'store']
-        if any(keyword in user_lower for keyword in ecommerce_keywords):
-            return 'ecommerce'
-        
-        return 'general_software'
-    
-    def _get_system_prompt_for_project_type(self, project_type: str) -> str:
-        """Get appropriate system prompt based on project type"""
-        
-        base_prompt = """You are an expert software architect and project strategist with 15+ years of experience in full-stack development, system design, and project management."""
-        
-        if project_type == 'iot_hardware':
-            return f"""{base_prompt}
+_STRATEGIST_BASE_PROMPT = """You are an expert software architect and project strategist with 15+ years of experience in full-stack development, system design, and project management."""
 
-SPECIALIZATION: IoT and Hardware Systems
+_STRATEGIST_SPECIALIZATIONS = {
+    'iot_hardware': """SPECIALIZATION: IoT and Hardware Systems
 - Expert in microcontrollers (Arduino, ESP32, Raspberry Pi)
 - Extensive knowledge of sensors, actuators, and electronic components
 - Experience with IoT protocols (MQTT, HTTP, WebSocket)
@@ -146,12 +114,9 @@ MANDATORY REQUIREMENTS:
 - Include realistic pricing for all hardware components
 - Provide code examples for microcontroller programming
 - Consider power consumption and battery life
-- Include enclosure and mounting considerations"""
-
-        elif project_type == 'mobile_app':
-            return f"""{base_prompt}
+- Include enclosure and mounting considerations""",
 
-SPECIALIZATION: Mobile Application Development
+    'mobile_app': """SPECIALIZATION: Mobile Application Development
 - Expert in iOS (Swift, SwiftUI) and Android (Kotlin, Java) development
 - Experience with cross-platform frameworks (React Native, Flutter)
 - Knowledge of mobile UI/UX best practices
@@ -166,12 +131,9 @@ MANDATORY REQUIREMENTS:
 - Include backend API specifications
 - Consider offline functionality and data synchronization
 - Include app store submission requirements
-- Specify testing strategies for different devices"""
-
-        elif project_type == 'web_platform':
-            return f"""{base_prompt}
+- Specify testing strategies for different devices""",
 
-SPECIALIZATION: Web Platform Development
+    'web_platform': """SPECIALIZATION: Web Platform Development
 - Expert in modern web frameworks (React, Vue.js, Angular, Next.js)
 - Extensive backend experience (Node.js, Python, Java, .NET)
 - Database design and optimization (SQL, NoSQL)
@@ -186,12 +148,9 @@ MANDATORY REQUIREMENTS:
 - Include authentication and authorization strategy
 - Consider scalability and performance requirements
 - Include deployment and hosting recommendations
-- Specify security measures and compliance requirements"""
+- Specify security measures and compliance requirements""",
 
-        elif project_type == 'ai_ml':
-            return f"""{base_prompt}
-
-SPECIALIZATION: AI and Machine Learning Systems
+    'ai_ml': """SPECIALIZATION: AI and Machine Learning Systems
 - Expert in ML frameworks (TensorFlow, PyTorch, Scikit-learn)
 - Experience with NLP, computer vision, and recommendation systems
 - Knowledge of data preprocessing and feature engineering
@@ -206,12 +165,9 @@ MANDATORY REQUIREMENTS:
 - Include evaluation metrics and validation methods
 - Consider model deployment and serving infrastructure
 - Include data privacy and security considerations
-- Specify monitoring and model maintenance strategies"""
-
-        elif project_type == 'ecommerce':
-            return f"""{base_prompt}
+- Specify monitoring and model maintenance strategies""",
 
-SPECIALIZATION: E-commerce Platform Development
+    'ecommerce': """SPECIALIZATION: E-commerce Platform Development
 - Expert in e-commerce frameworks (Shopify, WooCommerce, Magento)
 - Experience with payment processing (Stripe, PayPal, Square)
 - Knowledge of inventory management and order fulfillment
@@ -226,12 +182,9 @@ MANDATORY REQUIREMENTS:
 - Include order processing and fulfillment workflow
 - Consider security and PCI compliance requirements
 - Include marketing and analytics integration
-- Specify mobile responsiveness and performance optimization"""
-
-        else:  # general_software
-            return f"""{base_prompt}
+- Specify mobile responsiveness and performance optimization""",
 
-SPECIALIZATION: General Software Development
+    'general_software': """SPECIALIZATION: General Software Development
 - Expert in multiple programming languages and frameworks
 - Experience with system architecture and design patterns
 - Knowledge of database design and API development
@@ -247,60 +200,45 @@ MANDATORY REQUIREMENTS:
 - Include testing strategy and quality assurance
 - Provide deployment and hosting recommendations
 - Consider security and data protection requirements"""
-    
-    def refine_roadmap(self, original_roadmap: str, refiner_feedback: str) -> str:
-        """Refine the roadmap based on Refiner's feedback"""
-        
-        system_prompt = """You are an expert project strategist. You previously created a project roadmap, and now you've received detailed feedback from a specialist reviewer. Your task is to integrate this feedback and improve the original roadmap.
+}
 
-Focus on:
-1. Addressing all concerns and suggestions raised in the feedback
-2. Incorporating better approaches and alternatives suggested
-3. Fixing any logical inconsistencies or gaps identified
-4. Enhancing the practical implementation aspects
-5. Maintaining the overall structure while improving details
+# Full system prompts are assembled once so every call sends a byte-identical prefix,
+# which lets provider-side prompt caching reuse it across requests
+STRATEGIST_SYSTEM_PROMPTS = {
+    project_type: f"{_STRATEGIST_BASE_PROMPT}\n\n{specialization}"
+    for project_type, specialization in _STRATEGIST_SPECIALIZATIONS.items()
+}
 
-Create an improved version that addresses the feedback while maintaining clarity and actionability."""
+# Project type keywords, checked in priority order; like the old substring checks they
+# match anywhere in the input, but each type is one precompiled scan
+_PROJECT_TYPE_KEYWORDS = (
+    ('iot_hardware', ['iot', 'sensor', 'arduino', 'raspberry pi', 'esp32', 'monitoring', 'smart', 'automation']),
+    ('mobile_app', ['mobile app', 'ios', 'android', 'smartphone', 'app store', 'mobile']),
+    ('web_platform', ['website', 'web app', 'dashboard', 'portal', 'online platform', 'web']),
+    ('ai_ml', ['ai', 'machine learning', 'chatbot', 'recommendation', 'prediction', 'nlp']),
+    ('ecommerce', ['e-commerce', 'marketplace', 'shopping', 'payment', 'cart', 'store']),
+)
+_PROJECT_TYPE_PATTERNS = [
+    (project_type, re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE))
+    for project_type, keywords in _PROJECT_TYPE_KEYWORDS
+]
 
-        user_prompt = f"""Here is the original roadmap you created:
+# Refiner prompts; the patch format is shared by the whole-roadmap and per-section critiques
+_PATCH_FORMAT = """Respond with only a JSON object of the form:
+{"patches": [{"section": "<exact heading text of the section>", "issue": "<specific problem and recommended fix>", "replace_with": "<full improved markdown for the section, or empty>", "needs_rewrite": <true|false>}]}
 
-{original_roadmap}
-
-Here is the detailed feedback from the specialist reviewer:
-
-{refiner_feedback}
+- Use "replace_with" with needs_rewrite false when you can write the corrected section yourself
+- Set needs_rewrite true with an empty "replace_with" when the strategist should rework the section
+"""
 
-Please create an improved version of the roadmap that addresses all the feedback points and incorporates the suggested improvements."""
+_SECTION_CRITIQUE_TEMPLATE = string.Template("""You are an expert project analyst reviewing one section of a project roadmap while the rest of it is still being written. Judge the section on its own terms: logical consistency, feasibility of timelines and resources, risks, technical soundness, missing implementation details, better alternatives, and scalability.
 
-        try:
-            # Use legacy OpenAI client
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=4000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"Strategist Agent refinement error: {str(e)}")
+""" + _PATCH_FORMAT + """- Return {"patches": []} if the section needs no changes or has no heading
 
+ROADMAP SECTION:
+$section""")
 
-class RefinerAgent:
-    """Gemini Agent acting as the Refiner - Critical evaluation and improvement suggestions"""
-    
-    def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
-        self.temperature = Config.REFINER_TEMPERATURE
-    
-    def analyze_roadmap(self, roadmap: str, iteration: int = 1) -> str:
-        """Analyze the roadmap and provide critical feedback and improvements"""
-        
-        if iteration == 1:
-            prompt = f"""You are an expert project analyst and critic specializing in identifying weaknesses and improvement opportunities in project roadmaps. Your role is to provide constructive, detailed feedback.
+_ANALYSIS_TEMPLATE = string.Template("""You are an expert project analyst and critic specializing in identifying weaknesses and improvement opportunities in project roadmaps. Your role is to provide constructive, detailed feedback.
 
 Analyze the following project roadmap and provide comprehensive feedback focusing on:
 
@@ -312,21 +250,14 @@ Analyze the following project roadmap and provide comprehensive feedback focusin
 6. **Alternative Approaches**: What better or more efficient alternatives exist?
 7. **Scalability & Maintenance**: How well does the plan address long-term considerations?
 
-For each area, provide:
-- Specific issues identified
-- Detailed recommendations for improvement
-- Alternative approaches where applicable
-- Practical implementation suggestions
+Report your feedback as targeted patches against the roadmap's section headings. """ + _PATCH_FORMAT + """- Only include sections that need changes; return {"patches": []} if none do
 
 Be thorough, constructive, and focus on actionable improvements.
 
 ROADMAP TO ANALYZE:
-{roadmap}
+$roadmap""")
 
-Provide your detailed analysis and recommendations:"""
-        
-        else:  # Final iteration
-            prompt = f"""You are conducting a final review of a refined project roadmap. This roadmap has already been through one iteration of improvement based on previous feedback.
+_FINAL_REVIEW_TEMPLATE = string.Template("""You are conducting a final review of a refined project roadmap. This roadmap has already been through one iteration of improvement based on previous feedback.
 
 Your task is to:
 1. Verify that previous concerns have been adequately addressed
@@ -341,28 +272,14 @@ Focus on:
 - Final quality assurance
 
 If the roadmap is satisfactory, acknowledge its strengths and provide any final minor suggestions.
+Be concise; keep the review under 500 words.
 
 REFINED ROADMAP TO REVIEW:
-{roadmap}
+$roadmap
 
-Provide your final evaluation and any remaining recommendations:"""
+Provide your final evaluation and any remaining recommendations:""")
 
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=4000
-                )
-            )
-            return response.text
-        except Exception as e:
-            raise Exception(f"Refiner Agent error: {str(e)}")
-    
-    def final_evaluation(self, final_roadmap: str) -> str:
-        """Provide final evaluation and present the polished roadmap"""
-        
-        prompt = f"""You are presenting the final, refined project roadmap to the user. This roadmap has been through multiple iterations of improvement and refinement.
+_PRESENTATION_TEMPLATE = string.Template("""You are presenting the final, refined project roadmap to the user. This roadmap has been through multiple iterations of improvement and refinement.
 
 Your task is to:
 1. Present the roadmap in a clean, professional format
@@ -374,18 +291,973 @@ Your task is to:
 Format the final output as a comprehensive, standalone project roadmap that the user can immediately act upon.
 
 FINAL ROADMAP:
-{final_roadmap}
+$final_roadmap
+
+Present this as the definitive project roadmap:""")
+
+# Output caps for the initial roadmap; hardware plans carry part lists and wiring, so run longest
+_MAX_TOKENS_BY_TYPE = {
+    'iot_hardware': 4000,
+    'mobile_app': 3000,
+    'web_platform': 3500,
+    'ai_ml': 3500,
+    'ecommerce': 3000,
+    'general_software': 3000,
+}
+
+# (project type, keyword pattern, system prompt, output cap), resolved in one table scan;
+# built by key so a type missing from any of the tables fails at import
+_PROJECT_SPECS = [
+    (project_type, pattern, STRATEGIST_SYSTEM_PROMPTS[project_type], _MAX_TOKENS_BY_TYPE[project_type])
+    for project_type, pattern in _PROJECT_TYPE_PATTERNS
+]
+_GENERAL_PROJECT_SPEC = (
+    'general_software', None, STRATEGIST_SYSTEM_PROMPTS['general_software'], _MAX_TOKENS_BY_TYPE['general_software']
+)
+
+@lru_cache(maxsize=256)
+def _match_project_spec(text: str) -> Tuple[str, Optional[re.Pattern], str, int]:
+    """First project spec with a keyword in text; one request asks for its own type several times"""
+    for spec in _PROJECT_SPECS:
+        if spec[1].search(text):
+            return spec
+    return _GENERAL_PROJECT_SPEC
+
+# Static instructions come first and request-specific text last to keep the cacheable prefix long
+_INITIAL_USER_TEMPLATE = string.Template("""Create a comprehensive project roadmap for the requirements given below.
+
+INSTRUCTIONS:
+1. Analyze the project requirements and create a detailed, actionable roadmap
+2. Include specific technologies, frameworks, and tools (NO generic placeholders)
+3. Provide realistic timelines and milestones
+4. Include technical architecture and implementation details
+5. Consider scalability, security, and best practices
+6. If hardware/IoT components are involved, include specific part numbers and pricing
+7. Structure the roadmap with clear phases and deliverables
+
+Provide a detailed roadmap that a developer can immediately start implementing.
+Keep it under about $word_budget words so it is never cut off.
+
+PROJECT REQUIREMENTS: $user_input
+$component_data""")
+
+_REFINE_SYSTEM_PROMPT = """You are an expert project strategist. You previously created a project roadmap, and now you've received detailed feedback from a specialist reviewer. Your task is to integrate this feedback and improve the original roadmap.
+
+Focus on:
+1. Addressing all concerns and suggestions raised in the feedback
+2. Incorporating better approaches and alternatives suggested
+3. Fixing any logical inconsistencies or gaps identified
+4. Enhancing the practical implementation aspects
+5. Maintaining the overall structure while improving details
+
+Create an improved version that addresses the feedback while maintaining clarity and actionability."""
+
+_REFINE_USER_TEMPLATE = string.Template("""Here is the original roadmap you created:
+
+$original_roadmap
+
+Here is the detailed feedback from the specialist reviewer:
+
+$refiner_feedback
+
+Please create an improved version of the roadmap that addresses all the feedback points and incorporates the suggested improvements.""")
+
+_SECTION_REWRITE_SYSTEM_PROMPT = """You are an expert project strategist revising specific sections of your project roadmap after specialist review. Rewrite only the sections you are given, resolving every listed issue with concrete, actionable detail."""
+
+_SECTION_REWRITE_USER_TEMPLATE = string.Template("""Rewrite each roadmap section below to resolve the reviewer's issues.
+Return only the rewritten sections in the same order, each starting with its original heading line unchanged.
 
-Present this as the definitive project roadmap:"""
+$section_text""")
 
+# Refinement and presentation in one pass; the roadmap is only written once, the JSON adds a short change note
+_FUSED_SYSTEM_PROMPT = _REFINE_SYSTEM_PROMPT + """
+
+The improved roadmap goes straight to the user, so also present it in a clean, professional format: highlight its key strengths, give clear next steps for implementation, and leave out any reference to the review process.
+
+Respond with only a JSON object of the form:
+{"final_roadmap": "<the complete improved roadmap in markdown>", "changes": "<under 100 words on how the feedback was addressed>"}"""
+
+_FUSED_USER_TEMPLATE = string.Template("""Here is the original roadmap you created:
+
+$original_roadmap
+
+Here is the detailed feedback from the specialist reviewer:
+
+$refiner_feedback
+
+Create the improved roadmap that addresses all the feedback points and present it as the definitive project roadmap.""")
+
+class StrategistAgent:
+    """GPT-4.1 Agent acting as the Strategist - Initial high-level analysis and roadmap creation"""
+    
+    # Section rewrites started while the Refiner is still critiquing other sections
+    _rewrite_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='section-rewrite')
+    # Supplier pricing lookups overlapped with the semantic cache's embedding call
+    _pricing_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='component-pricing')
+    
+    def __init__(self, bypass_cache: bool = False):
+        # Use legacy OpenAI client (v0.28.1) over the process-wide keep-alive session
+        configure_openai()
+        self.client = None  # Use module-level functions
+        self.model = Config.GPT_MODEL
+        self.temperature = Config.STRATEGIST_TEMPERATURE
+        self.component_searcher = (
+            ComponentSearcher() if COMPONENT_SEARCH_AVAILABLE and Config.COMPONENT_PRICING_ENABLED else None
+        )
+        # bypass_cache: always sample fresh completions (they are still recorded)
+        self.cache = get_prompt_cache().write_only() if bypass_cache else get_prompt_cache()
+        self.semantic_cache = None if bypass_cache else get_semantic_cache()
+    
+    def generate_initial_roadmap(self, user_input: str) -> str:
+        """
+        Generate initial project roadmap based on user requirements
+        
+        Args:
+            user_input: User's project description and requirements
+            
+        Returns:
+            Detailed project roadmap as string
+        """
+        component_lookup = self._start_component_lookup(user_input)
+        cached = self._semantic_lookup(user_input)
+        if cached is not None:
+            return cached
+        
+        system_prompt, user_prompt, max_tokens = self._build_initial_prompts(user_input, component_lookup.result())
+        
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,  # Lower temperature for final formatting
-                    max_output_tokens=4000
-                )
+            roadmap = self._complete(system_prompt, user_prompt, max_tokens)
+            self._semantic_store(user_input, roadmap)
+            return roadmap
+            
+        except Exception as e:
+            logger.error(f"Strategist Agent error: {str(e)}")
+            raise
+    
+    def stream_initial_roadmap(self, user_input: str) -> Iterator[str]:
+        """
+        Generate the initial roadmap, yielding each section as soon as GPT finishes it
+        
+        Args:
+            user_input: User's project description and requirements
+            
+        Yields:
+            Consecutive roadmap sections; joined they form the full roadmap
+        """
+        component_lookup = self._start_component_lookup(user_input)
+        cached = self._semantic_lookup(user_input)
+        if cached is None:
+            system_prompt, user_prompt, max_tokens = self._build_initial_prompts(user_input, component_lookup.result())
+            key = PromptCache.make_key(self.model, self.temperature, system_prompt, user_prompt)
+            cached = self.cache.get(key)
+        if cached is not None:
+            for _, text in split_sections(cached) or [['', cached]]:
+                yield text
+            return
+        
+        try:
+            params = self._chat_params(system_prompt, user_prompt, max_tokens)
+            openai_limiter.acquire(estimate_tokens(system_prompt + user_prompt, max_tokens))
+            chunks = with_retry(lambda: openai.ChatCompletion.create(stream=True, **params))
+            
+            parts = []
+            buffer = ""
+            for chunk in chunks:
+                delta = chunk.choices[0].delta.get('content') or ""
+                buffer += delta
+                # Headings only need checking once a line is complete
+                if '\n' not in delta:
+                    continue
+                section, buffer = _split_finished_section(buffer)
+                if section is not None:
+                    parts.append(section)
+                    yield section
+            if buffer:
+                parts.append(buffer)
+                yield buffer
+            
+            roadmap = "".join(parts)
+            self.cache.set(key, roadmap)
+            self._semantic_store(user_input, roadmap)
+            
+        except Exception as e:
+            logger.error(f"Strategist Agent error: {str(e)}")
+            raise
+    
+    async def astream_initial_roadmap(self, user_input: str) -> AsyncIterator[str]:
+        """Async variant of stream_initial_roadmap"""
+        cached, component_data = await asyncio.gather(
+            asyncio.to_thread(self._semantic_lookup, user_input),
+            asyncio.to_thread(self._component_data, user_input)
+        )
+        if cached is None:
+            system_prompt, user_prompt, max_tokens = self._build_initial_prompts(user_input, component_data)
+            key = PromptCache.make_key(self.model, self.temperature, system_prompt, user_prompt)
+            cached = self.cache.get(key)
+        if cached is not None:
+            for _, text in split_sections(cached) or [['', cached]]:
+                yield text
+            return
+        
+        try:
+            params = self._chat_params(system_prompt, user_prompt, max_tokens)
+            use_shared_aiosession()
+            await openai_limiter.aacquire(estimate_tokens(system_prompt + user_prompt, max_tokens))
+            chunks = await awith_retry(lambda: openai.ChatCompletion.acreate(stream=True, **params), provider='openai')
+            
+            parts = []
+            buffer = ""
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.get('content') or ""
+                buffer += delta
+                if '\n' not in delta:
+                    continue
+                section, buffer = _split_finished_section(buffer)
+                if section is not None:
+                    parts.append(section)
+                    yield section
+            if buffer:
+                parts.append(buffer)
+                yield buffer
+            
+            roadmap = "".join(parts)
+            self.cache.set(key, roadmap)
+            await asyncio.to_thread(self._semantic_store, user_input, roadmap)
+            
+        except Exception as e:
+            logger.error(f"Strategist Agent error: {str(e)}")
+            raise
+    
+    async def agenerate_initial_roadmap(self, user_input: str) -> str:
+        """Async variant of generate_initial_roadmap for use inside an event loop"""
+        # Component lookup and embedding calls are blocking, run them side by side off the event loop
+        cached, component_data = await asyncio.gather(
+            asyncio.to_thread(self._semantic_lookup, user_input),
+            asyncio.to_thread(self._component_data, user_input)
+        )
+        if cached is not None:
+            return cached
+        system_prompt, user_prompt, max_tokens = self._build_initial_prompts(user_input, component_data)
+        
+        try:
+            roadmap = await self._acomplete(system_prompt, user_prompt, max_tokens)
+            await asyncio.to_thread(self._semantic_store, user_input, roadmap)
+            return roadmap
+            
+        except Exception as e:
+            logger.error(f"Strategist Agent error: {str(e)}")
+            raise
+    
+    def generate_initial_roadmaps_batch(self, user_inputs: List[str]) -> List[str]:
+        """
+        Generate initial roadmaps for many inputs through the OpenAI Batch API (offline runs only)
+        
+        Args:
+            user_inputs: Project descriptions, one roadmap each
+            
+        Returns:
+            Initial roadmaps, in input order
+        """
+        prompts = [self._build_initial_prompts(user_input) for user_input in user_inputs]
+        return self._complete_batch(prompts)
+    
+    def refine_roadmaps_batch(self, roadmaps: List[str], feedbacks: List[str]) -> List[str]:
+        """
+        Batch variant of refine_roadmap: patches are applied locally and only the
+        rewrites that still need the model go through the OpenAI Batch API
+        
+        Args:
+            roadmaps: Roadmaps to refine
+            feedbacks: Refiner feedback for each roadmap
+            
+        Returns:
+            Refined roadmaps, in input order
+        """
+        plans = [self._plan_patches(roadmap, feedback) for roadmap, feedback in zip(roadmaps, feedbacks)]
+        prompts = []
+        for roadmap, feedback, plan in zip(roadmaps, feedbacks, plans):
+            if plan is None:
+                system_prompt, user_prompt = self._build_refine_prompts(roadmap, feedback)
+                prompts.append((system_prompt, user_prompt, _dyn_max_tokens(roadmap)))
+            elif plan[1]:
+                prompts.append(self._build_section_rewrite_prompts(*plan))
+            else:
+                prompts.append(None)
+        
+        responses = iter(self._complete_batch([prompt for prompt in prompts if prompt]))
+        results = []
+        for plan, prompt in zip(plans, prompts):
+            response = next(responses) if prompt else None
+            if plan is None:
+                results.append(response)
+                continue
+            sections, rewrites = plan
+            if rewrites:
+                self._merge_rewrites(sections, rewrites, response)
+            results.append("".join(text for _, text in sections))
+        return results
+    
+    def _complete_batch(self, prompts: List[Tuple[str, str, int]]) -> List[str]:
+        """Batch variant of _complete over (system prompt, user prompt, max tokens) triples"""
+        keys = [PromptCache.make_key(self.model, self.temperature, system_prompt, user_prompt)
+                for system_prompt, user_prompt, _ in prompts]
+        results = [self.cache.get(key) for key in keys]
+        
+        # Only submit the prompts the cache couldn't answer
+        pending = [i for i, result in enumerate(results) if result is None]
+        if 0 < len(pending) < Config.BATCH_MIN_SIZE:
+            # Too few to be worth a batch job's turnaround, call the API directly
+            for i in pending:
+                results[i] = self._complete(*prompts[i])
+        elif pending:
+            bodies = []
+            for i in pending:
+                params = self._chat_params(*prompts[i])
+                # Client-side option, not part of the request body
+                params.pop('request_timeout')
+                bodies.append(params)
+            try:
+                batch_results = run_openai_batch(bodies)
+            except Exception as e:
+                logger.error(f"Strategist Agent batch error: {str(e)}")
+                raise
+            
+            for i, text in zip(pending, batch_results):
+                if text is None:
+                    raise Exception(f"Strategist Agent batch error: no response for request {i}")
+                self.cache.set(keys[i], text)
+                results[i] = text
+        
+        return results
+    
+    def _semantic_scope(self, user_input: str) -> str:
+        """Semantic cache scope: only roadmaps for the same model and project type may match"""
+        return f"{self.model}:{self.temperature}:{self._detect_project_type(user_input)}"
+    
+    def _semantic_lookup(self, user_input: str) -> Optional[str]:
+        """Stored initial roadmap for a near-duplicate of user_input, if any"""
+        if not (self.semantic_cache and self.semantic_cache.enabled):
+            return None
+        return self.semantic_cache.lookup(self._semantic_scope(user_input), user_input)
+    
+    def _semantic_store(self, user_input: str, roadmap: str):
+        """Remember an initial roadmap for future near-duplicate inputs"""
+        if self.semantic_cache and self.semantic_cache.enabled:
+            self.semantic_cache.add(self._semantic_scope(user_input), user_input, roadmap)
+    
+    def _complete(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000,
+                  json_mode: bool = False) -> str:
+        """Run a chat completion, serving repeats from the prompt cache"""
+        key = PromptCache.make_key(self.model, self.temperature, system_prompt, user_prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        params = self._chat_params(system_prompt, user_prompt, max_tokens, json_mode)
+        openai_limiter.acquire(estimate_tokens(system_prompt + user_prompt, max_tokens))
+        response = with_retry(lambda: openai.ChatCompletion.create(**params))
+        text = response.choices[0].message.content
+        self.cache.set(key, text)
+        return text
+    
+    async def _acomplete(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000,
+                         json_mode: bool = False) -> str:
+        """Async variant of _complete"""
+        key = PromptCache.make_key(self.model, self.temperature, system_prompt, user_prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        params = self._chat_params(system_prompt, user_prompt, max_tokens, json_mode)
+        use_shared_aiosession()
+        await openai_limiter.aacquire(estimate_tokens(system_prompt + user_prompt, max_tokens))
+        response = await awith_retry(lambda: openai.ChatCompletion.acreate(**params), provider='openai')
+        text = response.choices[0].message.content
+        self.cache.set(key, text)
+        return text
+    
+    def _chat_params(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000,
+                     json_mode: bool = False) -> Dict:
+        """Build the chat completion arguments shared by the sync and async calls"""
+        params = {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': self.temperature,
+            'max_tokens': max_tokens,
+            # Routes calls sharing a system prompt to the same prompt-cache shard
+            'prompt_cache_key': self._prompt_cache_key(system_prompt),
+            'request_timeout': Config.LLM_REQUEST_TIMEOUT
+        }
+        if json_mode:
+            # JSON mode guarantees a parseable object unless the output cap cuts it off
+            params['response_format'] = {"type": "json_object"}
+        return params
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _prompt_cache_key(system_prompt: str) -> str:
+        """Short stable key for a system prompt, one per project type or refinement step"""
+        return f"strategist-{hashlib.blake2b(system_prompt.encode(), digest_size=8).hexdigest()}"
+    
+    def _start_component_lookup(self, user_input: str) -> Future:
+        """Start the supplier pricing lookup in the background, resolving to the prompt's pricing block"""
+        if self.component_searcher and self.component_searcher.extract_components(user_input):
+            return self._pricing_pool.submit(self._component_data, user_input)
+        done = Future()
+        done.set_result("")
+        return done
+    
+    def _component_data(self, user_input: str) -> str:
+        """Supplier pricing for the components in user_input, formatted for the initial prompt"""
+        if not self.component_searcher:
+            return ""
+        try:
+            components = self.component_searcher.extract_components(user_input)
+            if components:
+                logger.info(f"Found {len(components)} components to research: {components}")
+                pricing_data = self.component_searcher.search_components(components)
+                if pricing_data:
+                    logger.info("Successfully retrieved component pricing data")
+                    return f"\n\nCOMPONENT PRICING DATA:\n{pricing_data}"
+        except Exception as e:
+            logger.warning(f"Could not retrieve component pricing: {e}")
+        return ""
+    
+    def _build_initial_prompts(self, user_input: str,
+                               component_data: Optional[str] = None) -> Tuple[str, str, int]:
+        """Build the system and user prompts and the output cap for the initial roadmap"""
+        
+        # Pricing research for hardware projects, unless the caller already ran it
+        if component_data is None:
+            component_data = self._component_data(user_input)
+        
+        # Project type picks the system prompt and the output cap in one lookup
+        _, _, system_prompt, max_tokens = _match_project_spec(user_input)
+        
+        # The prompt asks for a length that fits the cap (~0.75 words per token, with headroom)
+        user_prompt = _INITIAL_USER_TEMPLATE.substitute(
+            user_input=user_input, component_data=component_data, word_budget=int(round(max_tokens * 0.6, -2))
+        )
+        return system_prompt, user_prompt, max_tokens
+    
+    def _detect_project_type(self, user_input: str) -> str:
+        """Detect the type of project to customize the system prompt"""
+        return _match_project_spec(user_input)[0]
+    
+    def _get_system_prompt_for_project_type(self, project_type: str) -> str:
+        """Get appropriate system prompt based on project type"""
+        return STRATEGIST_SYSTEM_PROMPTS.get(project_type, STRATEGIST_SYSTEM_PROMPTS['general_software'])
+    
+    def refine_roadmap(self, original_roadmap: str, refiner_feedback: str,
+                       prewritten: Optional[Dict[str, str]] = None) -> str:
+        """
+        Refine the roadmap based on Refiner's feedback
+        
+        Args:
+            original_roadmap: Roadmap the feedback refers to
+            refiner_feedback: Patch JSON or free-text feedback from the Refiner
+            prewritten: Sections already rewritten via start_section_rewrite, by heading
+        """
+        try:
+            plan = self._plan_patches(original_roadmap, refiner_feedback, prewritten)
+            if plan is None:
+                # Free-text feedback, or patches we can't place: rewrite the whole roadmap
+                system_prompt, user_prompt = self._build_refine_prompts(original_roadmap, refiner_feedback)
+                # The rewrite is about as long as the original, so size the budget from it
+                return self._complete(system_prompt, user_prompt, _dyn_max_tokens(original_roadmap))
+            
+            sections, rewrites = plan
+            if rewrites:
+                system_prompt, user_prompt, max_tokens = self._build_section_rewrite_prompts(sections, rewrites)
+                self._merge_rewrites(sections, rewrites, self._complete(system_prompt, user_prompt, max_tokens))
+            return "".join(text for _, text in sections)
+        except Exception as e:
+            logger.error(f"Strategist Agent refinement error: {str(e)}")
+            raise
+    
+    async def arefine_roadmap(self, original_roadmap: str, refiner_feedback: str,
+                              prewritten: Optional[Dict[str, str]] = None) -> str:
+        """Async variant of refine_roadmap"""
+        try:
+            plan = self._plan_patches(original_roadmap, refiner_feedback, prewritten)
+            if plan is None:
+                system_prompt, user_prompt = self._build_refine_prompts(original_roadmap, refiner_feedback)
+                return await self._acomplete(system_prompt, user_prompt, _dyn_max_tokens(original_roadmap))
+            
+            sections, rewrites = plan
+            if rewrites:
+                system_prompt, user_prompt, max_tokens = self._build_section_rewrite_prompts(sections, rewrites)
+                self._merge_rewrites(sections, rewrites, await self._acomplete(system_prompt, user_prompt, max_tokens))
+            return "".join(text for _, text in sections)
+        except Exception as e:
+            logger.error(f"Strategist Agent refinement error: {str(e)}")
+            raise
+    
+    def refine_and_finalize(self, original_roadmap: str, refiner_feedback: str,
+                            prewritten: Optional[Dict[str, str]] = None) -> Optional[Tuple[str, str]]:
+        """
+        Refine the roadmap and present it as the final roadmap in one call (Config.FUSE_STAGES)
+        
+        Returns:
+            (final roadmap, note on the changes made), or None when the refine and final passes
+            should run separately: every patch applied locally, or the response was not usable
+        """
+        prompts = self._build_fused_prompts(original_roadmap, refiner_feedback, prewritten)
+        if prompts is None:
+            return None
+        try:
+            return self._parse_fused(self._complete(*prompts, json_mode=True))
+        except Exception as e:
+            logger.error(f"Strategist Agent refinement error: {str(e)}")
+            raise
+    
+    async def arefine_and_finalize(self, original_roadmap: str, refiner_feedback: str,
+                                   prewritten: Optional[Dict[str, str]] = None) -> Optional[Tuple[str, str]]:
+        """Async variant of refine_and_finalize"""
+        prompts = self._build_fused_prompts(original_roadmap, refiner_feedback, prewritten)
+        if prompts is None:
+            return None
+        try:
+            return self._parse_fused(await self._acomplete(*prompts, json_mode=True))
+        except Exception as e:
+            logger.error(f"Strategist Agent refinement error: {str(e)}")
+            raise
+    
+    def _build_fused_prompts(self, original_roadmap: str, refiner_feedback: str,
+                             prewritten: Optional[Dict[str, str]] = None) -> Optional[Tuple[str, str, int]]:
+        """Build the refine-and-present prompt, or None when refining needs no model call"""
+        plan = self._plan_patches(original_roadmap, refiner_feedback, prewritten)
+        if plan is None:
+            roadmap, feedback = original_roadmap, refiner_feedback
+        elif plan[1]:
+            # Local patches are already in the roadmap, only the open issues go to the model
+            sections, rewrites = plan
+            roadmap = "".join(text for _, text in sections)
+            feedback = "\n".join(
+                f"- {sections[index][0]}: {issue}" for index, issues in rewrites.items() for issue in issues if issue
             )
-            return response.text
+        else:
+            return None
+        
+        user_prompt = _FUSED_USER_TEMPLATE.substitute(original_roadmap=roadmap, refiner_feedback=feedback)
+        return _FUSED_SYSTEM_PROMPT, user_prompt, _dyn_max_tokens(roadmap)
+    
+    @staticmethod
+    def _parse_fused(response: str) -> Optional[Tuple[str, str]]:
+        """Final roadmap and change note from a fused response (None if the JSON is unusable)"""
+        try:
+            data = json.loads(response)
+        except ValueError:
+            data = None
+        final_roadmap = data.get('final_roadmap') if isinstance(data, dict) else None
+        if not isinstance(final_roadmap, str) or not final_roadmap.strip():
+            # Typically a response cut off at the output cap
+            logger.warning("Fused refinement response was not usable, running the passes separately")
+            return None
+        return final_roadmap, str(data.get('changes', ''))
+    
+    def start_section_rewrite(self, section: str, patches: List[Dict]) -> Optional[Tuple[str, Future]]:
+        """
+        Start rewriting a section as soon as its critique asks for it, ahead of refine_roadmap
+        
+        Returns:
+            (normalized heading, future of the rewritten section text), or None when the
+            patches can be applied locally or the section has no single heading
+        """
+        sections = split_sections(section)
+        if len(sections) != 1 or not sections[0][0]:
+            return None
+        
+        # Sections that also carry direct replacements are left to refine_roadmap
+        replacements = [patch.get('replace_with') for patch in patches if not patch.get('needs_rewrite')]
+        if not patches or any(isinstance(text, str) and text.strip() for text in replacements):
+            return None
+        
+        issues = [str(patch.get('issue', '')) for patch in patches]
+        return sections[0][0], self._rewrite_pool.submit(self._rewrite_section, sections, issues)
+    
+    def _rewrite_section(self, sections: List[List[str]], issues: List[str]) -> Optional[str]:
+        """Rewrite a single section to resolve the given issues (None if the response didn't match it)"""
+        rewrites = {0: issues}
+        original = sections[0][1]
+        system_prompt, user_prompt, max_tokens = self._build_section_rewrite_prompts(sections, rewrites)
+        self._merge_rewrites(sections, rewrites, self._complete(system_prompt, user_prompt, max_tokens))
+        return sections[0][1] if sections[0][1] != original else None
+    
+    def _plan_patches(self, roadmap: str, feedback: str, prewritten: Optional[Dict[str, str]] = None
+                      ) -> Optional[Tuple[List[List[str]], Dict[int, List[str]]]]:
+        """
+        Apply the Refiner's direct replacements and collect the sections needing a rewrite
+        
+        Returns:
+            (sections, {section index: [issues]}) or None when the full-rewrite path is needed
+        """
+        patches = parse_patches(feedback)
+        if patches is None:
+            return None
+        
+        sections = split_sections(roadmap)
+        if not sections and patches:
+            return None
+        
+        rewrites = {}
+        for patch in patches:
+            index = _find_section(sections, str(patch['section']))
+            if index is None:
+                logger.info(f"Patch section not found, falling back to full refinement: {patch['section']}")
+                return None
+            
+            replacement = patch.get('replace_with')
+            if patch.get('needs_rewrite') or not isinstance(replacement, str) or not replacement.strip():
+                rewrites.setdefault(index, []).append(str(patch.get('issue', '')))
+                continue
+            
+            # Keep the original heading so later patches can still find the section
+            heading_line = sections[index][1].split('\n', 1)[0]
+            replacement = replacement.strip()
+            if not replacement.startswith('#'):
+                replacement = f"{heading_line}\n{replacement}"
+            sections[index][1] = replacement + "\n\n"
+        
+        # Sections rewritten ahead of time need no further model call
+        for index in [i for i in rewrites if (prewritten or {}).get(sections[i][0])]:
+            sections[index][1] = prewritten[sections[index][0]]
+            del rewrites[index]
+        
+        logger.info(f"Applied {len(patches) - sum(map(len, rewrites.values()))} patches locally, "
+                    f"{len(rewrites)} sections need a rewrite")
+        return sections, rewrites
+    
+    def _build_section_rewrite_prompts(self, sections: List[List[str]],
+                                       rewrites: Dict[int, List[str]]) -> Tuple[str, str, int]:
+        """Build a prompt that rewrites only the flagged sections"""
+        parts = []
+        for index, issues in rewrites.items():
+            issue_lines = "\n".join(f"- {issue}" for issue in issues if issue)
+            parts.append(f"ISSUES:\n{issue_lines}\n\nSECTION:\n{sections[index][1].strip()}")
+        section_text = "\n\n---\n\n".join(parts)
+        
+        user_prompt = _SECTION_REWRITE_USER_TEMPLATE.substitute(section_text=section_text)
+        # Rewritten sections stay close to their original size, allow 2x headroom
+        return _SECTION_REWRITE_SYSTEM_PROMPT, user_prompt, _dyn_max_tokens(section_text, ratio=2.0)
+    
+    def _merge_rewrites(self, sections: List[List[str]], rewrites: Dict[int, List[str]], response: str):
+        """Replace flagged sections with their rewritten versions from the model response"""
+        for heading, text in split_sections(response):
+            index = _find_section([sections[i] for i in rewrites], heading) if heading else None
+            if index is not None:
+                sections[list(rewrites)[index]][1] = text.rstrip() + "\n\n"
+    
+    def _build_refine_prompts(self, original_roadmap: str, refiner_feedback: str) -> Tuple[str, str]:
+        """Build the system and user prompts for a refinement pass"""
+        
+        user_prompt = _REFINE_USER_TEMPLATE.substitute(
+            original_roadmap=original_roadmap, refiner_feedback=refiner_feedback
+        )
+        return _REFINE_SYSTEM_PROMPT, user_prompt
+
+
+class RefinerAgent:
+    """Gemini Agent acting as the Refiner - Critical evaluation and improvement suggestions"""
+    
+    # Per-section critiques run here while the Strategist is still streaming
+    _section_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='section-critique')
+    
+    def __init__(self, bypass_cache: bool = False):
+        # Model handles are shared by every agent instance
+        self.model_name = Config.GEMINI_MODEL
+        self.model = get_gemini_model(self.model_name)
+        # Cheaper, faster model for presentation-only steps
+        self.fast_model_name = Config.FAST_GEMINI_MODEL
+        self.fast_model = get_gemini_model(self.fast_model_name)
+        self.temperature = Config.REFINER_TEMPERATURE
+        self.cache = get_prompt_cache().write_only() if bypass_cache else get_prompt_cache()
+        if Config.LLM_WARMUP:
+            threading.Thread(target=self._warmup, name='gemini-warmup', daemon=True).start()
+    
+    def _warmup(self):
+        """Pay the Gemini client's first-call setup off the request path"""
+        # The SDK builds its client and gRPC channel on the first call and shares them afterwards
+        try:
+            self.model.generate_content("ok", generation_config=self._generation_config(0.0, 1))
+        except Exception as e:
+            logger.warning(f"Gemini warm-up request failed: {e}")
+    
+    def analyze_roadmap(self, roadmap: str, iteration: int = 1) -> str:
+        """Analyze the roadmap and provide critical feedback and improvements"""
+        prompt = self._build_analysis_prompt(roadmap, iteration)
+        
+        try:
+            return self._generate(prompt, self.temperature, max_output_tokens=self._analysis_max_tokens(iteration))
+        except Exception as e:
+            logger.error(f"Refiner Agent error: {str(e)}")
+            raise
+    
+    def analyze_sections(self, sections: Iterable[str],
+                         on_patches: Optional[Callable[[str, List[Dict]], None]] = None) -> str:
+        """
+        Critique roadmap sections as they arrive, overlapping with their generation
+        
+        Args:
+            sections: Roadmap sections, e.g. from StrategistAgent.stream_initial_roadmap
+            on_patches: Called with each section and its patches as soon as its critique lands
+            
+        Returns:
+            Patch feedback in the same JSON form as analyze_roadmap's first iteration
+        """
+        def critique(section: str) -> str:
+            feedback = self._generate(self._build_section_prompt(section), self.temperature)
+            patches = parse_patches(feedback) if on_patches else None
+            if patches:
+                on_patches(section, patches)
+            return feedback
+        
+        futures = [self._section_pool.submit(critique, section) for section in sections if section.strip()]
+        
+        try:
+            patches = []
+            for future in futures:
+                patches.extend(parse_patches(future.result()) or [])
+            return json.dumps({'patches': patches})
+        except Exception as e:
+            logger.error(f"Refiner Agent error: {str(e)}")
+            raise
+    
+    async def aanalyze_sections(self, sections: Union[Iterable[str], AsyncIterator[str]]) -> str:
+        """Async variant of analyze_sections, critiquing every section concurrently"""
+        if not hasattr(sections, '__aiter__'):
+            sections = _as_async_iter(sections)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                # Each critique starts as soon as its section arrives, e.g. from astream_initial_roadmap
+                tasks = []
+                async for section in sections:
+                    if section.strip():
+                        tasks.append(tg.create_task(
+                            self._agenerate(self._build_section_prompt(section), self.temperature)
+                        ))
+        except* Exception as eg:
+            logger.error(f"Refiner Agent error: {str(eg.exceptions[0])}")
+            # The first failure, with its own type, rather than the group
+            raise eg.exceptions[0]
+        
+        patches = []
+        for task in tasks:
+            patches.extend(parse_patches(task.result()) or [])
+        return json.dumps({'patches': patches})
+    
+    def _build_section_prompt(self, section: str) -> str:
+        """Build the critique prompt for a single roadmap section"""
+        return _SECTION_CRITIQUE_TEMPLATE.substitute(section=section)
+    
+    async def aanalyze_roadmap(self, roadmap: str, iteration: int = 1) -> str:
+        """Async variant of analyze_roadmap"""
+        prompt = self._build_analysis_prompt(roadmap, iteration)
+        
+        try:
+            return await self._agenerate(prompt, self.temperature,
+                                         max_output_tokens=self._analysis_max_tokens(iteration))
+        except Exception as e:
+            logger.error(f"Refiner Agent error: {str(e)}")
+            raise
+    
+    def analyze_roadmaps_batch(self, roadmaps: List[str], iteration: int = 1) -> List[str]:
+        """
+        Analyze many roadmaps through the Gemini Batch API (offline runs only)
+        
+        Args:
+            roadmaps: Roadmaps to critique
+            iteration: Review iteration, as in analyze_roadmap
+            
+        Returns:
+            Feedback for each roadmap, in input order
+        """
+        prompts = [self._build_analysis_prompt(roadmap, iteration) for roadmap in roadmaps]
+        return self._generate_batch(prompts, self.temperature,
+                                    max_output_tokens=self._analysis_max_tokens(iteration))
+    
+    def final_evaluations_batch(self, final_roadmaps: List[str]) -> List[str]:
+        """Batch variant of final_evaluation through the Gemini Batch API (offline runs only)"""
+        prompts = [self._build_final_prompt(roadmap) for roadmap in final_roadmaps]
+        # One output cap applies to the whole batch, so size it for the longest roadmap
+        max_output_tokens = max((_dyn_max_tokens(roadmap, ratio=1.2) for roadmap in final_roadmaps), default=4000)
+        return self._generate_batch(prompts, 0.3, fast=True, max_output_tokens=max_output_tokens)
+    
+    def _generate_batch(self, prompts: List[str], temperature: float, fast: bool = False,
+                        max_output_tokens: int = 4000) -> List[str]:
+        """Batch variant of _generate, submitting only the prompts the cache can't answer"""
+        model_name = self.fast_model_name if fast else self.model_name
+        keys = [PromptCache.make_key(model_name, temperature, "", prompt) for prompt in prompts]
+        results = [self.cache.get(key) for key in keys]
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        if 0 < len(pending) < Config.BATCH_MIN_SIZE:
+            # Too few to be worth a batch job's turnaround, call the API directly
+            for i in pending:
+                results[i] = self._generate(prompts[i], temperature, fast, max_output_tokens)
+        elif pending:
+            try:
+                batch_results = run_gemini_batch(
+                    model_name, [prompts[i] for i in pending], temperature,
+                    max_output_tokens=max_output_tokens
+                )
+            except Exception as e:
+                logger.error(f"Refiner Agent batch error: {str(e)}")
+                raise
+            
+            for i, text in zip(pending, batch_results):
+                if text is None:
+                    raise Exception(f"Refiner Agent batch error: no response for request {i}")
+                self.cache.set(keys[i], text)
+                results[i] = text
+        
+        return results
+    
+    def _generate(self, prompt: str, temperature: float, fast: bool = False,
+                  max_output_tokens: int = 4000) -> str:
+        """Run a Gemini generation, serving repeats from the prompt cache"""
+        model_name, model = (self.fast_model_name, self.fast_model) if fast else (self.model_name, self.model)
+        key = PromptCache.make_key(model_name, temperature, "", prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        generation_config = self._generation_config(temperature, max_output_tokens)
+        gemini_limiter.acquire(estimate_tokens(prompt, max_output_tokens))
+        # The Gemini SDK has no per-request timeout, so bound the call from outside
+        response = with_retry(lambda: call_with_timeout(
+            lambda: model.generate_content(prompt, generation_config=generation_config)
+        ))
+        text = self._response_text(response)
+        self.cache.set(key, text)
+        return text
+    
+    async def _agenerate(self, prompt: str, temperature: float, fast: bool = False,
+                         max_output_tokens: int = 4000) -> str:
+        """Async variant of _generate"""
+        model_name, model = (self.fast_model_name, self.fast_model) if fast else (self.model_name, self.model)
+        key = PromptCache.make_key(model_name, temperature, "", prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        generation_config = self._generation_config(temperature, max_output_tokens)
+        await gemini_limiter.aacquire(estimate_tokens(prompt, max_output_tokens))
+        response = await awith_retry(
+            lambda: model.generate_content_async(prompt, generation_config=generation_config), provider='gemini'
+        )
+        text = self._response_text(response)
+        self.cache.set(key, text)
+        return text
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        """Join the first candidate's text parts in one pass"""
+        # response.text re-validates the response per access and rejects multi-part replies
+        candidates = response.candidates
+        if not candidates:
+            raise ValueError(f"Gemini returned no candidates: {response.prompt_feedback}")
+        parts = candidates[0].content.parts
+        if not parts:
+            # e.g. a SAFETY or RECITATION stop; an empty string would pass as the roadmap
+            raise ValueError(f"Gemini returned no text (finish reason {candidates[0].finish_reason})")
+        return "".join(part.text for part in parts)
+    
+    @staticmethod
+    def _generation_config(temperature: float, max_output_tokens: int = 4000) -> genai.types.GenerationConfig:
+        """Generation settings shared by the sync and async calls"""
+        return genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens
+        )
+    
+    @staticmethod
+    def _analysis_max_tokens(iteration: int) -> int:
+        """Output cap for a critique: patches can carry whole sections, the final review is short"""
+        return 4000 if iteration == 1 else 800
+    
+    def _build_analysis_prompt(self, roadmap: str, iteration: int) -> str:
+        """Build the critique prompt for the given iteration"""
+        
+        if iteration == 1:
+            return _ANALYSIS_TEMPLATE.substitute(roadmap=roadmap)
+        return _FINAL_REVIEW_TEMPLATE.substitute(roadmap=roadmap)
+    
+    def final_evaluation(self, final_roadmap: str) -> str:
+        """Provide final evaluation and present the polished roadmap"""
+        prompt = self._build_final_prompt(final_roadmap)
+        
+        try:
+            # Formatting only, so use the fast model at a lower temperature
+            return self._generate(prompt, 0.3, fast=True,
+                                  max_output_tokens=_dyn_max_tokens(final_roadmap, ratio=1.2))
+        except Exception as e:
+            logger.error(f"Refiner Agent final evaluation error: {str(e)}")
+            raise
+    
+    def stream_final_evaluation(self, final_roadmap: str) -> Iterator[str]:
+        """
+        Streaming variant of final_evaluation
+        
+        Yields:
+            Text pieces of the polished roadmap as Gemini generates them
+        """
+        prompt = self._build_final_prompt(final_roadmap)
+        key = PromptCache.make_key(self.fast_model_name, 0.3, "", prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        max_output_tokens = _dyn_max_tokens(final_roadmap, ratio=1.2)
+        generation_config = self._generation_config(0.3, max_output_tokens)
+        gemini_limiter.acquire(estimate_tokens(prompt, max_output_tokens))
+        try:
+            # Only opening the stream is retried; a stream that breaks midway fails the pass
+            response = with_retry(lambda: call_with_timeout(
+                lambda: self.fast_model.generate_content(prompt, generation_config=generation_config, stream=True)
+            ))
+            parts = []
+            for chunk in response:
+                # Trailing chunks may carry only finish metadata
+                text = self._response_text(chunk) if chunk.candidates and chunk.candidates[0].content.parts else ""
+                if text:
+                    parts.append(text)
+                    yield text
+            if not parts:
+                raise ValueError(f"Gemini returned no text: {response.prompt_feedback}")
+        except Exception as e:
+            logger.error(f"Refiner Agent final evaluation error: {str(e)}")
+            raise
+        
+        self.cache.set(key, "".join(parts))
+    
+    async def afinal_evaluation(self, final_roadmap: str) -> str:
+        """Async variant of final_evaluation"""
+        prompt = self._build_final_prompt(final_roadmap)
+        
+        try:
+            return await self._agenerate(prompt, 0.3, fast=True,
+                                         max_output_tokens=_dyn_max_tokens(final_roadmap, ratio=1.2))
         except Exception as e:
-            raise Exception(f"Refiner Agent final evaluation error: {str(e)}")
+            logger.error(f"Refiner Agent final evaluation error: {str(e)}")
+            raise
+    
+    def _build_final_prompt(self, final_roadmap: str) -> str:
+        """Build the presentation prompt for the final roadmap"""
+        return _PRESENTATION_TEMPLATE.substitute(final_roadmap=final_roadmap)
+
+
+@lru_cache(maxsize=2)
+def get_strategist_agent(bypass_cache: bool = False) -> StrategistAgent:
+    """Process-wide Strategist, shared by every orchestrator"""
+    return StrategistAgent(bypass_cache)
+
+
+@lru_cache(maxsize=2)
+def get_refiner_agent(bypass_cache: bool = False) -> RefinerAgent:
+    """Process-wide Refiner, shared by every orchestrator (so its warmup runs once per process)"""
+    return RefinerAgent(bypass_cache)
@@ -0,0 +1,279 @@
+"""
+Persistent cache of LLM completions
+Maps a hash of (model, temperature, system prompt, user prompt) to the response text
+in a local SQLite file so repeated runs over the same input skip the API call.
+SemanticCache extends this to rephrased inputs by comparing their embeddings.
+"""
+import hashlib
+import json
+import logging
+import math
+import operator
+import sqlite3
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+import openai
+from config import Config
+from llm_clients import with_retry
+
+# Optional: scores all of a scope's vectors in one matrix product instead of a Python loop
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+class PromptCache:
+    """Thread-safe SQLite cache of prompt -> completion text with a TTL"""
+
+    def __init__(self, path: str, ttl: int, enabled: bool = True):
+        self.path = path
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+        """Hash the request parameters that determine a completion"""
+        payload = json.dumps([model, temperature, system_prompt, user_prompt])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the database on first use; disable the cache if the path isn't writable"""
+        if self._conn is None and self.enabled:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS completions "
+                    "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("LLM cache disabled, could not open %s: %s", self.path, e)
+                self.enabled = False
+                self._conn = None
+        return self._conn
+
+    def get(self, key: str, ttl: Optional[int] = None) -> Optional[str]:
+        """Return the cached completion for key if present and younger than ttl (default self.ttl)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT response FROM completions WHERE key = ? AND created > ?",
+                    (key, time.time() - (self.ttl if ttl is None else ttl))
+                ).fetchone()
+            except sqlite3.Error as e:
+                # e.g. locked by another worker: the caller just makes the call
+                logger.warning("LLM cache lookup failed, treating as a miss: %s", e)
+                row = None
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if row:
+            logger.info("LLM cache hit")
+            return row[0]
+        return None
+
+    def set(self, key: str, response: str):
+        """Store a completion, replacing any expired entry for the same key"""
+        if not self.enabled or not response:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, response, created) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                # Don't leave a failed commit's transaction holding the write lock
+                conn.rollback()
+                logger.warning("LLM cache write skipped: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        """Lookups served and missed since the process started"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def write_only(self) -> "WriteOnlyCache":
+        """View of this cache that stores completions but never serves them"""
+        return WriteOnlyCache(self)
+
+
+class WriteOnlyCache:
+    """Cache view for callers that need fresh samples but should still record them"""
+
+    def __init__(self, cache: PromptCache):
+        self._cache = cache
+
+    def get(self, key: str) -> Optional[str]:
+        return None
+
+    def set(self, key: str, response: str):
+        self._cache.set(key, response)
+
+
+class SemanticCache:
+    """
+    SQLite cache of input embedding -> completion, served when a new input is close enough
+
+    Entries are grouped by scope (e.g. model and project type) so similar wording from
+    unrelated kinds of projects never matches. Lookups scan the scope's vectors (in one
+    matrix product when numpy is installed), which is fine for the few thousand entries
+    a single deployment accumulates.
+    """
+
+    def __init__(self, path: str, ttl: int, threshold: float, embed: Callable[[str], List[float]],
+                 enabled: bool = True):
+        self.path = path
+        self.ttl = ttl
+        self.threshold = threshold
+        # A miss embeds the same text again in add(), so remember recent embeddings
+        self.embed = lru_cache(maxsize=64)(embed)
+        self.enabled = enabled
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the database on first use; disable the cache if the path isn't writable"""
+        if self._conn is None and self.enabled:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_completions "
+                    "(scope TEXT NOT NULL, vector BLOB NOT NULL, response TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS semantic_scope ON semantic_completions (scope)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Semantic cache disabled, could not open %s: %s", self.path, e)
+                self.enabled = False
+                self._conn = None
+        return self._conn
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> array:
+        """Unit-length float32 vector, so cosine similarity is a plain dot product"""
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return array('f', (x / norm for x in vector))
+
+    def lookup(self, scope: str, text: str) -> Optional[str]:
+        """Return the completion stored for the most similar earlier input, if similar enough"""
+        if not self.enabled:
+            return None
+        try:
+            query = self._normalize(self.embed(text))
+        except Exception as e:
+            logger.warning("Semantic cache lookup skipped, embedding failed: %s", e)
+            return None
+
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                rows = conn.execute(
+                    "SELECT vector, response FROM semantic_completions WHERE scope = ? AND created > ?",
+                    (scope, time.time() - self.ttl)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning("Semantic cache lookup failed, treating as a miss: %s", e)
+                return None
+
+        best_score, best_response = self._best_match(query, rows)
+        if best_score >= self.threshold:
+            logger.info("Semantic cache hit (similarity %.3f)", best_score)
+            return best_response
+        return None
+
+    @staticmethod
+    def _best_match(query: array, rows: List[Tuple[bytes, str]]) -> Tuple[float, Optional[str]]:
+        """Highest dot product between query and the stored vectors, with its response"""
+        # Vectors from a different embedding model can't be compared, skip them
+        width = len(query) * query.itemsize
+        rows = [row for row in rows if len(row[0]) == width]
+        if not rows:
+            return 0.0, None
+        if np is not None:
+            matrix = np.frombuffer(b"".join(blob for blob, _ in rows), dtype=np.float32).reshape(len(rows), len(query))
+            scores = matrix @ np.frombuffer(query, dtype=np.float32)
+            best = int(scores.argmax())
+            return float(scores[best]), rows[best][1]
+        
+        best_score, best_response = 0.0, None
+        for blob, response in rows:
+            vector = array('f')
+            vector.frombytes(blob)
+            score = sum(map(operator.mul, query, vector))
+            if score > best_score:
+                best_score, best_response = score, response
+        return best_score, best_response
+    
+    def add(self, scope: str, text: str, response: str):
+        """Store a completion under the embedding of the input that produced it"""
+        if not self.enabled or not response:
+            return
+        try:
+            vector = self._normalize(self.embed(text))
+        except Exception as e:
+            logger.warning("Semantic cache store skipped, embedding failed: %s", e)
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT INTO semantic_completions (scope, vector, response, created) VALUES (?, ?, ?, ?)",
+                    (scope, vector.tobytes(), response, time.time())
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                # Don't leave a failed commit's transaction holding the write lock
+                conn.rollback()
+                logger.warning("Semantic cache write skipped: %s", e)
+
+
+@lru_cache(maxsize=1)
+def get_prompt_cache() -> PromptCache:
+    """Process-wide prompt cache shared by all agents"""
+    return PromptCache(
+        path=Config.LLM_CACHE_PATH,
+        ttl=Config.LLM_CACHE_TTL,
+        enabled=Config.LLM_CACHE_ENABLED
+    )
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide semantic cache for initial roadmaps, embedding inputs with OpenAI"""
+    def embed(text: str) -> List[float]:
+        response = with_retry(lambda: openai.Embedding.create(
+            model=Config.EMBEDDING_MODEL, input=text[:8000], request_timeout=Config.LLM_REQUEST_TIMEOUT
+        ))
+        return response['data'][0]['embedding']
+
+    return SemanticCache(
+        path=Config.LLM_CACHE_PATH,
+        ttl=Config.LLM_CACHE_TTL,
+        threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+        embed=embed,
+        enabled=Config.SEMANTIC_CACHE_ENABLED
+    )
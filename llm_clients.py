@@ -0,0 +1,239 @@
+"""
+Shared call helpers for the OpenAI and Gemini agents
+Bounds every model call with a timeout, retries transient failures with jittered backoff,
+paces calls under the providers' per-minute limits, and keeps one pool of keep-alive
+connections to OpenAI for the whole process
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import aiohttp
+import google.generativeai as genai
+import openai
+import requests
+from google.api_core import exceptions as google_exceptions
+from requests.adapters import HTTPAdapter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Failures worth retrying: stalled or dropped calls and temporary provider outages
+RETRYABLE_ERRORS = (
+    TimeoutError,
+    asyncio.TimeoutError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.RateLimitError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.ResourceExhausted,
+    requests.exceptions.ReadTimeout,
+    requests.exceptions.ConnectionError,
+)
+
+# Runs SDK calls that have no timeout option of their own; a call holds one of the slots
+# from submission until it actually returns, so none ever waits in the pool's queue
+_call_pool = ThreadPoolExecutor(max_workers=Config.LLM_CALL_WORKERS, thread_name_prefix='llm-call')
+_call_pool_slots = threading.BoundedSemaphore(Config.LLM_CALL_WORKERS)
+
+
+class _SharedSession(requests.Session):
+    """Session shared by every thread; the SDK's periodic per-thread recycling must not close it"""
+    
+    def close(self):
+        pass
+
+
+@lru_cache(maxsize=1)
+def _openai_session() -> requests.Session:
+    """Process-wide keep-alive session for the legacy OpenAI SDK"""
+    session = _SharedSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount('https://', adapter)
+    return session
+
+
+# aiohttp sessions are bound to the loop that created them
+_aio_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+# Likewise asyncio semaphores, one per provider per loop
+_call_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def configure_openai():
+    """Point the legacy OpenAI SDK at the shared session instead of one session per thread"""
+    openai.api_key = Config.OPENAI_API_KEY
+    openai.requestssession = _openai_session()
+
+
+def warm_openai_connection():
+    """Open a keep-alive connection to OpenAI in the background so the first call skips the TLS handshake"""
+    configure_openai()
+
+    def connect():
+        try:
+            _openai_session().head(f"{openai.api_base}/models", timeout=10,
+                                   headers={'Authorization': f"Bearer {Config.OPENAI_API_KEY}"})
+        except requests.exceptions.RequestException as e:
+            logger.info("OpenAI connection warm-up skipped: %s", e)
+
+    threading.Thread(target=connect, name='openai-warmup', daemon=True).start()
+
+
+def use_shared_aiosession():
+    """Reuse one aiohttp session per event loop for async OpenAI calls in the current context"""
+    # Without one the SDK opens, and TLS-handshakes, a fresh session for every acreate call
+    loop = asyncio.get_running_loop()
+    session = _aio_sessions.get(loop)
+    if session is None or session.closed:
+        # Calls come in bursts minutes apart: keep idle connections and resolved addresses longer
+        # than aiohttp's 15s / 10s defaults so the next burst skips the TLS handshake and DNS lookup
+        connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=60, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector)
+        _aio_sessions[loop] = session
+    openai.aiosession.set(session)
+
+
+def call_slot(provider: str) -> asyncio.Semaphore:
+    """Semaphore capping in-flight async calls to provider ('openai' or 'gemini') on the running loop"""
+    slots = _call_slots.setdefault(asyncio.get_running_loop(), {})
+    semaphore = slots.get(provider)
+    if semaphore is None:
+        limit = Config.OPENAI_MAX_CONCURRENCY if provider == 'openai' else Config.GEMINI_MAX_CONCURRENCY
+        semaphore = slots[provider] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+@lru_cache(maxsize=4)
+def get_gemini_model(model_name: str) -> genai.GenerativeModel:
+    """Process-wide Gemini model handle, configured on first use"""
+    genai.configure(api_key=Config.GEMINI_API_KEY)
+    return genai.GenerativeModel(model_name)
+
+
+class RateLimiter:
+    """Token bucket over requests and tokens per minute; a limit of 0 leaves that dimension unpaced"""
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self, tokens: int) -> float:
+        """Take capacity for one call, returning how long the caller must wait before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._updated = now - self._updated, now
+            delay = 0.0
+            # Buckets may go negative: later callers queue up behind the debt
+            if self.rpm:
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60) - 1
+                delay = max(delay, -self._requests * 60 / self.rpm)
+            if self.tpm:
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60) - min(tokens, self.tpm)
+                delay = max(delay, -self._tokens * 60 / self.tpm)
+            return delay
+    
+    def acquire(self, tokens: int = 0):
+        """Block until a call using about this many tokens fits under the limits"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            logger.info("Rate limit pacing, waiting %.1fs", delay)
+            time.sleep(delay)
+    
+    async def aacquire(self, tokens: int = 0):
+        """Async variant of acquire"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            logger.info("Rate limit pacing, waiting %.1fs", delay)
+            await asyncio.sleep(delay)
+
+
+# One budget per provider, shared by every agent in the process
+openai_limiter = RateLimiter(Config.OPENAI_RPM, Config.OPENAI_TPM)
+gemini_limiter = RateLimiter(Config.GEMINI_RPM, Config.GEMINI_TPM)
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    """Rough token cost of a call (about 4 characters per prompt token, plus the output cap)"""
+    return len(prompt) // 4 + max_output_tokens
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt"""
+    return random.uniform(0, Config.LLM_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+
+
+def call_with_timeout(fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+    """
+    Run a blocking call, giving up on it after timeout seconds of running
+    
+    A call that times out can't be interrupted and keeps its worker until it returns, so
+    while every worker is busy (e.g. retries piling up behind a provider stall) new calls
+    wait for one to free up rather than starting their timeout in the pool's queue
+    """
+    timeout = Config.LLM_REQUEST_TIMEOUT if timeout is None else timeout
+    if not _call_pool_slots.acquire(blocking=False):
+        logger.warning("All %d LLM call workers busy, waiting for one to free up", Config.LLM_CALL_WORKERS)
+        _call_pool_slots.acquire()
+    
+    def run() -> T:
+        try:
+            return fn()
+        finally:
+            _call_pool_slots.release()
+    
+    future = _call_pool.submit(run)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"LLM call exceeded {timeout}s")
+
+
+def with_retry(fn: Callable[[], T], attempts: Optional[int] = None) -> T:
+    """Call fn, retrying retryable errors with backoff and re-raising the last one"""
+    attempts = attempts or Config.LLM_MAX_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == attempts:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning("LLM call failed (%s), retry %d/%d in %.1fs", type(e).__name__, attempt, attempts - 1, delay)
+            time.sleep(delay)
+
+
+async def awith_retry(fn: Callable[[], Awaitable[T]], attempts: Optional[int] = None,
+                      timeout: Optional[float] = None, provider: Optional[str] = None) -> T:
+    """
+    Async variant of with_retry; fn is called per attempt and bounded by timeout
+    
+    With a provider, each attempt first waits for one of its call_slot places, which is
+    released again during the backoff so waiting retries don't hold back other calls
+    """
+    attempts = attempts or Config.LLM_MAX_ATTEMPTS
+    timeout = Config.LLM_REQUEST_TIMEOUT if timeout is None else timeout
+    for attempt in range(1, attempts + 1):
+        try:
+            if provider is None:
+                return await asyncio.wait_for(fn(), timeout=timeout)
+            async with call_slot(provider):
+                return await asyncio.wait_for(fn(), timeout=timeout)
+        except RETRYABLE_ERRORS as e:
+            if attempt == attempts:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning("LLM call failed (%s), retry %d/%d in %.1fs", type(e).__name__, attempt, attempts - 1, delay)
+            await asyncio.sleep(delay)
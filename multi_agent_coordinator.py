@@ -3,303 +3,575 @@ Multi-Agent Coordinator for Complex AI System Design
 Orchestrates specialized agents for comprehensive project analysis
 """
 import logging
-from typing import Dict, List, Optional
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
+from functools import lru_cache
 import asyncio
-import json
-from specialized_agents import (
-    MarketResearchAgent, 
-    TechnicalArchitectAgent, 
-    AISpecialistAgent, 
-    BusinessStrategyAgent, 
-    ImplementationAgent
-)
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from batch_jobs import run_gemini_batch, run_openai_batch
+from config import Config
+from llm_cache import PromptCache, get_prompt_cache, get_semantic_cache
+from response_cache import SingleFlight
+from specialized_agents import AgentAnalyses, get_complex_agents
 
 logger = logging.getLogger(__name__)
 
+# Line patterns for _format_lines; [^\S\n] is whitespace other than a line break
+_HEADING_LINE_RE = re.compile(r'^#{1,4}[^\S\n]*(.*)$', re.MULTILINE)
+_LABEL_LINE_RE = re.compile(r'^(?!#|- |\* )(.{0,98}:)$', re.MULTILINE)
+
+
+def _format_lines(content: str) -> str:
+    """Apply the section formatting to whole lines of agent output"""
+    if not content:
+        return content
+    
+    # Strip line padding with str methods: a regex would try a match at every single character
+    formatted = "\n".join(line.strip() for line in content.split("\n"))
+    # Convert headers of any level to proper markdown subsections
+    formatted = _HEADING_LINE_RE.sub(r'### \1', formatted)
+    # Bold short label lines ("Phase 1:") that aren't list items
+    return _LABEL_LINE_RE.sub(r'**\1**', formatted)
+
+
+# Agent -> (result field, section title, section type) for the roadmap sections, in roadmap order
+_ROADMAP_SECTIONS = {
+    'market_research': ('analysis', "📊 Market Opportunity Analysis", "Market Analysis"),
+    'technical_architect': ('architecture', "🏗️ Technical Architecture & System Design", "Technical Architecture"),
+    'ai_specialist': ('ai_design', "🤖 AI/ML Models & Algorithms", "AI/ML Design"),
+    'business_strategy': ('strategy', "💼 Business Strategy & Monetization", "Business Strategy"),
+    'implementation': ('implementation_plan', "🎯 Implementation Plan & Execution", "Implementation Plan"),
+}
+
+# Stands in for the content of a section whose agent failed
+_FAILED_SECTION_NOTE = "> ⚠️ This section could not be generated (the agent failed after retries)."
+
+# Agents that run on Gemini; the rest go through OpenAI
+_GEMINI_AGENTS = {'ai_specialist', 'implementation'}
+
+# Static parts of the synthesized roadmap, around the per-agent sections
+_ROADMAP_HEADER = """# 🚀 AI Market Research System: Comprehensive Project Roadmap
+
+## 📋 Executive Summary
+This roadmap presents a **comprehensive plan** for developing an advanced AI-powered market research system with specialized multi-agent architecture for identifying untapped market opportunities and generating profitable business ideas.
+
+---
+
+"""
+
+_ROADMAP_FOOTER = """## 🤖 Multi-Agent System Architecture Summary
+
+### 🎯 **Specialized Agent Roles:**
+
+| Agent | Primary Function | Key Capabilities |
+|-------|------------------|------------------|
+| 📊 **Market Research Agent** | Market Intelligence | Scans global markets, identifies trends, analyzes gaps |
+| 🏗️ **Technical Architect Agent** | System Design | Designs scalable architecture and infrastructure |
+| 🤖 **AI Specialist Agent** | ML/AI Development | Develops and optimizes machine learning models |
+| 💼 **Business Strategy Agent** | Strategic Planning | Creates monetization and go-to-market strategies |
+| 🎯 **Implementation Agent** | Project Execution | Coordinates development, deployment, and operations |
+
+### 🔄 **Agent Coordination Workflow:**
+
+```mermaid
+graph TD
+    A[Daily Market Scanning] --> B[Data Analysis & Processing]
+    B --> C[Opportunity Identification]
+    C --> D[Feasibility Assessment]
+    D --> E[Business Validation]
+    E --> F[Idea Generation & Ranking]
+    F --> G[Implementation Planning]
+    G --> H[Continuous Learning Loop]
+    H --> A
+```
+
+### 📈 **Success Metrics & KPIs:**
+
+| Metric Category | Key Indicators | Target Performance |
+|-----------------|----------------|-------------------|
+| 💡 **Idea Quality** | Market potential, uniqueness, feasibility scores | 8.5+ out of 10 |
+| 🚀 **Implementation Success** | Conversion rate from idea to profitable product | 60%+ success rate |
+| 🎯 **Market Accuracy** | Prediction accuracy for trends and opportunities | 85%+ accuracy |
+| 💰 **Revenue Generation** | ROI from implemented ideas and products | $10M+ ARR target |
+
+---
+
+## 🎉 **Project Completion Summary**
+
+This comprehensive roadmap provides a **complete blueprint** for building a sophisticated AI-driven market research and opportunity identification system. The multi-agent architecture ensures:
+
+✅ **Comprehensive Analysis** across all business domains
+✅ **Scalable Architecture** for enterprise-grade deployment
+✅ **Advanced AI/ML Models** for accurate predictions
+✅ **Profitable Business Model** with multiple revenue streams
+✅ **Clear Implementation Path** with defined milestones
+
+**Ready for implementation with high potential for market success!** 🚀"""
+
+@dataclass(slots=True, frozen=True)
+class WorkflowEntry:
+    """One agent run in the workflow history; orjson serializes it like the dict it replaces"""
+    agent: str
+    timestamp: str
+    success: bool
+    confidence: float
+    content_length: int
+
+
+@dataclass(slots=True)
+class AnalysisRun:
+    """State of one analysis, kept per call so a single coordinator can serve concurrent requests"""
+    results: Dict[str, Dict] = field(default_factory=dict)
+    content_lengths: Dict[str, int] = field(default_factory=dict)
+    history: List[WorkflowEntry] = field(default_factory=list)
+
+
 class MultiAgentCoordinator:
     """Coordinates multiple specialized agents for complex project analysis"""
     
+    # Runs the phases that don't depend on each other side by side
+    _phase_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='agent-phase')
+    # Identical agent calls in flight on other threads, shared with the first caller
+    _inflight = SingleFlight(timeout=Config.SINGLE_FLIGHT_TIMEOUT)
+    
     def __init__(self):
-        self.agents = {
-            'market_research': MarketResearchAgent(),
-            'technical_architect': TechnicalArchitectAgent(),
-            'ai_specialist': AISpecialistAgent(),
-            'business_strategy': BusinessStrategyAgent(),
-            'implementation': ImplementationAgent()
-        }
-        self.analysis_results = {}
-        self.workflow_history = []
+        self.agents = get_complex_agents()
+        self.cache = get_prompt_cache()
+        self.semantic_cache = get_semantic_cache()
     
-    def analyze_complex_project(self, project_description: str) -> Dict:
-        """Coordinate multiple agents to analyze complex AI projects"""
+    def analyze_complex_project(self, project_description: str, include_analyses: bool = False) -> Dict:
+        """
+        Coordinate multiple agents to analyze complex AI projects
+        
+        Args:
+            project_description: The complex AI project to analyze
+            include_analyses: Also return the raw agent analyses and workflow history; they
+                roughly double the payload and no caller of the roadmap needs them
+            
+        Returns:
+            Dict with the comprehensive roadmap and run metadata
+        """
         
         logger.info("Starting multi-agent complex project analysis")
-        start_time = datetime.now()
+        start_time = time.perf_counter()
+        run = AnalysisRun()
         
         try:
             # Phase 1: Market Research Analysis
             logger.info("Phase 1: Market Research Agent analyzing opportunity")
-            market_result = self.agents['market_research'].analyze_market_opportunity(project_description)
-            self.analysis_results['market_research'] = market_result
-            self._log_agent_result('market_research', market_result)
+            market_result = self._call_agent(
+                'market_research', project_description,
+                self.agents['market_research'].analyze_market_opportunity, project_description
+            )
+            self._record_result(run, 'market_research', market_result)
             
             # Phase 2: Technical Architecture Design
             logger.info("Phase 2: Technical Architect designing system architecture")
             market_analysis = market_result.get('analysis', '')
-            tech_result = self.agents['technical_architect'].design_system_architecture(
-                project_description, market_analysis
+            tech_result = self._call_agent(
+                'technical_architect', project_description,
+                self.agents['technical_architect'].design_system_architecture, project_description, market_analysis
             )
-            self.analysis_results['technical_architect'] = tech_result
-            self._log_agent_result('technical_architect', tech_result)
+            self._record_result(run, 'technical_architect', tech_result)
             
-            # Phase 3: AI/ML Model Design
-            logger.info("Phase 3: AI Specialist designing AI/ML models")
+            # Phases 3 and 4 both build on the architecture only, so they run side by side
+            logger.info("Phases 3-4: AI Specialist and Business Strategy Agent working concurrently")
             architecture = tech_result.get('architecture', '')
-            ai_result = self.agents['ai_specialist'].design_ai_models(
-                project_description, architecture
+            ai_future = self._phase_pool.submit(
+                self._call_agent, 'ai_specialist', project_description,
+                self.agents['ai_specialist'].design_ai_models, project_description, architecture
             )
-            self.analysis_results['ai_specialist'] = ai_result
-            self._log_agent_result('ai_specialist', ai_result)
-            
-            # Phase 4: Business Strategy Development
-            logger.info("Phase 4: Business Strategy Agent developing strategy")
-            business_result = self.agents['business_strategy'].develop_business_strategy(
+            business_future = self._phase_pool.submit(
+                self._call_agent, 'business_strategy', project_description,
+                self.agents['business_strategy'].develop_business_strategy,
                 project_description, market_analysis, architecture
             )
-            self.analysis_results['business_strategy'] = business_result
-            self._log_agent_result('business_strategy', business_result)
+            self._record_result(run, 'ai_specialist', ai_future.result())
+            self._record_result(run, 'business_strategy', business_future.result())
             
             # Phase 5: Implementation Planning
             logger.info("Phase 5: Implementation Agent creating execution plan")
-            implementation_result = self.agents['implementation'].create_implementation_plan(
-                self.analysis_results
+            implementation_result = self._call_agent(
+                'implementation', project_description,
+                self.agents['implementation'].create_implementation_plan, AgentAnalyses.from_results(run.results)
             )
-            self.analysis_results['implementation'] = implementation_result
-            self._log_agent_result('implementation', implementation_result)
-            
-            # Generate comprehensive roadmap
-            final_roadmap = self._synthesize_comprehensive_roadmap()
+            self._record_result(run, 'implementation', implementation_result)
             
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
+            return self._build_result(run, start_time, include_analyses=include_analyses)
             
-            logger.info("Multi-agent complex project analysis completed successfully")
-            
-            return {
-                'roadmap': final_roadmap,
-                'metadata': {
-                    'processing_type': 'multi_agent_complex',
-                    'agents_used': list(self.agents.keys()),
-                    'processing_time': processing_time,
-                    'timestamp': datetime.now().isoformat(),
-                    'total_tokens': self._estimate_total_tokens(),
-                    'confidence_scores': self._get_confidence_scores()
-                },
-                'agent_analyses': self.analysis_results,
-                'workflow_history': self.workflow_history
-            }
+        except Exception as e:
+            logger.error("Error in multi-agent complex analysis: %s", e)
+            raise Exception(f"Multi-agent complex analysis failed: {str(e)}")
+    
+    async def aanalyze_complex_project(self, project_description: str, include_analyses: bool = False) -> Dict:
+        """Async variant of analyze_complex_project for use inside an event loop"""
+        
+        logger.info("Starting multi-agent complex project analysis")
+        start_time = time.perf_counter()
+        
+        try:
+            run = AnalysisRun()
+            pieces = [piece async for piece in self._astream_roadmap(run, project_description)]
+            return self._build_result(run, start_time, "".join(pieces), include_analyses)
             
         except Exception as e:
-            logger.error(f"Error in multi-agent complex analysis: {str(e)}")
+            logger.error("Error in multi-agent complex analysis: %s", e)
             raise Exception(f"Multi-agent complex analysis failed: {str(e)}")
     
-    def _synthesize_comprehensive_roadmap(self) -> str:
-        """Synthesize all agent analyses into a comprehensive roadmap"""
+    async def astream_complex_roadmap(self, project_description: str) -> AsyncIterator[str]:
+        """
+        Run the agent phases, streaming each roadmap section as its agent generates it
+        
+        Args:
+            project_description: The complex AI project to analyze
+            
+        Yields:
+            Markdown pieces in roadmap order; joined they form the comprehensive roadmap
+        """
+        async for piece in self._astream_roadmap(AnalysisRun(), project_description):
+            yield piece
+    
+    async def _astream_roadmap(self, run: AnalysisRun, project_description: str) -> AsyncIterator[str]:
+        """astream_complex_roadmap, recording the agents' results in run"""
+        yield _ROADMAP_HEADER
         
-        roadmap_sections = []
+        logger.info("Phase 1: Market Research Agent analyzing opportunity")
+        async for piece in self._astream_section(run, 'market_research', project_description, project_description):
+            yield piece
         
-        # Executive Summary with enhanced formatting
-        roadmap_sections.append("# 🚀 AI Market Research System: Comprehensive Project Roadmap")
-        roadmap_sections.append("")
-        roadmap_sections.append("## 📋 Executive Summary")
-        roadmap_sections.append("This roadmap presents a **comprehensive plan** for developing an advanced AI-powered market research system with specialized multi-agent architecture for identifying untapped market opportunities and generating profitable business ideas.")
-        roadmap_sections.append("")
-        roadmap_sections.append("---")
-        roadmap_sections.append("")
+        logger.info("Phase 2: Technical Architect designing system architecture")
+        market_analysis = run.results['market_research'].get('analysis', '')
+        async for piece in self._astream_section(run, 'technical_architect', project_description,
+                                                  project_description, market_analysis):
+            yield piece
         
-        # Market Opportunity Analysis with better structure
-        if 'market_research' in self.analysis_results:
-            market_data = self.analysis_results['market_research']
-            if 'analysis' in market_data:
-                roadmap_sections.append("## 📊 Market Opportunity Analysis")
-                roadmap_sections.append("")
-                # Format the market analysis content better
-                market_content = market_data['analysis']
-                formatted_content = self._format_section_content(market_content, "Market Analysis")
-                roadmap_sections.append(formatted_content)
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        logger.info("Phases 3-4: AI Specialist and Business Strategy Agent working concurrently")
+        architecture = run.results['technical_architect'].get('architecture', '')
+        # Only one section can stream at a time, so the business one runs as a plain call alongside
+        business_task = asyncio.create_task(self._acall_agent(
+            'business_strategy', project_description,
+            self.agents['business_strategy'].adevelop_business_strategy,
+            project_description, market_analysis, architecture
+        ))
+        try:
+            async for piece in self._astream_section(run, 'ai_specialist', project_description,
+                                                      project_description, architecture):
+                yield piece
+            business_result = await business_task
+        finally:
+            # A failed or abandoned stream must not leave the paid call running unobserved
+            if not business_task.done():
+                business_task.cancel()
+            elif not business_task.cancelled():
+                business_task.exception()  # Marks a failure as retrieved; the stream's own error is raised
+        self._record_result(run, 'business_strategy', business_result)
+        yield self._render_section(run, 'business_strategy')
         
-        # Technical Architecture with enhanced presentation
-        if 'technical_architect' in self.analysis_results:
-            tech_data = self.analysis_results['technical_architect']
-            if 'architecture' in tech_data:
-                roadmap_sections.append("## 🏗️ Technical Architecture & System Design")
-                roadmap_sections.append("")
-                tech_content = tech_data['architecture']
-                formatted_content = self._format_section_content(tech_content, "Technical Architecture")
-                roadmap_sections.append(formatted_content)
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        logger.info("Phase 5: Implementation Agent creating execution plan")
+        async for piece in self._astream_section(run, 'implementation', project_description,
+                                                  AgentAnalyses.from_results(run.results)):
+            yield piece
         
-        # AI/ML Model Design with better formatting
-        if 'ai_specialist' in self.analysis_results:
-            ai_data = self.analysis_results['ai_specialist']
-            if 'ai_design' in ai_data:
-                roadmap_sections.append("## 🤖 AI/ML Models & Algorithms")
-                roadmap_sections.append("")
-                ai_content = ai_data['ai_design']
-                formatted_content = self._format_section_content(ai_content, "AI/ML Design")
-                roadmap_sections.append(formatted_content)
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        yield _ROADMAP_FOOTER
+    
+    async def _astream_section(self, run: AnalysisRun, agent_name: str, project_description: str,
+                               *args) -> AsyncIterator[str]:
+        """
+        Stream one agent's roadmap section as its tokens arrive, recording the result once it ends
         
-        # Business Strategy with enhanced structure
-        if 'business_strategy' in self.analysis_results:
-            business_data = self.analysis_results['business_strategy']
-            if 'strategy' in business_data:
-                roadmap_sections.append("## 💼 Business Strategy & Monetization")
-                roadmap_sections.append("")
-                business_content = business_data['strategy']
-                formatted_content = self._format_section_content(business_content, "Business Strategy")
-                roadmap_sections.append(formatted_content)
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
-                roadmap_sections.append("")
+        Args:
+            run: The analysis the result is recorded in
+            agent_name: Key of the agent in self.agents
+            project_description: Text compared against earlier projects for semantic hits
+            *args: Arguments for the agent's request, as for _call_agent
+            
+        Yields:
+            Pieces of the section that join to what _render_section gives for the same result
+        """
+        key = self._cache_key(agent_name, args)
+        # Cache lookups may embed the input, keep them off the event loop
+        cached = await asyncio.to_thread(self._cached_result, agent_name, key, project_description)
+        if cached is not None:
+            self._record_result(run, agent_name, cached)
+            yield self._render_section(run, agent_name)
+            return
         
-        # Implementation Plan with enhanced formatting
-        if 'implementation' in self.analysis_results:
-            impl_data = self.analysis_results['implementation']
-            if 'implementation_plan' in impl_data:
-                roadmap_sections.append("## 🎯 Implementation Plan & Execution")
-                roadmap_sections.append("")
-                impl_content = impl_data['implementation_plan']
-                formatted_content = self._format_section_content(impl_content, "Implementation Plan")
-                roadmap_sections.append(formatted_content)
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        _, title, _ = _ROADMAP_SECTIONS[agent_name]
+        agent = self.agents[agent_name]
+        yield f"## {title}\n\n"
         
-        # Multi-Agent System Summary with enhanced presentation
-        roadmap_sections.append("## 🤖 Multi-Agent System Architecture Summary")
-        roadmap_sections.append("")
-        roadmap_sections.append("### 🎯 **Specialized Agent Roles:**")
-        roadmap_sections.append("")
-        roadmap_sections.append("| Agent | Primary Function | Key Capabilities |")
-        roadmap_sections.append("|-------|------------------|------------------|")
-        roadmap_sections.append("| 📊 **Market Research Agent** | Market Intelligence | Scans global markets, identifies trends, analyzes gaps |")
-        roadmap_sections.append("| 🏗️ **Technical Architect Agent** | System Design | Designs scalable architecture and infrastructure |")
-        roadmap_sections.append("| 🤖 **AI Specialist Agent** | ML/AI Development | Develops and optimizes machine learning models |")
-        roadmap_sections.append("| 💼 **Business Strategy Agent** | Strategic Planning | Creates monetization and go-to-market strategies |")
-        roadmap_sections.append("| 🎯 **Implementation Agent** | Project Execution | Coordinates development, deployment, and operations |")
-        roadmap_sections.append("")
-        roadmap_sections.append("### 🔄 **Agent Coordination Workflow:**")
-        roadmap_sections.append("")
-        roadmap_sections.append("```mermaid")
-        roadmap_sections.append("graph TD")
-        roadmap_sections.append("    A[Daily Market Scanning] --> B[Data Analysis & Processing]")
-        roadmap_sections.append("    B --> C[Opportunity Identification]")
-        roadmap_sections.append("    C --> D[Feasibility Assessment]")
-        roadmap_sections.append("    D --> E[Business Validation]")
-        roadmap_sections.append("    E --> F[Idea Generation & Ranking]")
-        roadmap_sections.append("    F --> G[Implementation Planning]")
-        roadmap_sections.append("    G --> H[Continuous Learning Loop]")
-        roadmap_sections.append("    H --> A")
-        roadmap_sections.append("```")
-        roadmap_sections.append("")
-        roadmap_sections.append("### 📈 **Success Metrics & KPIs:**")
-        roadmap_sections.append("")
-        roadmap_sections.append("| Metric Category | Key Indicators | Target Performance |")
-        roadmap_sections.append("|-----------------|----------------|-------------------|")
-        roadmap_sections.append("| 💡 **Idea Quality** | Market potential, uniqueness, feasibility scores | 8.5+ out of 10 |")
-        roadmap_sections.append("| 🚀 **Implementation Success** | Conversion rate from idea to profitable product | 60%+ success rate |")
-        roadmap_sections.append("| 🎯 **Market Accuracy** | Prediction accuracy for trends and opportunities | 85%+ accuracy |")
-        roadmap_sections.append("| 💰 **Revenue Generation** | ROI from implemented ideas and products | $10M+ ARR target |")
-        roadmap_sections.append("")
-        roadmap_sections.append("---")
-        roadmap_sections.append("")
-        roadmap_sections.append("## 🎉 **Project Completion Summary**")
-        roadmap_sections.append("")
-        roadmap_sections.append("This comprehensive roadmap provides a **complete blueprint** for building a sophisticated AI-driven market research and opportunity identification system. The multi-agent architecture ensures:")
-        roadmap_sections.append("")
-        roadmap_sections.append("✅ **Comprehensive Analysis** across all business domains")
-        roadmap_sections.append("✅ **Scalable Architecture** for enterprise-grade deployment")
-        roadmap_sections.append("✅ **Advanced AI/ML Models** for accurate predictions")
-        roadmap_sections.append("✅ **Profitable Business Model** with multiple revenue streams")
-        roadmap_sections.append("✅ **Clear Implementation Path** with defined milestones")
-        roadmap_sections.append("")
-        roadmap_sections.append("**Ready for implementation with high potential for market success!** 🚀")
+        parts = []
+        buffer = ""
+        try:
+            async for delta in agent.astream(*args):
+                parts.append(delta)
+                # Formatting works line by line, so finished lines can go out right away
+                head, newline, buffer = (buffer + delta).rpartition('\n')
+                if newline:
+                    yield _format_lines(head + newline)
+        except Exception as e:
+            self._record_result(run, agent_name, {"error": f"{agent_name} stream failed: {str(e)}"})
+            # Keep what already streamed and flag the rest as missing
+            partial = _format_lines(buffer) + "\n\n" if parts else ""
+            yield f"{partial}{_FAILED_SECTION_NOTE}\n\n---\n\n"
+            return
         
-        return "\n".join(roadmap_sections)
+        result = agent.make_result("".join(parts))
+        await asyncio.to_thread(self._store_result, agent_name, key, project_description, result)
+        self._record_result(run, agent_name, result)
+        yield f"{_format_lines(buffer)}\n\n---\n\n"
     
-    def _format_section_content(self, content: str, section_type: str) -> str:
-        """Format section content with better structure and readability"""
-        if not content:
-            return content
+    def analyze_complex_projects_batch(self, project_descriptions: List[str],
+                                       include_analyses: bool = False) -> List[Dict]:
+        """
+        Batch variant of analyze_complex_project over many projects (offline runs only)
+        
+        Each phase depends on the one before it, so a project can't go out as a single job;
+        instead every phase is one batch job across all projects, with phases 3 and 4 submitted
+        side by side. Each job may take hours to finish.
+        
+        Args:
+            project_descriptions: The complex AI projects to analyze
+            include_analyses: As for analyze_complex_project
+            
+        Returns:
+            One analyze_complex_project result per project, in input order
+        """
+        logger.info("Starting batch multi-agent analysis for %d projects", len(project_descriptions))
+        start_time = time.perf_counter()
+        
+        try:
+            logger.info("Phase 1: Market Research Agent batch")
+            market_results = self._call_agent_batch(
+                'market_research', project_descriptions,
+                self.agents['market_research'].analyze_market_opportunity,
+                [(project_description,) for project_description in project_descriptions]
+            )
+            market_analyses = [result.get('analysis', '') for result in market_results]
+            
+            logger.info("Phase 2: Technical Architect batch")
+            tech_results = self._call_agent_batch(
+                'technical_architect', project_descriptions,
+                self.agents['technical_architect'].design_system_architecture,
+                list(zip(project_descriptions, market_analyses))
+            )
+            architectures = [result.get('architecture', '') for result in tech_results]
+            
+            logger.info("Phases 3-4: AI Specialist and Business Strategy batches running concurrently")
+            ai_future = self._phase_pool.submit(
+                self._call_agent_batch, 'ai_specialist', project_descriptions,
+                self.agents['ai_specialist'].design_ai_models,
+                list(zip(project_descriptions, architectures))
+            )
+            business_future = self._phase_pool.submit(
+                self._call_agent_batch, 'business_strategy', project_descriptions,
+                self.agents['business_strategy'].develop_business_strategy,
+                list(zip(project_descriptions, market_analyses, architectures))
+            )
+            analyses = [
+                {'market_research': market, 'technical_architect': tech, 'ai_specialist': ai, 'business_strategy': business}
+                for market, tech, ai, business in zip(market_results, tech_results, ai_future.result(), business_future.result())
+            ]
+            
+            logger.info("Phase 5: Implementation Agent batch")
+            implementation_results = self._call_agent_batch(
+                'implementation', project_descriptions,
+                self.agents['implementation'].create_implementation_plan,
+                [(AgentAnalyses.from_results(analysis),) for analysis in analyses]
+            )
+        except Exception as e:
+            logger.error("Error in batch multi-agent analysis: %s", e)
+            raise Exception(f"Multi-agent batch analysis failed: {str(e)}") from e
+        
+        results = []
+        for analysis, implementation_result in zip(analyses, implementation_results):
+            run = AnalysisRun()
+            for agent_name, result in analysis.items():
+                self._record_result(run, agent_name, result)
+            self._record_result(run, 'implementation', implementation_result)
+            results.append(self._build_result(run, start_time, include_analyses=include_analyses))
+        return results
+    
+    def _call_agent(self, agent_name: str, project_description: str,
+                    method: Callable[..., Dict], *args) -> Dict:
+        """
+        Run one agent phase, serving a stored result for the same inputs or a close rephrasing
+        
+        Args:
+            agent_name: Key of the agent in self.agents, which scopes its cache entries
+            project_description: Text compared against earlier projects for semantic hits
+            method: The agent method to call on a miss
+            *args: The method's arguments; they key the exact-match lookup
             
-        # Add proper spacing and structure
-        lines = content.split('\n')
-        formatted_lines = []
+        Returns:
+            The agent's result dict
+        """
+        key = self._cache_key(agent_name, args)
+        cached = self._cached_result(agent_name, key, project_description)
+        if cached is not None:
+            return cached
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                formatted_lines.append("")
-                continue
-                
-            # Convert headers to proper markdown
-            if line.startswith('####'):
-                formatted_lines.append(f"### {line[4:].strip()}")
-            elif line.startswith('###'):
-                formatted_lines.append(f"### {line[3:].strip()}")
-            elif line.startswith('##'):
-                formatted_lines.append(f"### {line[2:].strip()}")
-            elif line.startswith('#'):
-                formatted_lines.append(f"### {line[1:].strip()}")
+        def run() -> Dict:
+            result = method(*args)
+            self._store_result(agent_name, key, project_description, result)
+            return result
+        
+        # A concurrent request for the same call waits for this one instead of paying for it again
+        return self._inflight.do(key.encode(), run)
+    
+    async def _acall_agent(self, agent_name: str, project_description: str,
+                           method: Callable[..., Awaitable[Dict]], *args) -> Dict:
+        """Async variant of _call_agent, awaiting the agent's async method on a miss"""
+        key = self._cache_key(agent_name, args)
+        # Cache lookups may embed the input, keep them off the event loop
+        cached = await asyncio.to_thread(self._cached_result, agent_name, key, project_description)
+        if cached is not None:
+            return cached
+        
+        result = await method(*args)
+        await asyncio.to_thread(self._store_result, agent_name, key, project_description, result)
+        return result
+    
+    def _call_agent_batch(self, agent_name: str, project_descriptions: List[str],
+                          method: Callable[..., Dict], args_list: List[tuple]) -> List[Dict]:
+        """Batch variant of _call_agent: one batch job covers every input the caches can't answer"""
+        keys = [self._cache_key(agent_name, args) for args in args_list]
+        results = [self._cached_result(agent_name, key, project_description)
+                   for key, project_description in zip(keys, project_descriptions)]
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        if 0 < len(pending) < Config.BATCH_MIN_SIZE:
+            # Too few to be worth a batch job's turnaround, call the agent directly
+            for i in pending:
+                results[i] = method(*args_list[i])
+                self._store_result(agent_name, keys[i], project_descriptions[i], results[i])
+        elif pending:
+            agent = self.agents[agent_name]
+            requests = [agent.build_request(*args_list[i]) for i in pending]
+            if agent_name in _GEMINI_AGENTS:
+                texts = run_gemini_batch(Config.GEMINI_MODEL, requests, agent.temperature,
+                                         max_output_tokens=agent.max_output_tokens)
             else:
-                # Add bullet points for list items
-                if line.startswith('- ') or line.startswith('* '):
-                    formatted_lines.append(line)
-                elif line.endswith(':') and len(line) < 100:
-                    formatted_lines.append(f"**{line}**")
+                texts = run_openai_batch(requests)
+            
+            for i, text in zip(pending, texts):
+                # A request the job couldn't answer fails that section like a failed direct call
+                if text is None:
+                    results[i] = {"error": f"{agent_name} batch request {i} returned no response"}
                 else:
-                    formatted_lines.append(line)
+                    results[i] = agent.make_result(text)
+                self._store_result(agent_name, keys[i], project_descriptions[i], results[i])
         
-        return '\n'.join(formatted_lines)
+        return results
     
-    def _log_agent_result(self, agent_name: str, result: Dict):
-        """Log agent analysis result"""
-        workflow_entry = {
-            'agent': agent_name,
-            'timestamp': datetime.now().isoformat(),
-            'success': 'error' not in result,
-            'confidence': result.get('confidence', 0.0),
-            'content_length': len(str(result))
+    @staticmethod
+    def _cache_key(agent_name: str, args: tuple) -> str:
+        """Exact-match cache key for one agent call"""
+        return PromptCache.make_key(agent_name, 0.0, "", orjson.dumps(args, default=str, option=orjson.OPT_SORT_KEYS).decode())
+    
+    def _cached_result(self, agent_name: str, key: str, project_description: str) -> Optional[Dict]:
+        """Stored result for the same inputs, or for a close rephrasing of the project"""
+        cached = self.cache.get(key)
+        if cached is None and self.semantic_cache.enabled:
+            cached = self.semantic_cache.lookup(f"coordinator:{agent_name}", project_description)
+        return orjson.loads(cached) if cached is not None else None
+    
+    def _store_result(self, agent_name: str, key: str, project_description: str, result: Dict):
+        """Cache an agent's result under both lookups"""
+        # Failures are reported inside the result, only keep successful analyses
+        if 'error' in result:
+            return
+        payload = orjson.dumps(result).decode()
+        self.cache.set(key, payload)
+        if self.semantic_cache.enabled:
+            self.semantic_cache.add(f"coordinator:{agent_name}", project_description, payload)
+    
+    def _record_result(self, run: AnalysisRun, agent_name: str, result: Dict):
+        """Store an agent's result for the later phases and log it"""
+        run.results[agent_name] = result
+        # Measured once here; only the text fields carry any real length
+        run.content_lengths[agent_name] = sum(len(value) for value in result.values() if isinstance(value, str))
+        self._log_agent_result(run, agent_name, result)
+    
+    def _build_result(self, run: AnalysisRun, start_time: float, final_roadmap: Optional[str] = None,
+                      include_analyses: bool = False) -> Dict:
+        """Package the roadmap (synthesized here unless already streamed) with the run's metadata"""
+        if final_roadmap is None:
+            final_roadmap = self._synthesize_comprehensive_roadmap(run)
+        
+        # Monotonic, so the duration is right even if the wall clock is adjusted mid-run
+        processing_time = time.perf_counter() - start_time
+        
+        logger.info("Multi-agent complex project analysis completed successfully")
+        
+        result = {
+            'roadmap': final_roadmap,
+            'metadata': {
+                'processing_type': 'multi_agent_complex',
+                'agents_used': list(self.agents.keys()),
+                'processing_time': processing_time,
+                'timestamp': datetime.now().isoformat(),
+                'total_tokens': self._estimate_total_tokens(run),
+                'confidence_scores': self._get_confidence_scores(run),
+                # A failed agent leaves a placeholder section; such results must not be cached
+                'degraded': any('error' in result for result in run.results.values())
+            }
         }
-        self.workflow_history.append(workflow_entry)
+        if include_analyses:
+            result['agent_analyses'] = run.results
+            result['workflow_history'] = run.history
+        return result
+    
+    def _synthesize_comprehensive_roadmap(self, run: AnalysisRun) -> str:
+        """Synthesize all agent analyses into a comprehensive roadmap"""
+        sections = "".join(self._render_section(run, agent_name) for agent_name in _ROADMAP_SECTIONS)
+        return _ROADMAP_HEADER + sections + _ROADMAP_FOOTER
+    
+    def _render_section(self, run: AnalysisRun, agent_name: str) -> str:
+        """One agent's analysis as a roadmap section, a placeholder if it failed, or nothing if it never ran"""
+        field, title, section_type = _ROADMAP_SECTIONS[agent_name]
+        result = run.results.get(agent_name, {})
+        if 'error' in result:
+            # Keep the rest of the roadmap, but say which part is missing
+            return f"## {title}\n\n{_FAILED_SECTION_NOTE}\n\n---\n\n"
+        if field not in result:
+            return ""
+        return f"## {title}\n\n{self._format_section_content(result[field], section_type)}\n\n---\n\n"
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _format_section_content(content: str, section_type: str) -> str:
+        """Format section content with better structure and readability"""
+        # Repeat runs (cache hits, batch re-renders) often format the very same text again
+        return _format_lines(content)
+    
+    def _log_agent_result(self, run: AnalysisRun, agent_name: str, result: Dict):
+        """Log agent analysis result"""
+        run.history.append(WorkflowEntry(
+            agent=agent_name,
+            timestamp=datetime.now().isoformat(),
+            success='error' not in result,
+            confidence=result.get('confidence', 0.0),
+            content_length=run.content_lengths.get(agent_name, 0)
+        ))
         
         if 'error' in result:
-            logger.error(f"Agent {agent_name} failed: {result['error']}")
+            logger.error("Agent %s failed: %s", agent_name, result['error'])
         else:
-            logger.info(f"Agent {agent_name} completed successfully (confidence: {result.get('confidence', 'N/A')})")
+            logger.info("Agent %s completed successfully (confidence: %s)", agent_name, result.get('confidence', 'N/A'))
     
-    def _estimate_total_tokens(self) -> int:
+    def _estimate_total_tokens(self, run: AnalysisRun) -> int:
         """Estimate total tokens used across all agents"""
-        total_tokens = 0
-        for agent_result in self.analysis_results.values():
-            # Rough estimation: ~4 characters per token
-            content_length = len(str(agent_result))
-            total_tokens += content_length // 4
-        return total_tokens
+        # Rough estimation: ~4 characters per token
+        return sum(run.content_lengths.values()) // 4
     
-    def _get_confidence_scores(self) -> Dict:
+    def _get_confidence_scores(self, run: AnalysisRun) -> Dict:
         """Get confidence scores from all agents"""
         confidence_scores = {}
-        for agent_name, result in self.analysis_results.items():
+        for agent_name, result in run.results.items():
             confidence_scores[agent_name] = result.get('confidence', 0.0)
         return confidence_scores
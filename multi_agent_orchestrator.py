@@ -1,20 +1,94 @@
 """
 Main orchestrator for the Multi-Agent Project Refiner AI System
 """
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 import time
-import traceback
+import weakref
+import orjson
 from config import Config
 from text_processor import TextProcessor
-from llm_agents import StrategistAgent, RefinerAgent
+from checkpoints import get_checkpoint_store
+from llm_cache import PromptCache, get_prompt_cache, get_semantic_cache
+from llm_agents import StrategistAgent, get_refiner_agent, get_strategist_agent
 from multi_agent_coordinator import MultiAgentCoordinator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Phrases the project type detectors look for; matched as substrings of the lowercased
+# input, so they are scanned in order rather than looked up
+_AI_KEYWORDS = (
+    'ai agent', 'multi-agent', 'market research', 'ai system', 
+    'machine learning', 'automated research', 'ai team',
+    'intelligent system', 'data analysis', 'market intelligence',
+    'business intelligence', 'opportunity identification',
+    'trend analysis', 'competitive intelligence', 'search all projects',
+    'study different industries', 'identify problems', 'solutions',
+    'market potential', 'daily idea', 'unbeatable', 'profit',
+    'internet search', 'analyze market', 'product launch'
+)
+_AI_TERMS = ('ai agent', 'ai system', 'ai team', 'multi-agent')
+_RESEARCH_TERMS = ('research', 'analysis', 'study', 'identify', 'search')
+_MARKET_TERMS = ('market', 'industry', 'profit', 'product', 'business')
+
+_IOT_KEYWORDS = (
+    'iot', 'esp32', 'arduino', 'raspberry pi', 'sensor', 'microcontroller',
+    'smart home', 'automation', 'monitoring', 'control system',
+    'aquarium', 'greenhouse', 'weather station', 'security system',
+    'temperature sensor', 'ph sensor', 'ultrasonic', 'relay',
+    'wifi module', 'bluetooth', 'mqtt', 'cloud integration'
+)
+_HARDWARE_KEYWORDS = (
+    'components', 'pricing', 'wiring', 'circuit', 'pcb',
+    'breadboard', 'soldering', 'enclosure', 'power supply'
+)
+_IOT_TERMS = ('iot', 'esp32', 'arduino', 'sensor', 'smart')
+_HARDWARE_TERMS = ('components', 'pricing', 'wiring', 'setup')
+_MONITORING_TERMS = ('monitoring', 'control', 'tracking', 'automation')
+
+# Strategist input for chunked requests, wrapped around the summary
+_CHUNKED_INPUT_HEADER = "Project Requirements Summary:\n"
+_CHUNKED_INPUT_FOOTER = "\n\nNote: This is a summary of a larger document with {0} sections totaling {1} tokens."
+
+# Async workflows admitted at once; semaphores are bound to the loop that first uses them
+_workflow_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _workflow_slot() -> asyncio.Semaphore:
+    """Semaphore limiting concurrent async workflows on the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _workflow_slots.get(loop)
+    if semaphore is None:
+        semaphore = _workflow_slots[loop] = asyncio.Semaphore(Config.MAX_CONCURRENT_WORKFLOWS)
+    return semaphore
+
+
+@dataclass(slots=True, frozen=True)
+class WorkflowStep:
+    """One step of a workflow run; orjson serializes it like the dict it replaces"""
+    iteration: int
+    step_type: str
+    timestamp: str
+    content_length: int
+    content_preview: str
+
+
+@dataclass(slots=True)
+class WorkflowRun:
+    """Iteration and steps of one workflow run, kept per call so concurrent runs don't mix"""
+    iteration: int = 0
+    history: List[WorkflowStep] = field(default_factory=list)
+
+
 class MultiAgentOrchestrator:
     """
     Main orchestrator that manages the multi-agent workflow between
@@ -25,23 +99,42 @@ class MultiAgentOrchestrator:
         # Validate configuration
         Config.validate_config()
         
-        # Initialize components
-        self.strategist = StrategistAgent()
-        self.refiner = RefinerAgent()
-        self.text_processor = TextProcessor()
-        self.multi_agent_coordinator = MultiAgentCoordinator()
+        # Initialize components; the Refiner starts right away so its warmup call overlaps
+        # with the first Strategist call, the rest are created on first use. Both agents are
+        # shared process-wide, so a new orchestrator per request doesn't rebuild them
+        self.refiner = get_refiner_agent()
+        self.text_processor = TextProcessor(Config.CHUNK_SIZE, Config.OVERLAP_SIZE, Config.CHUNK_THRESHOLD_TOKENS)
+        self.checkpoints = get_checkpoint_store()
         
-        # Workflow state
-        self.current_iteration = 0
+        # Workflow state; each run keeps its own, the last finished one backs get_workflow_summary
         self.max_iterations = 3
-        self.workflow_history = []
+        self.last_run: Optional[WorkflowRun] = None
+    
+    @cached_property
+    def strategist(self) -> StrategistAgent:
+        """Created on the first request rather than at import of the API"""
+        return get_strategist_agent()
+    
+    @cached_property
+    def multi_agent_coordinator(self) -> MultiAgentCoordinator:
+        """Only complex AI projects need the five specialized agents"""
+        return MultiAgentCoordinator()
     
-    def process_project_request(self, user_input: str) -> Dict[str, any]:
+    @cached_property
+    def iot_coordinator(self):
+        """Only IoT/hardware projects need the IoT agents"""
+        from specialized_agents import IoTHardwareCoordinator
+        return IoTHardwareCoordinator()
+    
+    def process_project_request(self, user_input: str,
+                                on_roadmap_delta: Optional[Callable[[str], None]] = None) -> Dict[str, any]:
         """
         Main entry point for processing user project requests
         
         Args:
             user_input: Large text containing project requirements
+            on_roadmap_delta: Receives pieces of the final roadmap as they are generated;
+                only the standard workflow streams, the specialized coordinators don't
             
         Returns:
             Dict containing the final roadmap and process metadata
@@ -51,248 +144,525 @@ class MultiAgentOrchestrator:
         # Step 1: Process input
         processed_input = self.text_processor.process_input(user_input)
         
-        logger.info(f"Input prepared: {processed_input['processing_type']}, {processed_input['token_count']} tokens")
+        logger.info("Input prepared: %s, %d tokens", processed_input['processing_type'], processed_input['token_count'])
         
-        # Check if this is a complex AI project requiring specialized analysis
-        if self._is_complex_ai_project(user_input):
+        route = self._classify(user_input)
+        if route == 'complex_ai':
             logger.info("Detected complex AI/multi-agent project - using specialized coordinator")
-            return self._process_complex_ai_project(user_input)
+            return self._process_complex_ai_project(user_input, processed_input)
         
-        # Check if this is an IoT/hardware project requiring specialized analysis
-        if self._is_iot_hardware_project(user_input):
+        if route == 'iot_hardware':
             logger.info("Detected IoT/hardware project - using specialized IoT coordinator")
-            return self._process_iot_hardware_project(user_input)
+            return self._process_iot_hardware_project(user_input, processed_input)
         
         # Route to appropriate processing method
         if processed_input['processing_type'] == 'direct':
-            return self._process_direct_input(processed_input['content'])
+            return self._process_direct_input(processed_input['content'], on_roadmap_delta)
         else:
-            return self._process_chunked_input(processed_input['chunks'])
+            return self._process_chunked_input(processed_input['chunks'], on_roadmap_delta,
+                                               processed_input['content'], processed_input['token_count'])
     
-    def _process_direct_input(self, content: str) -> Dict:
+    async def aprocess_project_request(self, user_input: str) -> Dict[str, any]:
+        """Async variant of process_project_request for use inside an event loop"""
+        logger.info("Starting multi-agent project refinement process")
+        
+        # Chunking and summarizing a large input is CPU work, keep it off the event loop
+        processed_input = await asyncio.to_thread(self.text_processor.process_input, user_input)
+        
+        logger.info("Input prepared: %s, %d tokens", processed_input['processing_type'], processed_input['token_count'])
+        
+        route = self._classify(user_input)
+        if route == 'complex_ai':
+            logger.info("Detected complex AI/multi-agent project - using specialized coordinator")
+            return await self._aprocess_complex_ai_project(user_input, processed_input)
+        
+        if route == 'iot_hardware':
+            logger.info("Detected IoT/hardware project - using specialized IoT coordinator")
+            return await self._aprocess_iot_hardware_project(user_input, processed_input)
+        
+        if processed_input['processing_type'] == 'direct':
+            prepared_input = {'type': 'direct', 'content': processed_input['content']}
+        else:
+            prepared_input = self._prepare_chunked_input(processed_input['chunks'], processed_input['content'],
+                                                         processed_input['token_count'])
+        return await self._aexecute_workflow(prepared_input)
+    
+    def _process_direct_input(self, content: str, on_roadmap_delta: Optional[Callable[[str], None]] = None) -> Dict:
         """Process direct input through the workflow"""
         prepared_input = {
             'type': 'direct',
             'content': content
         }
-        return self._execute_workflow(prepared_input)
+        return self._execute_workflow(prepared_input, on_roadmap_delta)
     
-    def _process_chunked_input(self, chunks: List[str]) -> Dict:
+    def _process_chunked_input(self, chunks: List[str],
+                               on_roadmap_delta: Optional[Callable[[str], None]] = None,
+                               summary: Optional[str] = None, token_count: Optional[int] = None) -> Dict:
         """Process chunked input through the workflow"""
-        # Create summary from chunks
-        summary = self.text_processor.summarize_chunks(chunks)
-        prepared_input = {
+        return self._execute_workflow(self._prepare_chunked_input(chunks, summary, token_count), on_roadmap_delta)
+    
+    def _prepare_chunked_input(self, chunks: List[str], summary: Optional[str] = None,
+                               token_count: Optional[int] = None) -> Dict:
+        """Summarize chunked input for the workflow, reusing process_input's summary and token count when given"""
+        if summary is None:
+            summary = self.text_processor.summarize_chunks(chunks)
+        if token_count is None:
+            token_count = self.text_processor.count_tokens(" ".join(chunks))
+        return {
             'type': 'chunked',
             'summary': summary,
             'chunks': chunks,
             'chunk_count': len(chunks),
-            'token_count': sum(self.text_processor.count_tokens(chunk) for chunk in chunks)
+            'token_count': token_count
         }
-        return self._execute_workflow(prepared_input)
     
-    def _execute_workflow(self, prepared_input: Dict[str, any]) -> Dict[str, any]:
+    def _stream_final(self, refined_roadmap: str, on_roadmap_delta: Callable[[str], None]) -> str:
+        """Run the final pass, handing each generated piece to on_roadmap_delta"""
+        parts = []
+        for piece in self.refiner.stream_final_evaluation(refined_roadmap):
+            parts.append(piece)
+            on_roadmap_delta(piece)
+        return "".join(parts)
+    
+    def _collect_rewrites(self, rewrites: List[Tuple[str, Future]]) -> Dict[str, str]:
+        """Gather early section rewrites by heading; failed ones are redone in refine_roadmap"""
+        prewritten = {}
+        for heading, future in rewrites:
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.warning("Early rewrite of section '%s' failed: %s", heading, e)
+                continue
+            if text:
+                prewritten[heading] = text
+        return prewritten
+    
+    def _strategist_input(self, prepared_input: Dict[str, any]) -> str:
+        """Determine input content for the strategist"""
+        if prepared_input['type'] == 'direct':
+            return prepared_input['content']
+        
+        # Use summary for large inputs
+        return _CHUNKED_INPUT_HEADER + prepared_input['summary'] + _CHUNKED_INPUT_FOOTER.format(
+            prepared_input['chunk_count'], prepared_input['token_count']
+        )
+    
+    def _execute_workflow(self, prepared_input: Dict[str, any],
+                          on_roadmap_delta: Optional[Callable[[str], None]] = None) -> Dict[str, any]:
         """Execute the 3-iteration workflow between Strategist and Refiner"""
         
         start_time = datetime.now()
-        
-        # Determine input content for strategist
-        if prepared_input['type'] == 'direct':
-            strategist_input = prepared_input['content']
-        else:
-            # Use summary for large inputs
-            strategist_input = f"""Project Requirements Summary:
-{prepared_input['summary']}
-
-Note: This is a summary of a larger document with {prepared_input['chunk_count']} sections totaling {prepared_input['token_count']} tokens."""
+        strategist_input = self._strategist_input(prepared_input)
+        run = WorkflowRun()
+        # Finished stages of an earlier failed run over the same input are not re-run
+        checkpoint = self.checkpoints.scope(strategist_input)
         
         try:
             # Iteration 1: Strategist creates initial roadmap
             logger.info("Iteration 1: Strategist generating initial roadmap")
-            self.current_iteration = 1
+            run.iteration = 1
             
-            initial_roadmap = self.strategist.generate_initial_roadmap(strategist_input)
-            self._log_workflow_step("strategist_initial", initial_roadmap)
+            if Config.STREAM_SECTION_CRITIQUE and checkpoint.get("initial_roadmap") is None:
+                # Refiner critiques each section as soon as the Strategist streams it
+                logger.info("Iteration 1: Refiner analyzing sections as they stream")
+                sections = []
+                rewrites = []
+                
+                def collect_sections():
+                    for section in self.strategist.stream_initial_roadmap(strategist_input):
+                        sections.append(section)
+                        yield section
+                
+                def start_rewrite(section, patches):
+                    # Flagged sections are rewritten while the remaining critiques are still running
+                    started = self.strategist.start_section_rewrite(section, patches)
+                    if started:
+                        rewrites.append(started)
+                
+                refiner_feedback_1 = self.refiner.analyze_sections(collect_sections(), on_patches=start_rewrite)
+                initial_roadmap = "".join(sections)
+                checkpoint.put("initial_roadmap", initial_roadmap)
+                checkpoint.put("refiner_analysis_1", refiner_feedback_1)
+                self._log_workflow_step(run, "strategist_initial", initial_roadmap)
+                prewritten = self._collect_rewrites(rewrites)
+            else:
+                initial_roadmap = checkpoint.run(
+                    "initial_roadmap", lambda: self.strategist.generate_initial_roadmap(strategist_input)
+                )
+                self._log_workflow_step(run, "strategist_initial", initial_roadmap)
+                
+                # Iteration 1: Refiner analyzes and provides feedback
+                logger.info("Iteration 1: Refiner analyzing roadmap")
+                
+                refiner_feedback_1 = checkpoint.run(
+                    "refiner_analysis_1", lambda: self.refiner.analyze_roadmap(initial_roadmap, iteration=1)
+                )
+                prewritten = None
+            self._log_workflow_step(run, "refiner_feedback_1", refiner_feedback_1)
+            
+            fused = None
+            # The fused response is one JSON object, so streamed runs keep the separate final pass
+            if (Config.FUSE_STAGES and on_roadmap_delta is None
+                    and checkpoint.get("final_evaluation") is None):
+                logger.info("Iterations 2-3: Strategist refining and presenting roadmap in one call")
+                fused = self.strategist.refine_and_finalize(initial_roadmap, refiner_feedback_1, prewritten)
             
-            # Iteration 1: Refiner analyzes and provides feedback
-            logger.info("Iteration 1: Refiner analyzing roadmap")
+            if fused is not None:
+                final_roadmap, changes = fused
+                run.iteration = 3
+                checkpoint.put("final_evaluation", final_roadmap)
+                self._log_workflow_step(run, "strategist_refined", changes)
+            else:
+                # Iteration 2: Strategist refines based on feedback
+                logger.info("Iteration 2: Strategist refining roadmap")
+                run.iteration = 2
+                
+                refined_roadmap = checkpoint.run(
+                    "strategist_refine",
+                    lambda: self.strategist.refine_roadmap(initial_roadmap, refiner_feedback_1, prewritten)
+                )
+                self._log_workflow_step(run, "strategist_refined", refined_roadmap)
+                
+                # Iteration 3: Refiner final evaluation and formatting
+                logger.info("Iteration 3: Refiner final evaluation")
+                run.iteration = 3
+                
+                if on_roadmap_delta is None:
+                    final_roadmap = checkpoint.run(
+                        "final_evaluation", lambda: self.refiner.final_evaluation(refined_roadmap)
+                    )
+                else:
+                    final_roadmap = checkpoint.run(
+                        "final_evaluation", lambda: self._stream_final(refined_roadmap, on_roadmap_delta)
+                    )
+            self._log_workflow_step(run, "refiner_final", final_roadmap)
+            self.last_run = run
             
-            refiner_feedback_1 = self.refiner.analyze_roadmap(initial_roadmap, iteration=1)
-            self._log_workflow_step("refiner_feedback_1", refiner_feedback_1)
+            end_time = datetime.now()
+            processing_time = (end_time - start_time).total_seconds()
+            
+            return {
+                'roadmap': final_roadmap,
+                'metadata': {
+                    'iterations': run.iteration,
+                    'processing_time': processing_time,
+                    'workflow_history': run.history
+                }
+            }
             
-            # Iteration 2: Strategist refines based on feedback
-            logger.info("Iteration 2: Strategist refining roadmap")
-            self.current_iteration = 2
+        except Exception as e:
+            logger.error("Error in multi-agent refinement: %s", e)
+            logger.debug("Full traceback", exc_info=True)
+            raise Exception(f"Multi-agent refinement failed: {str(e)}") from e
+    
+    async def _aexecute_workflow(self, prepared_input: Dict[str, any]) -> Dict[str, any]:
+        """Async variant of _execute_workflow, queued behind Config.MAX_CONCURRENT_WORKFLOWS others"""
+        # Past the providers' limits, more workflows at once only add 429 retries
+        async with _workflow_slot():
+            return await self._arun_workflow(prepared_input)
+    
+    async def _arun_workflow(self, prepared_input: Dict[str, any]) -> Dict[str, any]:
+        """Run the async workflow once _aexecute_workflow has admitted it"""
+        
+        start_time = datetime.now()
+        strategist_input = self._strategist_input(prepared_input)
+        run = WorkflowRun()
+        
+        try:
+            logger.info("Iteration 1: Strategist generating initial roadmap")
+            run.iteration = 1
             
-            refined_roadmap = self.strategist.refine_roadmap(initial_roadmap, refiner_feedback_1)
-            self._log_workflow_step("strategist_refined", refined_roadmap)
+            if Config.STREAM_SECTION_CRITIQUE:
+                # Each section is critiqued as soon as it streams in, overlapping with the rest
+                logger.info("Iteration 1: Refiner analyzing sections as they stream")
+                sections = []
+                
+                async def collect_sections():
+                    async for section in self.strategist.astream_initial_roadmap(strategist_input):
+                        sections.append(section)
+                        yield section
+                
+                refiner_feedback_1 = await self.refiner.aanalyze_sections(collect_sections())
+                initial_roadmap = "".join(sections)
+                self._log_workflow_step(run, "strategist_initial", initial_roadmap)
+            else:
+                initial_roadmap = await self.strategist.agenerate_initial_roadmap(strategist_input)
+                self._log_workflow_step(run, "strategist_initial", initial_roadmap)
+                logger.info("Iteration 1: Refiner analyzing roadmap")
+                refiner_feedback_1 = await self.refiner.aanalyze_roadmap(initial_roadmap, iteration=1)
+            self._log_workflow_step(run, "refiner_feedback_1", refiner_feedback_1)
             
-            # Iteration 3: Refiner final evaluation and formatting
-            logger.info("Iteration 3: Refiner final evaluation")
-            self.current_iteration = 3
+            fused = None
+            if Config.FUSE_STAGES:
+                logger.info("Iterations 2-3: Strategist refining and presenting roadmap in one call")
+                fused = await self.strategist.arefine_and_finalize(initial_roadmap, refiner_feedback_1)
             
-            final_roadmap = self.refiner.final_evaluation(refined_roadmap)
-            self._log_workflow_step("refiner_final", final_roadmap)
+            if fused is not None:
+                final_roadmap, changes = fused
+                run.iteration = 3
+                self._log_workflow_step(run, "strategist_refined", changes)
+            else:
+                logger.info("Iteration 2: Strategist refining roadmap")
+                run.iteration = 2
+                
+                refined_roadmap = await self.strategist.arefine_roadmap(initial_roadmap, refiner_feedback_1)
+                self._log_workflow_step(run, "strategist_refined", refined_roadmap)
+                
+                logger.info("Iteration 3: Refiner final evaluation")
+                run.iteration = 3
+                
+                final_roadmap = await self.refiner.afinal_evaluation(refined_roadmap)
+            self._log_workflow_step(run, "refiner_final", final_roadmap)
+            self.last_run = run
             
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
+            processing_time = (datetime.now() - start_time).total_seconds()
             
             return {
                 'roadmap': final_roadmap,
                 'metadata': {
-                    'iterations': self.current_iteration,
+                    'iterations': run.iteration,
                     'processing_time': processing_time,
-                    'workflow_history': self.workflow_history
+                    'workflow_history': run.history
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error in multi-agent refinement: {str(e)}")
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            raise Exception(f"Multi-agent refinement failed: {str(e)}")
-    
-    def _is_complex_ai_project(self, user_input: str) -> bool:
-        """Detect if project requires complex multi-agent analysis"""
-        ai_keywords = [
-            'ai agent', 'multi-agent', 'market research', 'ai system', 
-            'machine learning', 'automated research', 'ai team',
-            'intelligent system', 'data analysis', 'market intelligence',
-            'business intelligence', 'opportunity identification',
-            'trend analysis', 'competitive intelligence', 'search all projects',
-            'study different industries', 'identify problems', 'solutions',
-            'market potential', 'daily idea', 'unbeatable', 'profit',
-            'internet search', 'analyze market', 'product launch'
-        ]
-        
+            logger.error("Error in multi-agent refinement: %s", e)
+            logger.debug("Full traceback", exc_info=True)
+            raise Exception(f"Multi-agent refinement failed: {str(e)}") from e
+    
+    def _classify(self, user_input: str) -> str:
+        """Pick the request's route once: 'complex_ai', 'iot_hardware' or 'standard'"""
+        # Both detectors scan the same lowercased copy; the IoT one only runs when the input
+        # isn't a complex AI project
         user_lower = user_input.lower()
-        keyword_matches = sum(1 for keyword in ai_keywords if keyword in user_lower)
+        if self._is_complex_ai_project(user_input, user_lower):
+            return 'complex_ai'
+        if self._is_iot_hardware_project(user_input, user_lower):
+            return 'iot_hardware'
+        return 'standard'
+    
+    def _detect_project_type(self, user_input: str) -> str:
+        """Project type the Strategist will specialize its prompt for (e.g. 'mobile_app', 'iot_hardware')"""
+        # Same precompiled keyword patterns and memoized lookup the Strategist uses
+        return self.strategist._detect_project_type(user_input)
+    
+    def _is_complex_ai_project(self, user_input: str, user_lower: Optional[str] = None) -> bool:
+        """Detect if project requires complex multi-agent analysis (user_lower: input already lowercased)"""
+        if user_lower is None:
+            user_lower = user_input.lower()
+        keyword_matches = sum(1 for keyword in _AI_KEYWORDS if keyword in user_lower)
         
         # Enhanced detection logic for complex AI projects
-        has_ai_terms = any(term in user_lower for term in ['ai agent', 'ai system', 'ai team', 'multi-agent'])
-        has_research_terms = any(term in user_lower for term in ['research', 'analysis', 'study', 'identify', 'search'])
-        has_market_terms = any(term in user_lower for term in ['market', 'industry', 'profit', 'product', 'business'])
+        has_ai_terms = any(term in user_lower for term in _AI_TERMS)
+        has_research_terms = any(term in user_lower for term in _RESEARCH_TERMS)
+        has_market_terms = any(term in user_lower for term in _MARKET_TERMS)
         
         # Debug logging
-        logger.info(f"Complex AI detection - Keywords: {keyword_matches}, AI terms: {has_ai_terms}, Research: {has_research_terms}, Market: {has_market_terms}")
+        logger.info("Complex AI detection - Keywords: %d, AI terms: %s, Research: %s, Market: %s",
+                    keyword_matches, has_ai_terms, has_research_terms, has_market_terms)
         
         # If has AI terms AND (research terms OR market terms) OR high keyword count
         return (has_ai_terms and (has_research_terms or has_market_terms)) or keyword_matches >= 5
     
-    def _is_iot_hardware_project(self, user_input: str) -> bool:
+    def _is_iot_hardware_project(self, user_input: str, user_lower: Optional[str] = None) -> bool:
         """Detect if project is an IoT/hardware project requiring specialized analysis"""
-        iot_keywords = [
-            'iot', 'esp32', 'arduino', 'raspberry pi', 'sensor', 'microcontroller',
-            'smart home', 'automation', 'monitoring', 'control system',
-            'aquarium', 'greenhouse', 'weather station', 'security system',
-            'temperature sensor', 'ph sensor', 'ultrasonic', 'relay',
-            'wifi module', 'bluetooth', 'mqtt', 'cloud integration'
-        ]
-        
-        hardware_terms = [
-            'components', 'pricing', 'wiring', 'circuit', 'pcb',
-            'breadboard', 'soldering', 'enclosure', 'power supply'
-        ]
-        
-        user_lower = user_input.lower()
-        iot_matches = sum(1 for keyword in iot_keywords if keyword in user_lower)
-        hardware_matches = sum(1 for keyword in hardware_terms if keyword in user_lower)
+        if user_lower is None:
+            user_lower = user_input.lower()
+        iot_matches = sum(1 for keyword in _IOT_KEYWORDS if keyword in user_lower)
+        hardware_matches = sum(1 for keyword in _HARDWARE_KEYWORDS if keyword in user_lower)
         
         # Check for specific IoT project indicators
-        has_iot_terms = any(term in user_lower for term in ['iot', 'esp32', 'arduino', 'sensor', 'smart'])
-        has_hardware_terms = any(term in user_lower for term in ['components', 'pricing', 'wiring', 'setup'])
-        has_monitoring_terms = any(term in user_lower for term in ['monitoring', 'control', 'tracking', 'automation'])
+        has_iot_terms = any(term in user_lower for term in _IOT_TERMS)
+        has_hardware_terms = any(term in user_lower for term in _HARDWARE_TERMS)
+        has_monitoring_terms = any(term in user_lower for term in _MONITORING_TERMS)
         
-        logger.info(f"IoT detection - IoT keywords: {iot_matches}, Hardware: {hardware_matches}, IoT terms: {has_iot_terms}, Hardware terms: {has_hardware_terms}, Monitoring: {has_monitoring_terms}")
+        logger.info("IoT detection - IoT keywords: %d, Hardware: %d, IoT terms: %s, Hardware terms: %s, Monitoring: %s",
+                    iot_matches, hardware_matches, has_iot_terms, has_hardware_terms, has_monitoring_terms)
         
         # If has IoT terms AND (hardware terms OR monitoring terms) OR high IoT keyword count
         return (has_iot_terms and (has_hardware_terms or has_monitoring_terms)) or iot_matches >= 3
     
-    def _process_complex_ai_project(self, user_input: str) -> Dict:
+    def _process_complex_ai_project(self, user_input: str, processed_input: Dict) -> Dict:
         """Process complex AI projects using specialized multi-agent coordinator"""
         try:
             logger.info("Starting complex AI project analysis with specialized agents")
             result = self.multi_agent_coordinator.analyze_complex_project(user_input)
             logger.info("Complex AI project analysis completed successfully")
-            
-            # Ensure proper format for frontend
-            if 'roadmap' in result and 'metadata' in result:
-                return result
-            else:
-                # Convert old format to new format
-                return {
-                    'roadmap': result.get('final_roadmap', result.get('roadmap', str(result))),
-                    'metadata': result.get('metadata', {
-                        'processing_method': 'complex_ai_coordinator',
-                        'timestamp': datetime.now().isoformat()
-                    })
-                }
+            return self._complex_result(result)
+        except Exception as e:
+            logger.error("Error in complex AI project processing: %s", e)
+            logger.debug("Full traceback", exc_info=True)
+            # Fallback to standard processing, reusing the request's processed input
+            logger.info("Falling back to standard processing")
+            return self._execute_workflow({'type': 'direct', 'content': processed_input['content']})
+    
+    async def _aprocess_complex_ai_project(self, user_input: str, processed_input: Dict) -> Dict:
+        """Async variant of _process_complex_ai_project, running the coordinator's native async path"""
+        try:
+            logger.info("Starting complex AI project analysis with specialized agents")
+            result = await self.multi_agent_coordinator.aanalyze_complex_project(user_input)
+            logger.info("Complex AI project analysis completed successfully")
+            return self._complex_result(result)
         except Exception as e:
-            logger.error(f"Error in complex AI project processing: {str(e)}")
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            # Fallback to standard processing
+            logger.error("Error in complex AI project processing: %s", e)
+            logger.debug("Full traceback", exc_info=True)
             logger.info("Falling back to standard processing")
-            processed_input = self.text_processor.process_input(user_input)
-            return self._process_direct_input(processed_input['content'])
+            return await self._aexecute_workflow({'type': 'direct', 'content': processed_input['content']})
+    
+    @staticmethod
+    def _complex_result(result: Dict) -> Dict:
+        """Ensure the coordinator's result has the format the frontend expects"""
+        if 'roadmap' in result and 'metadata' in result:
+            return result
+        # Convert old format to new format
+        return {
+            'roadmap': result.get('final_roadmap', result.get('roadmap', str(result))),
+            'metadata': result.get('metadata', {
+                'processing_method': 'complex_ai_coordinator',
+                'timestamp': datetime.now().isoformat()
+            })
+        }
     
-    def _process_iot_hardware_project(self, user_input: str) -> Dict:
+    def _process_iot_hardware_project(self, user_input: str, processed_input: Dict) -> Dict:
         """Process IoT/hardware projects using specialized IoT coordinator"""
         try:
             logger.info("Starting IoT/hardware project analysis with specialized agents")
-            
-            # Create IoT-specific coordinator if not exists
-            if not hasattr(self, 'iot_coordinator'):
-                from specialized_agents import IoTHardwareCoordinator
-                self.iot_coordinator = IoTHardwareCoordinator()
-            
             result = self.iot_coordinator.analyze_iot_project(user_input)
             logger.info("IoT/hardware project analysis completed successfully")
+            return self._iot_result(result)
+        except Exception as e:
+            logger.error("Error in IoT/hardware project processing: %s", e)
+            logger.debug("Full traceback", exc_info=True)
+            # Fallback to standard processing, reusing the request's processed input
+            logger.info("Falling back to standard processing")
+            return self._execute_workflow({'type': 'direct', 'content': processed_input['content']})
+    
+    async def _aprocess_iot_hardware_project(self, user_input: str, processed_input: Dict) -> Dict:
+        """Async variant of _process_iot_hardware_project, running the IoT agents concurrently"""
+        try:
+            logger.info("Starting IoT/hardware project analysis with specialized agents")
+            result = await self.iot_coordinator.aanalyze_iot_project(user_input)
+            logger.info("IoT/hardware project analysis completed successfully")
+            return self._iot_result(result)
+        except Exception as e:
+            logger.error("Error in IoT/hardware project processing: %s", e)
+            logger.debug("Full traceback", exc_info=True)
+            logger.info("Falling back to standard processing")
+            return await self._aexecute_workflow({'type': 'direct', 'content': processed_input['content']})
+    
+    @staticmethod
+    def _iot_result(result: Dict) -> Dict:
+        """Ensure the IoT coordinator's result has the format the frontend expects"""
+        if 'roadmap' in result and 'metadata' in result:
+            return result
+        # Convert old format to new format
+        return {
+            'roadmap': result.get('final_roadmap', result.get('roadmap', str(result))),
+            'metadata': result.get('metadata', {
+                'processing_method': 'iot_hardware_coordinator',
+                'timestamp': datetime.now().isoformat()
+            })
+        }
+    
+    def process_project_requests_batch(self, user_inputs: List[str]) -> List[Dict[str, any]]:
+        """
+        Run the 3-iteration workflow over many requests through the providers' Batch APIs
+        
+        Each step waits on a batch job that may take hours, so this is for offline runs
+        such as evaluating a dataset of descriptions. Complex AI projects go through the
+        multi-agent coordinator's batch path, alongside the standard workflow's jobs for
+        the rest; IoT projects use the standard workflow, since that coordinator isn't batched.
+        
+        Args:
+            user_inputs: Project requirement texts
             
-            # Ensure proper format for frontend
-            if 'roadmap' in result and 'metadata' in result:
-                return result
+        Returns:
+            One result dict per input, in input order
+        """
+        logger.info("Starting batch project refinement for %d requests", len(user_inputs))
+        start_time = datetime.now()
+        
+        complex_indices = [i for i, user_input in enumerate(user_inputs) if self._is_complex_ai_project(user_input)]
+        complex_set = set(complex_indices)
+        standard_indices = [i for i in range(len(user_inputs)) if i not in complex_set]
+        
+        strategist_inputs = []
+        for i in standard_indices:
+            processed_input = self.text_processor.process_input(user_inputs[i])
+            if processed_input['processing_type'] == 'direct':
+                prepared_input = {'type': 'direct', 'content': processed_input['content']}
             else:
-                # Convert old format to new format
-                return {
-                    'roadmap': result.get('final_roadmap', result.get('roadmap', str(result))),
-                    'metadata': result.get('metadata', {
-                        'processing_method': 'iot_hardware_coordinator',
-                        'timestamp': datetime.now().isoformat()
-                    })
-                }
+                prepared_input = self._prepare_chunked_input(processed_input['chunks'], processed_input['content'],
+                                                             processed_input['token_count'])
+            strategist_inputs.append(self._strategist_input(prepared_input))
+        
+        # The two groups' batch jobs don't depend on each other, so they wait side by side
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='complex-batch')
+        complex_future = pool.submit(
+            self.multi_agent_coordinator.analyze_complex_projects_batch,
+            [user_inputs[i] for i in complex_indices]
+        ) if complex_indices else None
+        
+        try:
+            if strategist_inputs:
+                initial_roadmaps = self.strategist.generate_initial_roadmaps_batch(strategist_inputs)
+                feedback = self.refiner.analyze_roadmaps_batch(initial_roadmaps, iteration=1)
+                refined_roadmaps = self.strategist.refine_roadmaps_batch(initial_roadmaps, feedback)
+                final_roadmaps = self.refiner.final_evaluations_batch(refined_roadmaps)
+            else:
+                final_roadmaps = []
+            complex_results = complex_future.result() if complex_future else []
         except Exception as e:
-            logger.error(f"Error in IoT/hardware project processing: {str(e)}")
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            # Fallback to standard processing
-            logger.info("Falling back to standard processing")
-            processed_input = self.text_processor.process_input(user_input)
-            return self._process_direct_input(processed_input['content'])
+            logger.error("Error in batch refinement: %s", e)
+            raise Exception(f"Multi-agent batch refinement failed: {str(e)}") from e
+        finally:
+            # Don't block a failed run on the other group's still-running jobs
+            pool.shutdown(wait=False)
+        
+        results: List[Optional[Dict[str, any]]] = [None] * len(user_inputs)
+        processing_time = (datetime.now() - start_time).total_seconds()
+        for i, roadmap in zip(standard_indices, final_roadmaps):
+            results[i] = {
+                'roadmap': roadmap,
+                'metadata': {
+                    'processing_type': 'batch',
+                    'iterations': 3,
+                    'processing_time': processing_time,
+                    'batch_size': len(user_inputs)
+                }
+            }
+        for i, result in zip(complex_indices, complex_results):
+            results[i] = result
+        return results
     
-    def _log_workflow_step(self, step_type: str, content: str):
+    def _log_workflow_step(self, run: WorkflowRun, step_type: str, content: str):
         """Log workflow step for debugging and analysis"""
-        step_info = {
-            'iteration': self.current_iteration,
-            'step_type': step_type,
-            'timestamp': datetime.now().isoformat(),
-            'content_length': len(content),
-            'content_preview': content[:200] + "..." if len(content) > 200 else content
-        }
-        self.workflow_history.append(step_info)
-        logger.info(f"Workflow step completed: {step_type} (iteration {self.current_iteration})")
+        run.history.append(WorkflowStep(
+            iteration=run.iteration,
+            step_type=step_type,
+            timestamp=datetime.now().isoformat(),
+            content_length=len(content),
+            content_preview=content[:200] + "..." if len(content) > 200 else content
+        ))
+        logger.info("Workflow step completed: %s (iteration %d)", step_type, run.iteration)
     
     def get_workflow_summary(self) -> Dict[str, any]:
         """Get a summary of the last workflow execution"""
-        if not self.workflow_history:
+        run = self.last_run
+        if run is None:
             return {"status": "No workflow executed yet"}
         
         return {
-            "total_steps": len(self.workflow_history),
-            "iterations_completed": self.current_iteration,
+            "total_steps": len(run.history),
+            "iterations_completed": run.iteration,
             "steps": [
                 {
-                    "step": step['step_type'],
-                    "iteration": step['iteration'],
-                    "content_length": step['content_length']
+                    "step": step.step_type,
+                    "iteration": step.iteration,
+                    "content_length": step.content_length
                 }
-                for step in self.workflow_history
+                for step in run.history
             ]
         }
 
@@ -302,8 +672,14 @@ class ProjectRefinerAPI:
     Simple API wrapper for the Multi-Agent system
     """
     
+    # Semantic cache scope for whole refinement results
+    _RESULT_SCOPE = "project_refinement"
+    
     def __init__(self):
         self.orchestrator = MultiAgentOrchestrator()
+        # Finished results, so a repeated or reworded request skips the whole workflow
+        self.cache = get_prompt_cache()
+        self.semantic_cache = get_semantic_cache()
     
     def refine_project(self, project_description: str) -> str:
         """
@@ -316,7 +692,7 @@ class ProjectRefinerAPI:
             Refined project roadmap as a clean string
         """
         try:
-            result = self.orchestrator.process_project_request(project_description)
+            result = self.refine_project_detailed(project_description)
             return result['roadmap']
         except Exception as e:
             return f"Error processing project: {str(e)}"
@@ -331,4 +707,121 @@ class ProjectRefinerAPI:
         Returns:
             Complete result dictionary with roadmap and metadata
         """
-        return self.orchestrator.process_project_request(project_description)
+        key = self._result_key(project_description)
+        cached = self._cached_result(key, project_description)
+        if cached is not None:
+            return cached
+        result = self.orchestrator.process_project_request(project_description)
+        self._store_result(key, project_description, result)
+        return result
+    
+    async def arefine_project_detailed(self, project_description: str) -> Dict[str, any]:
+        """Async variant of refine_project_detailed"""
+        key = self._result_key(project_description)
+        # Lookups may embed the input, keep them off the event loop
+        cached = await asyncio.to_thread(self._cached_result, key, project_description)
+        if cached is not None:
+            return cached
+        result = await self.orchestrator.aprocess_project_request(project_description)
+        await asyncio.to_thread(self._store_result, key, project_description, result)
+        return result
+    
+    @staticmethod
+    def _result_key(project_description: str) -> str:
+        """Exact-match key, ignoring case and whitespace differences"""
+        normalized = " ".join(project_description.lower().split())
+        return PromptCache.make_key(ProjectRefinerAPI._RESULT_SCOPE, 0.0, "", normalized)
+    
+    def _cached_result(self, key: str, project_description: str) -> Optional[Dict[str, any]]:
+        """Stored result for the same description, or for a close rephrasing of it"""
+        cached = self.cache.get(key)
+        if cached is None and self.semantic_cache.enabled:
+            cached = self.semantic_cache.lookup(self._RESULT_SCOPE, project_description)
+        return orjson.loads(cached) if cached is not None else None
+    
+    def _store_result(self, key: str, project_description: str, result: Dict[str, any]):
+        """Persist a finished result under both lookups, unless an agent failed partway"""
+        if result.get('metadata', {}).get('degraded'):
+            logger.info("Not caching result with failed agent sections")
+            return
+        payload = orjson.dumps(result, default=str).decode()
+        self.cache.set(key, payload)
+        if self.semantic_cache.enabled:
+            self.semantic_cache.add(self._RESULT_SCOPE, project_description, payload)
+    
+    async def arefine_projects(self, project_descriptions: List[str]) -> List[Dict[str, any]]:
+        """
+        Refine many projects concurrently, at most Config.LLM_CONCURRENCY at a time
+        
+        Args:
+            project_descriptions: Project requirements and goals, one per project
+            
+        Returns:
+            Result dictionaries with roadmap and metadata, in input order
+        """
+        # Bounded so a large run stays under the providers' rate limits
+        semaphore = asyncio.Semaphore(Config.LLM_CONCURRENCY)
+        
+        async def refine(project_description: str) -> Dict[str, any]:
+            async with semaphore:
+                return await self.arefine_project_detailed(project_description)
+        
+        return await asyncio.gather(*(refine(description) for description in project_descriptions))
+    
+    def refine_projects_batch(self, project_descriptions: List[str]) -> List[Dict[str, any]]:
+        """
+        Offline API method that refines many projects at the Batch API rate
+        
+        Args:
+            project_descriptions: Project requirements and goals, one per project
+            
+        Returns:
+            Result dictionaries with roadmap and metadata, in input order
+        """
+        return self.orchestrator.process_project_requests_batch(project_descriptions)
+    
+    def refine_project_stream(self, project_description: str) -> Iterator[Tuple[str, any]]:
+        """
+        Streaming variant of refine_project_detailed
+        
+        Args:
+            project_description: User's project requirements and goals
+            
+        Yields:
+            ('roadmap_delta', text) pieces of the final roadmap while it is generated,
+            then metadata, then the remaining top-level sections; 'roadmap' itself is
+            only sent whole when it could not be streamed (e.g. specialized coordinators,
+            a checkpointed final pass, or a cached result)
+        """
+        key = self._result_key(project_description)
+        result = self._cached_result(key, project_description)
+        streamed = False
+        if result is None:
+            deltas = queue.Queue()
+            outcome = {}
+            
+            def run():
+                try:
+                    outcome['result'] = self.orchestrator.process_project_request(
+                        project_description, on_roadmap_delta=deltas.put
+                    )
+                except Exception as e:
+                    outcome['error'] = e
+                finally:
+                    deltas.put(None)
+            
+            threading.Thread(target=run, name='refine-stream', daemon=True).start()
+            while (piece := deltas.get()) is not None:
+                streamed = True
+                yield 'roadmap_delta', piece
+            
+            if 'error' in outcome:
+                raise outcome['error']
+            result = outcome['result']
+            self._store_result(key, project_description, result)
+        
+        if 'metadata' in result:
+            yield 'metadata', result['metadata']
+        for key, value in result.items():
+            if key != 'metadata' and not (streamed and key == 'roadmap'):
+                yield key, value
@@ -0,0 +1,81 @@
+"""
+In-process caching helpers for the refinement endpoints
+Stores pre-serialized JSON responses keyed by a hash of the project description
+and coalesces concurrent identical requests into a single upstream call
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+class ResponseCache:
+    """Thread-safe LRU cache (serialized refinement responses, supplier results)"""
+
+    def __init__(self, maxsize: int = 256, enabled: bool = True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(project_description: str, detailed: bool) -> bytes:
+        """Build a compact cache key for a description and response mode"""
+        return hashlib.blake2b(
+            project_description.encode(),
+            digest_size=16,
+            key=b'detailed' if detailed else b'std'
+        ).digest()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, marking it as recently used"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Hashable, body: Any):
+        """Store a value, evicting the least recently used entry"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: bytes, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the in-flight call with the same key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result(timeout=self.timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
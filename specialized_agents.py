@@ -2,28 +2,115 @@
 Specialized AI Agents for Complex Multi-Agent System Design and IoT/Hardware Projects
 Each agent handles a specific domain of expertise for comprehensive project analysis
 """
+import asyncio
+import string
 import openai
+import orjson
 import google.generativeai as genai
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from config import Config
-import json
+from llm_cache import PromptCache, get_prompt_cache, get_semantic_cache
+from response_cache import SingleFlight
+from llm_clients import (
+    awith_retry, call_with_timeout, configure_openai, estimate_tokens, gemini_limiter, get_gemini_model,
+    openai_limiter, use_shared_aiosession, with_retry
+)
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-class MarketResearchAgent:
-    """Specialized agent for market research and opportunity identification"""
-    
-    def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
-        self.model = Config.GPT_MODEL
-        self.temperature = 0.3
-    
-    def analyze_market_opportunity(self, project_description: str) -> Dict:
-        """Analyze market opportunities and gaps"""
-        
-        system_prompt = """You are a senior market research analyst with 15+ years experience in identifying market opportunities and gaps. You specialize in analyzing emerging technologies, market trends, and unmet needs across industries.
+
+def _request_tokens(request: Dict) -> int:
+    """Rough token cost of a chat completion request, for the shared rate limiter"""
+    return estimate_tokens("".join(message['content'] for message in request['messages']), request['max_tokens'])
+
+
+async def _astream_openai(request: Dict) -> AsyncIterator[str]:
+    """Stream a chat completion's text as it is generated"""
+    use_shared_aiosession()
+    await openai_limiter.aacquire(_request_tokens(request))
+    # Only opening the stream is retried; a stream that breaks midway fails the call
+    chunks = await awith_retry(lambda: openai.ChatCompletion.acreate(
+        stream=True, **request, request_timeout=Config.LLM_REQUEST_TIMEOUT
+    ), provider='openai')
+    async for chunk in chunks:
+        delta = chunk.choices[0].delta.get('content')
+        if delta:
+            yield delta
+
+
+async def _astream_gemini(model: genai.GenerativeModel, prompt: str, temperature: float,
+                          max_output_tokens: int) -> AsyncIterator[str]:
+    """Stream a Gemini response's text as it is generated"""
+    generation_config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_output_tokens)
+    await gemini_limiter.aacquire(estimate_tokens(prompt, max_output_tokens))
+    response = await awith_retry(lambda: model.generate_content_async(
+        prompt, generation_config=generation_config, stream=True
+    ), provider='gemini')
+    async for chunk in response:
+        # Trailing chunks may carry only finish metadata
+        if chunk.candidates and chunk.parts:
+            yield chunk.text
+
+
+def _completion_text(response, request: Dict, agent_type: str) -> str:
+    """Text of a chat completion, logging how much of its max_tokens budget it used"""
+    # Logged per agent so the caps can be tuned to observed output lengths
+    usage = response.get('usage')
+    if usage:
+        logger.info(f"{agent_type} used {usage['completion_tokens']}/{request['max_tokens']} completion tokens "
+                    f"({usage['prompt_tokens']} prompt)")
+    return response.choices[0].message.content
+
+
+def _complete_openai(request: Dict, agent_type: str) -> str:
+    """Run a chat completion with retries, paced under the account's per-minute limits"""
+    openai_limiter.acquire(_request_tokens(request))
+    response = with_retry(lambda: openai.ChatCompletion.create(
+        **request, request_timeout=Config.LLM_REQUEST_TIMEOUT
+    ))
+    return _completion_text(response, request, agent_type)
+
+
+async def _acomplete_openai(request: Dict, agent_type: str) -> str:
+    """Async variant of _complete_openai, without blocking the event loop"""
+    use_shared_aiosession()
+    await openai_limiter.aacquire(_request_tokens(request))
+    response = await awith_retry(lambda: openai.ChatCompletion.acreate(
+        **request, request_timeout=Config.LLM_REQUEST_TIMEOUT
+    ), provider='openai')
+    return _completion_text(response, request, agent_type)
+
+
+def _generate_gemini(model: genai.GenerativeModel, prompt: str, temperature: float, max_output_tokens: int) -> str:
+    """Run a Gemini generation with retries, paced under the account's per-minute limits"""
+    generation_config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_output_tokens)
+    gemini_limiter.acquire(estimate_tokens(prompt, max_output_tokens))
+    # The Gemini SDK has no per-request timeout, so bound the call from outside
+    response = with_retry(lambda: call_with_timeout(
+        lambda: model.generate_content(prompt, generation_config=generation_config)
+    ))
+    return response.text
+
+
+async def _agenerate_gemini(model: genai.GenerativeModel, prompt: str, temperature: float,
+                            max_output_tokens: int) -> str:
+    """Async variant of _generate_gemini, without blocking the event loop"""
+    generation_config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_output_tokens)
+    await gemini_limiter.aacquire(estimate_tokens(prompt, max_output_tokens))
+    response = await awith_retry(
+        lambda: model.generate_content_async(prompt, generation_config=generation_config), provider='gemini'
+    )
+    return response.text
+
+
+# System prompts (and their messages) are plain constants so every call sends a byte-identical
+# prefix and only the user message is built per request
+_MARKET_RESEARCH_SYSTEM_PROMPT = """You are a senior market research analyst with 15+ years experience in identifying market opportunities and gaps. You specialize in analyzing emerging technologies, market trends, and unmet needs across industries.
 
 Your expertise includes:
 - Market gap analysis and opportunity identification
@@ -38,10 +125,10 @@ For AI market research systems, focus on:
 - Real-time market monitoring systems
 - Competitive intelligence platforms
 - Market prediction and forecasting models"""
+_MARKET_RESEARCH_SYSTEM_MESSAGE = {"role": "system", "content": _MARKET_RESEARCH_SYSTEM_PROMPT}
 
-        user_prompt = f"""Analyze this AI market research system project and provide detailed market opportunity assessment:
-
-{project_description}
+# Prompt templates, parsed once; request-specific fields sit at the end
+_MARKET_RESEARCH_USER_TEMPLATE = string.Template("""Analyze the AI market research system project given below and provide a detailed market opportunity assessment.
 
 Provide comprehensive analysis including:
 1. Market Gap Analysis: Identify specific unmet needs in market research
@@ -50,38 +137,62 @@ Provide comprehensive analysis including:
 4. Industry Applications: Identify high-value industries and use cases
 5. Technology Trends: Relevant AI/ML trends supporting this opportunity
 6. Implementation Challenges: Technical and market barriers to entry
-7. Success Metrics: KPIs for measuring market impact and adoption"""
+7. Success Metrics: KPIs for measuring market impact and adoption
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=3000
-            )
-            return {
-                "analysis": response.choices[0].message.content,
-                "agent_type": "market_research",
-                "confidence": 0.85
-            }
-        except Exception as e:
-            return {"error": f"Market Research Agent error: {str(e)}"}
+PROJECT: $project_description""")
 
-class TechnicalArchitectAgent:
-    """Specialized agent for technical architecture and system design"""
+class MarketResearchAgent:
+    """Specialized agent for market research and opportunity identification"""
     
     def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
+        configure_openai()
         self.model = Config.GPT_MODEL
-        self.temperature = 0.2
+        self.temperature = 0.3
     
-    def design_system_architecture(self, project_description: str, market_analysis: str) -> Dict:
-        """Design comprehensive technical architecture"""
+    def build_request(self, project_description: str) -> Dict:
+        """Chat completion parameters for analyze_market_opportunity"""
         
-        system_prompt = """You are a senior software architect and AI systems engineer with expertise in designing scalable, multi-agent AI systems. You specialize in:
+        user_prompt = _MARKET_RESEARCH_USER_TEMPLATE.substitute(project_description=project_description)
+
+        return {
+            "model": self.model,
+            "messages": [
+                _MARKET_RESEARCH_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 3000
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "analysis": content,
+            "agent_type": "market_research",
+            "confidence": 0.85
+        }
+    
+    def astream(self, *args) -> AsyncIterator[str]:
+        """Stream the response to build_request(*args) as it is generated; make_result packages the joined text"""
+        return _astream_openai(self.build_request(*args))
+    
+    def analyze_market_opportunity(self, project_description: str) -> Dict:
+        """Analyze market opportunities and gaps"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(_complete_openai(request, "market_research"))
+        except Exception as e:
+            return {"error": f"Market Research Agent error: {str(e)}"}
+    
+    async def aanalyze_market_opportunity(self, project_description: str) -> Dict:
+        """Async variant of analyze_market_opportunity"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(await _acomplete_openai(request, "market_research"))
+        except Exception as e:
+            return {"error": f"Market Research Agent error: {str(e)}"}
+
+_TECHNICAL_ARCHITECT_SYSTEM_PROMPT = """You are a senior software architect and AI systems engineer with expertise in designing scalable, multi-agent AI systems. You specialize in:
 
 - Multi-agent system architectures and coordination
 - AI/ML pipeline design and orchestration
@@ -97,12 +208,9 @@ For AI market research systems, design architectures that include:
 - Real-time monitoring and alerting
 - Scalable cloud infrastructure
 - Security and compliance frameworks"""
+_TECHNICAL_ARCHITECT_SYSTEM_MESSAGE = {"role": "system", "content": _TECHNICAL_ARCHITECT_SYSTEM_PROMPT}
 
-        user_prompt = f"""Design a comprehensive technical architecture for this AI market research system:
-
-PROJECT: {project_description}
-
-MARKET CONTEXT: {market_analysis}
+_TECHNICAL_ARCHITECT_USER_TEMPLATE = string.Template("""Design a comprehensive technical architecture for the AI market research system given below.
 
 Provide detailed technical architecture including:
 1. Multi-Agent System Design: Define specialized agent roles and interactions
@@ -114,38 +222,67 @@ Provide detailed technical architecture including:
 7. Integration Points: APIs, webhooks, and third-party services
 8. Security & Compliance: Data protection, privacy, and regulatory compliance
 9. Performance Requirements: Latency, throughput, and reliability specs
-10. Implementation Phases: Technical milestones and delivery timeline"""
+10. Implementation Phases: Technical milestones and delivery timeline
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=4000
-            )
-            return {
-                "architecture": response.choices[0].message.content,
-                "agent_type": "technical_architect",
-                "confidence": 0.90
-            }
-        except Exception as e:
-            return {"error": f"Technical Architect Agent error: {str(e)}"}
+PROJECT: $project_description
 
-class AISpecialistAgent:
-    """Specialized agent for AI/ML model design and implementation"""
+MARKET CONTEXT: $market_analysis""")
+
+class TechnicalArchitectAgent:
+    """Specialized agent for technical architecture and system design"""
     
     def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
-        self.temperature = 0.3
+        configure_openai()
+        self.model = Config.GPT_MODEL
+        self.temperature = 0.2
     
-    def design_ai_models(self, project_description: str, architecture: str) -> Dict:
-        """Design AI/ML models and algorithms"""
+    def build_request(self, project_description: str, market_analysis: str) -> Dict:
+        """Chat completion parameters for design_system_architecture"""
         
-        prompt = f"""You are a senior AI/ML engineer and researcher with expertise in designing and implementing advanced AI systems. Your specializations include:
+        user_prompt = _TECHNICAL_ARCHITECT_USER_TEMPLATE.substitute(
+            project_description=project_description,
+            market_analysis=market_analysis
+        )
+
+        return {
+            "model": self.model,
+            "messages": [
+                _TECHNICAL_ARCHITECT_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 4000
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "architecture": content,
+            "agent_type": "technical_architect",
+            "confidence": 0.90
+        }
+    
+    def astream(self, *args) -> AsyncIterator[str]:
+        """Stream the response to build_request(*args) as it is generated; make_result packages the joined text"""
+        return _astream_openai(self.build_request(*args))
+    
+    def design_system_architecture(self, project_description: str, market_analysis: str) -> Dict:
+        """Design comprehensive technical architecture"""
+        request = self.build_request(project_description, market_analysis)
+        try:
+            return self.make_result(_complete_openai(request, "technical_architect"))
+        except Exception as e:
+            return {"error": f"Technical Architect Agent error: {str(e)}"}
+    
+    async def adesign_system_architecture(self, project_description: str, market_analysis: str) -> Dict:
+        """Async variant of design_system_architecture"""
+        request = self.build_request(project_description, market_analysis)
+        try:
+            return self.make_result(await _acomplete_openai(request, "technical_architect"))
+        except Exception as e:
+            return {"error": f"Technical Architect Agent error: {str(e)}"}
+
+_AI_SPECIALIST_TEMPLATE = string.Template("""You are a senior AI/ML engineer and researcher with expertise in designing and implementing advanced AI systems. Your specializations include:
 
 - Multi-agent reinforcement learning
 - Natural language processing and understanding
@@ -155,11 +292,7 @@ class AISpecialistAgent:
 - Automated machine learning (AutoML)
 - Model optimization and deployment
 
-For this AI market research system, design comprehensive AI/ML solutions:
-
-PROJECT: {project_description}
-
-TECHNICAL ARCHITECTURE: {architecture}
+For the AI market research system given below, design comprehensive AI/ML solutions.
 
 Provide detailed AI/ML design including:
 1. Agent Intelligence Models: Specific AI models for each specialized agent
@@ -173,36 +306,57 @@ Provide detailed AI/ML design including:
 9. Integration Approach: Model serving, API design, real-time inference
 10. Evaluation Metrics: Model performance, business impact, accuracy measures
 
-Focus on cutting-edge AI techniques and provide specific model architectures, algorithms, and implementation details."""
+Focus on cutting-edge AI techniques and provide specific model architectures, algorithms, and implementation details.
 
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=4000
-                )
-            )
-            return {
-                "ai_design": response.text,
-                "agent_type": "ai_specialist",
-                "confidence": 0.88
-            }
-        except Exception as e:
-            return {"error": f"AI Specialist Agent error: {str(e)}"}
+PROJECT: $project_description
 
-class BusinessStrategyAgent:
-    """Specialized agent for business strategy and monetization"""
+TECHNICAL ARCHITECTURE: $architecture""")
+
+class AISpecialistAgent:
+    """Specialized agent for AI/ML model design and implementation"""
     
     def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
-        self.model = Config.GPT_MODEL
-        self.temperature = 0.4
+        self.model = get_gemini_model(Config.GEMINI_MODEL)
+        self.temperature = 0.3
+        self.max_output_tokens = 4000
     
-    def develop_business_strategy(self, project_description: str, market_analysis: str, technical_design: str) -> Dict:
-        """Develop comprehensive business strategy and monetization plan"""
+    def build_request(self, project_description: str, architecture: str) -> str:
+        """Prompt for design_ai_models"""
         
-        system_prompt = """You are a senior business strategist and entrepreneur with expertise in AI/tech startups and product commercialization. Your specializations include:
+        prompt = _AI_SPECIALIST_TEMPLATE.substitute(project_description=project_description, architecture=architecture)
+
+        return prompt
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "ai_design": content,
+            "agent_type": "ai_specialist",
+            "confidence": 0.88
+        }
+    
+    def astream(self, *args) -> AsyncIterator[str]:
+        """Stream the response to build_request(*args) as it is generated; make_result packages the joined text"""
+        return _astream_gemini(self.model, self.build_request(*args), self.temperature, self.max_output_tokens)
+    
+    def design_ai_models(self, project_description: str, architecture: str) -> Dict:
+        """Design AI/ML models and algorithms"""
+        prompt = self.build_request(project_description, architecture)
+        try:
+            return self.make_result(_generate_gemini(self.model, prompt, self.temperature, self.max_output_tokens))
+        except Exception as e:
+            return {"error": f"AI Specialist Agent error: {str(e)}"}
+    
+    async def adesign_ai_models(self, project_description: str, architecture: str) -> Dict:
+        """Async variant of design_ai_models"""
+        try:
+            return self.make_result(await _agenerate_gemini(
+                self.model, self.build_request(project_description, architecture), self.temperature, self.max_output_tokens
+            ))
+        except Exception as e:
+            return {"error": f"AI Specialist Agent error: {str(e)}"}
+
+_BUSINESS_STRATEGY_SYSTEM_PROMPT = """You are a senior business strategist and entrepreneur with expertise in AI/tech startups and product commercialization. Your specializations include:
 
 - Business model design and validation
 - Go-to-market strategy and execution
@@ -219,14 +373,9 @@ For AI market research platforms, focus on:
 - Data monetization strategies
 - Platform and marketplace models
 - API and integration revenue streams"""
+_BUSINESS_STRATEGY_SYSTEM_MESSAGE = {"role": "system", "content": _BUSINESS_STRATEGY_SYSTEM_PROMPT}
 
-        user_prompt = f"""Develop a comprehensive business strategy for this AI market research system:
-
-PROJECT: {project_description}
-
-MARKET ANALYSIS: {market_analysis}
-
-TECHNICAL DESIGN: {technical_design}
+_BUSINESS_STRATEGY_USER_TEMPLATE = string.Template("""Develop a comprehensive business strategy for the AI market research system given below.
 
 Provide detailed business strategy including:
 1. Business Model: Revenue streams, pricing strategy, value proposition
@@ -238,38 +387,70 @@ Provide detailed business strategy including:
 7. Risk Analysis: Business risks, mitigation strategies, contingency plans
 8. Growth Strategy: Scaling plan, market expansion, product evolution
 9. Success Metrics: KPIs, milestones, performance indicators
-10. Implementation Roadmap: Business milestones, launch strategy, timeline"""
+10. Implementation Roadmap: Business milestones, launch strategy, timeline
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=3500
-            )
-            return {
-                "strategy": response.choices[0].message.content,
-                "agent_type": "business_strategy",
-                "confidence": 0.87
-            }
-        except Exception as e:
-            return {"error": f"Business Strategy Agent error: {str(e)}"}
+PROJECT: $project_description
 
-class ImplementationAgent:
-    """Specialized agent for implementation planning and project management"""
+MARKET ANALYSIS: $market_analysis
+
+TECHNICAL DESIGN: $technical_design""")
+
+class BusinessStrategyAgent:
+    """Specialized agent for business strategy and monetization"""
     
     def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
-        self.temperature = 0.2
+        configure_openai()
+        self.model = Config.GPT_MODEL
+        self.temperature = 0.4
     
-    def create_implementation_plan(self, all_analyses: Dict) -> Dict:
-        """Create detailed implementation plan integrating all agent analyses"""
+    def build_request(self, project_description: str, market_analysis: str, technical_design: str) -> Dict:
+        """Chat completion parameters for develop_business_strategy"""
         
-        prompt = f"""You are a senior project manager and implementation specialist with expertise in complex AI system development and deployment. Your specializations include:
+        user_prompt = _BUSINESS_STRATEGY_USER_TEMPLATE.substitute(
+            project_description=project_description,
+            market_analysis=market_analysis,
+            technical_design=technical_design
+        )
+
+        return {
+            "model": self.model,
+            "messages": [
+                _BUSINESS_STRATEGY_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 3500
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "strategy": content,
+            "agent_type": "business_strategy",
+            "confidence": 0.87
+        }
+    
+    def astream(self, *args) -> AsyncIterator[str]:
+        """Stream the response to build_request(*args) as it is generated; make_result packages the joined text"""
+        return _astream_openai(self.build_request(*args))
+    
+    def develop_business_strategy(self, project_description: str, market_analysis: str, technical_design: str) -> Dict:
+        """Develop comprehensive business strategy and monetization plan"""
+        request = self.build_request(project_description, market_analysis, technical_design)
+        try:
+            return self.make_result(_complete_openai(request, "business_strategy"))
+        except Exception as e:
+            return {"error": f"Business Strategy Agent error: {str(e)}"}
+    
+    async def adevelop_business_strategy(self, project_description: str, market_analysis: str, technical_design: str) -> Dict:
+        """Async variant of develop_business_strategy"""
+        request = self.build_request(project_description, market_analysis, technical_design)
+        try:
+            return self.make_result(await _acomplete_openai(request, "business_strategy"))
+        except Exception as e:
+            return {"error": f"Business Strategy Agent error: {str(e)}"}
+
+_IMPLEMENTATION_TEMPLATE = string.Template("""You are a senior project manager and implementation specialist with expertise in complex AI system development and deployment. Your specializations include:
 
 - Agile and DevOps methodologies
 - AI/ML project management
@@ -280,15 +461,7 @@ class ImplementationAgent:
 - Quality assurance and testing
 - Deployment and operations
 
-Based on the comprehensive analyses from specialized agents, create a detailed implementation plan:
-
-MARKET ANALYSIS: {all_analyses.get('market_research', {}).get('analysis', '')}
-
-TECHNICAL ARCHITECTURE: {all_analyses.get('technical_architect', {}).get('architecture', '')}
-
-AI/ML DESIGN: {all_analyses.get('ai_specialist', {}).get('ai_design', '')}
-
-BUSINESS STRATEGY: {all_analyses.get('business_strategy', {}).get('strategy', '')}
+Based on the comprehensive analyses from specialized agents given below, create a detailed implementation plan.
 
 Provide comprehensive implementation plan including:
 1. Project Phases: Detailed breakdown with specific deliverables and milestones
@@ -302,38 +475,129 @@ Provide comprehensive implementation plan including:
 9. Success Metrics: Implementation KPIs, acceptance criteria, performance targets
 10. Next Steps: Immediate actions, team assembly, kickoff planning
 
-Focus on practical, actionable steps with specific timelines, costs, and deliverables."""
+Focus on practical, actionable steps with specific timelines, costs, and deliverables.
+
+MARKET ANALYSIS: $market_analysis
+
+TECHNICAL ARCHITECTURE: $architecture
 
+AI/ML DESIGN: $ai_design
+
+BUSINESS STRATEGY: $strategy""")
+
+@dataclass(slots=True, frozen=True)
+class AgentAnalyses:
+    """Upstream outputs the implementation plan builds on; an agent that failed leaves its field empty"""
+    market_analysis: str = ''
+    architecture: str = ''
+    ai_design: str = ''
+    strategy: str = ''
+    
+    @classmethod
+    def from_results(cls, results: Dict[str, Dict]) -> "AgentAnalyses":
+        """Pick the outputs out of agent results keyed by agent name"""
+        return cls(
+            market_analysis=results.get('market_research', {}).get('analysis', ''),
+            architecture=results.get('technical_architect', {}).get('architecture', ''),
+            ai_design=results.get('ai_specialist', {}).get('ai_design', ''),
+            strategy=results.get('business_strategy', {}).get('strategy', '')
+        )
+
+class ImplementationAgent:
+    """Specialized agent for implementation planning and project management"""
+    
+    def __init__(self):
+        self.model = get_gemini_model(Config.GEMINI_MODEL)
+        self.temperature = 0.2
+        self.max_output_tokens = 4000
+    
+    def build_request(self, analyses: AgentAnalyses) -> str:
+        """Prompt for create_implementation_plan"""
+        
+        prompt = _IMPLEMENTATION_TEMPLATE.substitute(
+            market_analysis=analyses.market_analysis,
+            architecture=analyses.architecture,
+            ai_design=analyses.ai_design,
+            strategy=analyses.strategy
+        )
+
+        return prompt
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "implementation_plan": content,
+            "agent_type": "implementation",
+            "confidence": 0.92
+        }
+    
+    def astream(self, *args) -> AsyncIterator[str]:
+        """Stream the response to build_request(*args) as it is generated; make_result packages the joined text"""
+        return _astream_gemini(self.model, self.build_request(*args), self.temperature, self.max_output_tokens)
+    
+    def create_implementation_plan(self, analyses: AgentAnalyses) -> Dict:
+        """Create detailed implementation plan integrating all agent analyses"""
+        prompt = self.build_request(analyses)
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=4000
-                )
-            )
-            return {
-                "implementation_plan": response.text,
-                "agent_type": "implementation",
-                "confidence": 0.92
-            }
+            return self.make_result(_generate_gemini(self.model, prompt, self.temperature, self.max_output_tokens))
         except Exception as e:
             logger.error(f"Error in implementation agent: {str(e)}")
             return {"error": f"Implementation analysis failed: {str(e)}"}
+    
+    async def acreate_implementation_plan(self, analyses: AgentAnalyses) -> Dict:
+        """Async variant of create_implementation_plan"""
+        try:
+            return self.make_result(await _agenerate_gemini(
+                self.model, self.build_request(analyses), self.temperature, self.max_output_tokens
+            ))
+        except Exception as e:
+            logger.error(f"Error in implementation agent: {str(e)}")
+            return {"error": f"Implementation analysis failed: {str(e)}"}
+
+
+# Roadmap section per IoT agent: (result field, section title), in roadmap order
+_IOT_ROADMAP_SECTIONS = {
+    'hardware_specialist': ('hardware_analysis', "🔧 Hardware Requirements & System Design"),
+    'component_researcher': ('component_analysis', "💰 Component List & Pricing"),
+    'technical_architect': ('architecture_design', "🏗️ Technical Architecture & Wiring"),
+    'implementation_planner': ('implementation_guide', "🎯 Implementation Guide & Setup"),
+}
+
+# Static parts of the IoT roadmap, around the per-agent sections
+_IOT_ROADMAP_HEADER = """# 🔧 IoT Smart System: Complete Implementation Guide
+
+## 📋 Executive Summary
+This comprehensive guide provides everything needed to build a professional IoT system with detailed component specifications, pricing, wiring diagrams, and step-by-step implementation instructions.
+
+---
+
+"""
+
+_IOT_ROADMAP_FOOTER = """## 🎉 **Project Completion Checklist**
+
+✅ **Hardware Components** - All parts specified with suppliers
+✅ **Wiring Diagrams** - Complete connection schematics
+✅ **Software Code** - Ready-to-deploy firmware
+✅ **Setup Instructions** - Step-by-step assembly guide
+✅ **Testing Procedures** - Validation and calibration
+✅ **Troubleshooting** - Common issues and solutions
+
+**Ready for immediate implementation!** 🚀"""
 
 
 class IoTHardwareCoordinator:
-    """Specialized coordinator for IoT and hardware projects"""
+    """Specialized coordinator for IoT and hardware projects, stateless so concurrent requests share it"""
+    
+    # The four agents only read the project description, so they run side by side
+    _agent_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='iot-agent')
+    # Identical agent calls in flight on other threads, shared with the first caller
+    _inflight = SingleFlight(timeout=Config.SINGLE_FLIGHT_TIMEOUT)
     
     def __init__(self):
-        self.agents = {
-            'hardware_specialist': IoTHardwareSpecialist(),
-            'component_researcher': ComponentResearchAgent(),
-            'technical_architect': IoTTechnicalArchitect(),
-            'implementation_planner': IoTImplementationAgent()
-        }
-        self.analysis_results = {}
-        self.workflow_history = []
+        self.agents = get_iot_agents()
+        # Same caches as the complex-project coordinator, under their own scopes
+        self.cache = get_prompt_cache()
+        self.semantic_cache = get_semantic_cache()
     
     def analyze_iot_project(self, project_description: str) -> Dict:
         """Analyze IoT/hardware project using specialized agents"""
@@ -341,144 +605,137 @@ class IoTHardwareCoordinator:
         
         try:
             logger.info("Starting IoT/hardware project analysis")
-            
-            # Hardware Specialist Analysis
-            logger.info("Running hardware specialist analysis")
-            hardware_result = self.agents['hardware_specialist'].analyze_hardware_requirements(project_description)
-            self.analysis_results['hardware_specialist'] = hardware_result
-            
-            # Component Research
-            logger.info("Running component research analysis")
-            component_result = self.agents['component_researcher'].research_components(project_description)
-            self.analysis_results['component_researcher'] = component_result
-            
-            # Technical Architecture
-            logger.info("Running technical architecture analysis")
-            tech_result = self.agents['technical_architect'].design_architecture(project_description)
-            self.analysis_results['technical_architect'] = tech_result
-            
-            # Implementation Planning
-            logger.info("Running implementation planning analysis")
-            impl_result = self.agents['implementation_planner'].create_implementation_plan(project_description)
-            self.analysis_results['implementation_planner'] = impl_result
-            
-            # Generate comprehensive roadmap
-            final_roadmap = self._synthesize_iot_roadmap()
-            
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
-            
-            logger.info("IoT/hardware project analysis completed successfully")
-            
-            return {
-                'roadmap': final_roadmap,
-                'metadata': {
-                    'processing_type': 'iot_hardware_specialist',
-                    'agents_used': list(self.agents.keys()),
-                    'processing_time': processing_time,
-                    'timestamp': datetime.now().isoformat(),
-                    'confidence_scores': self._get_iot_confidence_scores()
-                },
-                'agent_analyses': self.analysis_results,
-                'workflow_history': self.workflow_history
+            futures = {
+                'hardware_specialist': self._agent_pool.submit(
+                    self._call_agent, 'hardware_specialist', project_description,
+                    self.agents['hardware_specialist'].analyze_hardware_requirements),
+                'component_researcher': self._agent_pool.submit(
+                    self._call_agent, 'component_researcher', project_description,
+                    self.agents['component_researcher'].research_components),
+                'technical_architect': self._agent_pool.submit(
+                    self._call_agent, 'technical_architect', project_description,
+                    self.agents['technical_architect'].design_architecture),
+                'implementation_planner': self._agent_pool.submit(
+                    self._call_agent, 'implementation_planner', project_description,
+                    self.agents['implementation_planner'].create_implementation_plan)
             }
+            results = {name: future.result() for name, future in futures.items()}
+            return self._build_result(results, start_time)
             
         except Exception as e:
             logger.error(f"Error in IoT/hardware analysis: {str(e)}")
             raise Exception(f"IoT/hardware analysis failed: {str(e)}")
     
-    def _synthesize_iot_roadmap(self) -> str:
-        """Synthesize all IoT agent analyses into a comprehensive roadmap"""
-        
-        roadmap_sections = []
-        
-        # Executive Summary with enhanced formatting
-        roadmap_sections.append("# 🔧 IoT Smart System: Complete Implementation Guide")
-        roadmap_sections.append("")
-        roadmap_sections.append("## 📋 Executive Summary")
-        roadmap_sections.append("This comprehensive guide provides everything needed to build a professional IoT system with detailed component specifications, pricing, wiring diagrams, and step-by-step implementation instructions.")
-        roadmap_sections.append("")
-        roadmap_sections.append("---")
-        roadmap_sections.append("")
+    async def aanalyze_iot_project(self, project_description: str) -> Dict:
+        """Async variant of analyze_iot_project, awaiting the four agents concurrently"""
+        start_time = datetime.now()
         
-        # Hardware Requirements & Components
-        if 'hardware_specialist' in self.analysis_results:
-            hardware_data = self.analysis_results['hardware_specialist']
-            if 'hardware_analysis' in hardware_data:
-                roadmap_sections.append("## 🔧 Hardware Requirements & System Design")
-                roadmap_sections.append("")
-                roadmap_sections.append(hardware_data['hardware_analysis'])
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        try:
+            logger.info("Starting IoT/hardware project analysis")
+            hardware_result, component_result, tech_result, impl_result = await asyncio.gather(
+                self._acall_agent('hardware_specialist', project_description,
+                                  self.agents['hardware_specialist'].aanalyze_hardware_requirements),
+                self._acall_agent('component_researcher', project_description,
+                                  self.agents['component_researcher'].aresearch_components),
+                self._acall_agent('technical_architect', project_description,
+                                  self.agents['technical_architect'].adesign_architecture),
+                self._acall_agent('implementation_planner', project_description,
+                                  self.agents['implementation_planner'].acreate_implementation_plan)
+            )
+            results = {
+                'hardware_specialist': hardware_result,
+                'component_researcher': component_result,
+                'technical_architect': tech_result,
+                'implementation_planner': impl_result
+            }
+            return self._build_result(results, start_time)
+            
+        except Exception as e:
+            logger.error(f"Error in IoT/hardware analysis: {str(e)}")
+            raise Exception(f"IoT/hardware analysis failed: {str(e)}")
+    
+    def _call_agent(self, agent_name: str, project_description: str, method: Callable[[str], Dict]) -> Dict:
+        """Run one agent, serving a stored result for the same project or a close rephrasing"""
+        key = PromptCache.make_key(f"iot:{agent_name}", 0.0, "", project_description)
+        cached = self._cached_result(agent_name, key, project_description)
+        if cached is not None:
+            return cached
         
-        # Component Research & Pricing
-        if 'component_researcher' in self.analysis_results:
-            component_data = self.analysis_results['component_researcher']
-            if 'component_analysis' in component_data:
-                roadmap_sections.append("## 💰 Component List & Pricing")
-                roadmap_sections.append("")
-                roadmap_sections.append(component_data['component_analysis'])
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        def run() -> Dict:
+            result = method(project_description)
+            self._store_result(agent_name, key, project_description, result)
+            return result
         
-        # Technical Architecture
-        if 'technical_architect' in self.analysis_results:
-            tech_data = self.analysis_results['technical_architect']
-            if 'architecture_design' in tech_data:
-                roadmap_sections.append("## 🏗️ Technical Architecture & Wiring")
-                roadmap_sections.append("")
-                roadmap_sections.append(tech_data['architecture_design'])
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        # A concurrent request for the same project waits for this call instead of repeating it
+        return self._inflight.do(key.encode(), run)
+    
+    async def _acall_agent(self, agent_name: str, project_description: str,
+                           method: Callable[[str], Awaitable[Dict]]) -> Dict:
+        """Async variant of _call_agent"""
+        key = PromptCache.make_key(f"iot:{agent_name}", 0.0, "", project_description)
+        # Cache lookups may embed the input, keep them off the event loop
+        cached = await asyncio.to_thread(self._cached_result, agent_name, key, project_description)
+        if cached is not None:
+            return cached
         
-        # Implementation Plan
-        if 'implementation_planner' in self.analysis_results:
-            impl_data = self.analysis_results['implementation_planner']
-            if 'implementation_guide' in impl_data:
-                roadmap_sections.append("## 🎯 Implementation Guide & Setup")
-                roadmap_sections.append("")
-                roadmap_sections.append(impl_data['implementation_guide'])
-                roadmap_sections.append("")
-                roadmap_sections.append("---")
-                roadmap_sections.append("")
+        result = await method(project_description)
+        await asyncio.to_thread(self._store_result, agent_name, key, project_description, result)
+        return result
+    
+    def _cached_result(self, agent_name: str, key: str, project_description: str) -> Optional[Dict]:
+        """Stored result for the same project, or for a close rephrasing of it"""
+        cached = self.cache.get(key)
+        if cached is None and self.semantic_cache.enabled:
+            cached = self.semantic_cache.lookup(f"iot:{agent_name}", project_description)
+        return orjson.loads(cached) if cached is not None else None
+    
+    def _store_result(self, agent_name: str, key: str, project_description: str, result: Dict):
+        """Cache an agent's result under both lookups"""
+        # Failures are reported inside the result, only keep successful analyses
+        if 'error' in result:
+            return
+        payload = orjson.dumps(result, default=str).decode()
+        self.cache.set(key, payload)
+        if self.semantic_cache.enabled:
+            self.semantic_cache.add(f"iot:{agent_name}", project_description, payload)
+    
+    def _build_result(self, results: Dict[str, Dict], start_time: datetime) -> Dict:
+        """Synthesize the roadmap from the agents' results and package it with the run's metadata"""
+        final_roadmap = self._synthesize_iot_roadmap(results)
+        processing_time = (datetime.now() - start_time).total_seconds()
         
-        # Project Summary
-        roadmap_sections.append("## 🎉 **Project Completion Checklist**")
-        roadmap_sections.append("")
-        roadmap_sections.append("✅ **Hardware Components** - All parts specified with suppliers")
-        roadmap_sections.append("✅ **Wiring Diagrams** - Complete connection schematics")
-        roadmap_sections.append("✅ **Software Code** - Ready-to-deploy firmware")
-        roadmap_sections.append("✅ **Setup Instructions** - Step-by-step assembly guide")
-        roadmap_sections.append("✅ **Testing Procedures** - Validation and calibration")
-        roadmap_sections.append("✅ **Troubleshooting** - Common issues and solutions")
-        roadmap_sections.append("")
-        roadmap_sections.append("**Ready for immediate implementation!** 🚀")
+        logger.info("IoT/hardware project analysis completed successfully")
         
-        return "\n".join(roadmap_sections)
+        return {
+            'roadmap': final_roadmap,
+            'metadata': {
+                'processing_type': 'iot_hardware_specialist',
+                'agents_used': list(self.agents.keys()),
+                'processing_time': processing_time,
+                'timestamp': datetime.now().isoformat(),
+                'confidence_scores': self._get_iot_confidence_scores(results),
+                # A failed agent's section is left out; such results must not be cached
+                'degraded': any('error' in result for result in results.values())
+            },
+            'agent_analyses': results,
+            'workflow_history': []
+        }
     
-    def _get_iot_confidence_scores(self) -> Dict:
-        """Get confidence scores from IoT agents"""
-        scores = {}
-        for agent_name, result in self.analysis_results.items():
-            scores[agent_name] = result.get('confidence', 0.0)
-        return scores
+    def _synthesize_iot_roadmap(self, results: Dict[str, Dict]) -> str:
+        """Synthesize all IoT agent analyses into a comprehensive roadmap"""
+        sections = "".join(
+            f"## {title}\n\n{results[agent_name][field]}\n\n---\n\n"
+            for agent_name, (field, title) in _IOT_ROADMAP_SECTIONS.items()
+            if field in results.get(agent_name, {})
+        )
+        return _IOT_ROADMAP_HEADER + sections + _IOT_ROADMAP_FOOTER
+    
+    def _get_iot_confidence_scores(self, results: Dict[str, Dict]) -> Dict:
+        """Get confidence scores from IoT agents (0.0 for an agent that failed)"""
+        return {agent_name: result.get('confidence', 0.0) for agent_name, result in results.items()}
 
 
-class IoTHardwareSpecialist:
-    """Specialized agent for IoT hardware analysis and requirements"""
-    
-    def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
-        self.model = Config.GPT_MODEL
-        self.temperature = 0.2
-    
-    def analyze_hardware_requirements(self, project_description: str) -> Dict:
-        """Analyze hardware requirements for IoT project"""
-        
-        system_prompt = """You are a senior IoT hardware engineer with 10+ years experience in embedded systems, sensor integration, and IoT device design. You specialize in:
+_HARDWARE_SPECIALIST_SYSTEM_PROMPT = """You are a senior IoT hardware engineer with 10+ years experience in embedded systems, sensor integration, and IoT device design. You specialize in:
 
 - Microcontroller selection (ESP32, Arduino, Raspberry Pi)
 - Sensor integration and interfacing
@@ -493,10 +750,9 @@ For IoT projects, focus on:
 - Sensor accuracy and reliability requirements
 - Communication protocol selection
 - Scalability and modularity considerations"""
+_HARDWARE_SPECIALIST_SYSTEM_MESSAGE = {"role": "system", "content": _HARDWARE_SPECIALIST_SYSTEM_PROMPT}
 
-        user_prompt = f"""Analyze this IoT project and provide detailed hardware requirements:
-
-{project_description}
+_HARDWARE_SPECIALIST_USER_TEMPLATE = string.Template("""Analyze the IoT project given below and provide detailed hardware requirements.
 
 Provide comprehensive hardware analysis including:
 1. System Overview: High-level architecture and design principles
@@ -506,41 +762,61 @@ Provide comprehensive hardware analysis including:
 5. Communication: WiFi, Bluetooth, or other protocols needed
 6. Environmental Considerations: Enclosure, waterproofing, temperature ranges
 7. Scalability: Options for future expansion and upgrades
-8. Performance Targets: Response times, accuracy, and reliability goals"""
+8. Performance Targets: Response times, accuracy, and reliability goals
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=3000
-            )
-            
-            return {
-                "hardware_analysis": response.choices[0].message.content,
-                "agent_type": "hardware_specialist",
-                "confidence": 0.95
-            }
-        except Exception as e:
-            logger.error(f"Error in hardware specialist: {str(e)}")
-            return {"error": f"Hardware analysis failed: {str(e)}"}
+PROJECT: $project_description""")
 
-
-class ComponentResearchAgent:
-    """Specialized agent for component research and pricing"""
+class IoTHardwareSpecialist:
+    """Specialized agent for IoT hardware analysis and requirements"""
     
     def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
+        configure_openai()
         self.model = Config.GPT_MODEL
-        self.temperature = 0.1
+        self.temperature = 0.2
     
-    def research_components(self, project_description: str) -> Dict:
-        """Research components and pricing for IoT project"""
+    def build_request(self, project_description: str) -> Dict:
+        """Chat completion parameters for analyze_hardware_requirements"""
         
-        system_prompt = """You are an electronics procurement specialist with extensive knowledge of electronic components, suppliers, and current market pricing. You have access to:
+        user_prompt = _HARDWARE_SPECIALIST_USER_TEMPLATE.substitute(project_description=project_description)
+
+        return {
+            "model": self.model,
+            "messages": [
+                _HARDWARE_SPECIALIST_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 3000
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "hardware_analysis": content,
+            "agent_type": "hardware_specialist",
+            "confidence": 0.95
+        }
+    
+    def analyze_hardware_requirements(self, project_description: str) -> Dict:
+        """Analyze hardware requirements for IoT project"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(_complete_openai(request, "hardware_specialist"))
+        except Exception as e:
+            logger.error(f"Error in hardware specialist: {str(e)}")
+            return {"error": f"Hardware analysis failed: {str(e)}"}
+    
+    async def aanalyze_hardware_requirements(self, project_description: str) -> Dict:
+        """Async variant of analyze_hardware_requirements"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(await _acomplete_openai(request, "hardware_specialist"))
+        except Exception as e:
+            logger.error(f"Error in hardware specialist: {str(e)}")
+            return {"error": f"Hardware analysis failed: {str(e)}"}
+
+
+_COMPONENT_RESEARCH_SYSTEM_PROMPT = """You are an electronics procurement specialist with extensive knowledge of electronic components, suppliers, and current market pricing. You have access to:
 
 - Current component pricing from major suppliers (Amazon, AliExpress, Mouser, Digi-Key)
 - Component specifications and compatibility
@@ -555,10 +831,9 @@ Your expertise includes:
 - Power supplies and battery management
 - Displays and user interfaces
 - Enclosures and mounting hardware"""
+_COMPONENT_RESEARCH_SYSTEM_MESSAGE = {"role": "system", "content": _COMPONENT_RESEARCH_SYSTEM_PROMPT}
 
-        user_prompt = f"""Research components and pricing for this IoT project:
-
-{project_description}
+_COMPONENT_RESEARCH_USER_TEMPLATE = string.Template("""Research components and pricing for the IoT project given below.
 
 Provide detailed component analysis including:
 1. Complete Component List: All parts needed with specifications
@@ -570,41 +845,61 @@ Provide detailed component analysis including:
 7. Total Cost Analysis: Budget and premium build costs
 8. Procurement Timeline: Availability and shipping considerations
 
-Format pricing in clear tables with supplier links where possible."""
+Format pricing in clear tables with supplier links where possible.
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=3500
-            )
-            
-            return {
-                "component_analysis": response.choices[0].message.content,
-                "agent_type": "component_researcher",
-                "confidence": 0.92
-            }
-        except Exception as e:
-            logger.error(f"Error in component researcher: {str(e)}")
-            return {"error": f"Component research failed: {str(e)}"}
+PROJECT: $project_description""")
 
-
-class IoTTechnicalArchitect:
-    """Specialized agent for IoT technical architecture and design"""
+class ComponentResearchAgent:
+    """Specialized agent for component research and pricing"""
     
     def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
+        configure_openai()
         self.model = Config.GPT_MODEL
-        self.temperature = 0.3
+        self.temperature = 0.1
     
-    def design_architecture(self, project_description: str) -> Dict:
-        """Design technical architecture for IoT project"""
+    def build_request(self, project_description: str) -> Dict:
+        """Chat completion parameters for research_components"""
         
-        system_prompt = """You are a senior IoT systems architect with expertise in embedded systems design, cloud integration, and scalable IoT architectures. Your specializations include:
+        user_prompt = _COMPONENT_RESEARCH_USER_TEMPLATE.substitute(project_description=project_description)
+
+        return {
+            "model": self.model,
+            "messages": [
+                _COMPONENT_RESEARCH_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 3500
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "component_analysis": content,
+            "agent_type": "component_researcher",
+            "confidence": 0.92
+        }
+    
+    def research_components(self, project_description: str) -> Dict:
+        """Research components and pricing for IoT project"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(_complete_openai(request, "component_researcher"))
+        except Exception as e:
+            logger.error(f"Error in component researcher: {str(e)}")
+            return {"error": f"Component research failed: {str(e)}"}
+    
+    async def aresearch_components(self, project_description: str) -> Dict:
+        """Async variant of research_components"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(await _acomplete_openai(request, "component_researcher"))
+        except Exception as e:
+            logger.error(f"Error in component researcher: {str(e)}")
+            return {"error": f"Component research failed: {str(e)}"}
+
+
+_IOT_ARCHITECT_SYSTEM_PROMPT = """You are a senior IoT systems architect with expertise in embedded systems design, cloud integration, and scalable IoT architectures. Your specializations include:
 
 - Embedded firmware development (C++, Arduino IDE, PlatformIO)
 - Cloud platforms (AWS IoT, Google Cloud IoT, Azure IoT)
@@ -619,10 +914,9 @@ For IoT projects, focus on:
 - Real-time monitoring and control capabilities
 - Cloud integration and data analytics
 - Mobile app connectivity and user experience"""
+_IOT_ARCHITECT_SYSTEM_MESSAGE = {"role": "system", "content": _IOT_ARCHITECT_SYSTEM_PROMPT}
 
-        user_prompt = f"""Design the technical architecture for this IoT project:
-
-{project_description}
+_IOT_ARCHITECT_USER_TEMPLATE = string.Template("""Design the technical architecture for the IoT project given below.
 
 Provide comprehensive architecture design including:
 1. System Architecture: Overall system design and data flow
@@ -634,41 +928,61 @@ Provide comprehensive architecture design including:
 7. User Interface Design: Mobile app and web dashboard features
 8. Development Environment: Tools, libraries, and setup instructions
 9. Testing Strategy: Unit tests, integration tests, and validation
-10. Deployment Guide: Step-by-step implementation instructions"""
-
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=4000
-            )
-            
-            return {
-                "architecture_design": response.choices[0].message.content,
-                "agent_type": "technical_architect",
-                "confidence": 0.94
-            }
-        except Exception as e:
-            logger.error(f"Error in technical architect: {str(e)}")
-            return {"error": f"Architecture design failed: {str(e)}"}
+10. Deployment Guide: Step-by-step implementation instructions
 
+PROJECT: $project_description""")
 
-class IoTImplementationAgent:
-    """Specialized agent for IoT implementation planning and execution"""
+class IoTTechnicalArchitect:
+    """Specialized agent for IoT technical architecture and design"""
     
     def __init__(self):
-        openai.api_key = Config.OPENAI_API_KEY
+        configure_openai()
         self.model = Config.GPT_MODEL
-        self.temperature = 0.2
+        self.temperature = 0.3
     
-    def create_implementation_plan(self, project_description: str) -> Dict:
-        """Create detailed implementation plan for IoT project"""
+    def build_request(self, project_description: str) -> Dict:
+        """Chat completion parameters for design_architecture"""
         
-        system_prompt = """You are a senior IoT project manager and implementation specialist with extensive experience in delivering IoT solutions from concept to production. Your expertise includes:
+        user_prompt = _IOT_ARCHITECT_USER_TEMPLATE.substitute(project_description=project_description)
+
+        return {
+            "model": self.model,
+            "messages": [
+                _IOT_ARCHITECT_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 4000
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "architecture_design": content,
+            "agent_type": "technical_architect",
+            "confidence": 0.94
+        }
+    
+    def design_architecture(self, project_description: str) -> Dict:
+        """Design technical architecture for IoT project"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(_complete_openai(request, "technical_architect"))
+        except Exception as e:
+            logger.error(f"Error in technical architect: {str(e)}")
+            return {"error": f"Architecture design failed: {str(e)}"}
+    
+    async def adesign_architecture(self, project_description: str) -> Dict:
+        """Async variant of design_architecture"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(await _acomplete_openai(request, "technical_architect"))
+        except Exception as e:
+            logger.error(f"Error in technical architect: {str(e)}")
+            return {"error": f"Architecture design failed: {str(e)}"}
+
+
+_IOT_IMPLEMENTATION_SYSTEM_PROMPT = """You are a senior IoT project manager and implementation specialist with extensive experience in delivering IoT solutions from concept to production. Your expertise includes:
 
 - Project planning and timeline management
 - Hardware assembly and testing procedures
@@ -683,10 +997,9 @@ For IoT projects, focus on:
 - Quality assurance and testing procedures
 - Documentation and knowledge transfer
 - Long-term maintenance and support strategies"""
+_IOT_IMPLEMENTATION_SYSTEM_MESSAGE = {"role": "system", "content": _IOT_IMPLEMENTATION_SYSTEM_PROMPT}
 
-        user_prompt = f"""Create a detailed implementation plan for this IoT project:
-
-{project_description}
+_IOT_IMPLEMENTATION_USER_TEMPLATE = string.Template("""Create a detailed implementation plan for the IoT project given below.
 
 Provide comprehensive implementation guidance including:
 1. Project Timeline: Phases, milestones, and duration estimates
@@ -700,26 +1013,78 @@ Provide comprehensive implementation guidance including:
 9. Support Resources: Help resources and community support
 10. Next Steps: Deployment, monitoring, and future enhancements
 
-Focus on practical, actionable instructions that a technical user can follow."""
+Focus on practical, actionable instructions that a technical user can follow.
+
+PROJECT: $project_description""")
 
+class IoTImplementationAgent:
+    """Specialized agent for IoT implementation planning and execution"""
+    
+    def __init__(self):
+        configure_openai()
+        self.model = Config.GPT_MODEL
+        self.temperature = 0.2
+    
+    def build_request(self, project_description: str) -> Dict:
+        """Chat completion parameters for create_implementation_plan"""
+        
+        user_prompt = _IOT_IMPLEMENTATION_USER_TEMPLATE.substitute(project_description=project_description)
+
+        return {
+            "model": self.model,
+            "messages": [
+                _IOT_IMPLEMENTATION_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": 4000
+        }
+    
+    def make_result(self, content: str) -> Dict:
+        """Package the model's response as this agent's result"""
+        return {
+            "implementation_guide": content,
+            "agent_type": "implementation_planner",
+            "confidence": 0.93
+        }
+    
+    def create_implementation_plan(self, project_description: str) -> Dict:
+        """Create detailed implementation plan for IoT project"""
+        request = self.build_request(project_description)
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=4000
-            )
-            
-            return {
-                "implementation_guide": response.choices[0].message.content,
-                "agent_type": "implementation_planner",
-                "confidence": 0.93
-            }
+            return self.make_result(_complete_openai(request, "implementation_planner"))
         except Exception as e:
             logger.error(f"Error in implementation planner: {str(e)}")
             return {"error": f"Implementation planning failed: {str(e)}"}
+    
+    async def acreate_implementation_plan(self, project_description: str) -> Dict:
+        """Async variant of create_implementation_plan"""
+        request = self.build_request(project_description)
+        try:
+            return self.make_result(await _acomplete_openai(request, "implementation_planner"))
         except Exception as e:
-            return {"error": f"Implementation Agent error: {str(e)}"}
+            logger.error(f"Error in implementation planner: {str(e)}")
+            return {"error": f"Implementation planning failed: {str(e)}"}
+
+
+@lru_cache(maxsize=1)
+def get_complex_agents() -> Dict:
+    """Process-wide agents for complex AI projects by role; they hold no per-request state"""
+    return {
+        'market_research': MarketResearchAgent(),
+        'technical_architect': TechnicalArchitectAgent(),
+        'ai_specialist': AISpecialistAgent(),
+        'business_strategy': BusinessStrategyAgent(),
+        'implementation': ImplementationAgent()
+    }
+
+
+@lru_cache(maxsize=1)
+def get_iot_agents() -> Dict:
+    """Process-wide agents for IoT/hardware projects by role"""
+    return {
+        'hardware_specialist': IoTHardwareSpecialist(),
+        'component_researcher': ComponentResearchAgent(),
+        'technical_architect': IoTTechnicalArchitect(),
+        'implementation_planner': IoTImplementationAgent()
+    }
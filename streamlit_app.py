@@ -3,7 +3,11 @@ Streamlit web interface for the Multi-Agent Project Refiner AI System
 """
 import streamlit as st
 import os
+import time
 from datetime import datetime
+from typing import Dict, Iterator
+from llm_cache import get_prompt_cache
+from llm_clients import warm_openai_connection
 from multi_agent_orchestrator import ProjectRefinerAPI
 
 # Page configuration
@@ -14,7 +18,49 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_api() -> ProjectRefinerAPI:
+    """One API, and so one set of agents and caches, shared by every rerun and session"""
+    return ProjectRefinerAPI()
+
+@st.cache_resource
+def warm_connections():
+    """Pay the OpenAI connection setup once at startup rather than on the first Generate"""
+    warm_openai_connection()
+
+# Roadmap text is handed to Streamlit at most this often (seconds), so fast deltas don't re-render per token
+STREAM_FLUSH_INTERVAL = 0.05
+
+def stream_roadmap(api: ProjectRefinerAPI, project_input: str, extras: Dict) -> Iterator[str]:
+    """Roadmap text for st.write_stream as it is generated; the result's other fields are collected in extras"""
+    buffer = ""
+    last_flush = time.monotonic()
+    for key, value in api.refine_project_stream(project_input):
+        if key not in ('roadmap_delta', 'roadmap'):
+            extras[key] = value
+            continue
+        buffer += value
+        if time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+            yield buffer
+            buffer = ""
+            last_flush = time.monotonic()
+    if buffer:
+        yield buffer
+
+EXAMPLES = {
+    "Mobile App": "Build a social media mobile app with user profiles, photo sharing, messaging, and real-time notifications. Budget: $75k, Timeline: 8 months, Team: 3 developers.",
+    "Web Platform": "Create an e-learning platform with course management, video streaming, quizzes, certificates, and payment processing. Target: 10k users, Budget: $100k.",
+    "AI System": "Develop an AI-powered customer service chatbot with NLP, multi-language support, CRM integration, and analytics dashboard. Enterprise-grade security required."
+}
+
+def load_example():
+    """Put the chosen example into the project description box (runs before the rerun renders it)"""
+    choice = st.session_state.example_choice
+    if choice:
+        st.session_state.project_input = EXAMPLES[choice]
+
 def main():
+    warm_connections()
     st.title("🤖 Multi-Agent Project Refiner")
     st.markdown("### Transform your project ideas into comprehensive roadmaps using AI collaboration")
     
@@ -30,6 +76,12 @@ def main():
         **Iterations**: 3 rounds of refinement
         **API Keys**: Loaded from .env file
         """)
+        
+        # Identical calls served from the local completion cache (since the app started)
+        cache_stats = get_prompt_cache().stats()
+        col_hits, col_misses = st.columns(2)
+        col_hits.metric("LLM cache hits", cache_stats['hits'])
+        col_misses.metric("LLM cache misses", cache_stats['misses'])
     
     # Main interface
     col1, col2 = st.columns([2, 1])
@@ -52,7 +104,8 @@ Budget: $50,000
 Timeline: 6 months
 Team: 2 developers, 1 designer
 Target platforms: iOS and Android
-..."""
+...""",
+            key="project_input"
         )
         
         # Processing options
@@ -64,22 +117,20 @@ Target platforms: iOS and Android
     
     with col2:
         st.subheader("Quick Examples")
-        
-        examples = {
-            "Mobile App": "Build a social media mobile app with user profiles, photo sharing, messaging, and real-time notifications. Budget: $75k, Timeline: 8 months, Team: 3 developers.",
-            "Web Platform": "Create an e-learning platform with course management, video streaming, quizzes, certificates, and payment processing. Target: 10k users, Budget: $100k.",
-            "AI System": "Develop an AI-powered customer service chatbot with NLP, multi-language support, CRM integration, and analytics dashboard. Enterprise-grade security required."
-        }
-        
-        for title, example in examples.items():
-            if st.button(f"Load {title} Example", use_container_width=True):
-                st.session_state.example_input = example
-        
-        if 'example_input' in st.session_state:
-            project_input = st.session_state.example_input
-            del st.session_state.example_input
+        st.selectbox(
+            "Load an example",
+            list(EXAMPLES),
+            index=None,
+            placeholder="Choose an example project",
+            key="example_choice",
+            on_change=load_example
+        )
     
-    # Process button
+    results_panel(project_input, show_detailed)
+
+@st.fragment
+def results_panel(project_input: str, show_detailed: bool):
+    """Generate button and its results; a click reruns only this panel, not the whole page"""
     if st.button("🚀 Generate Refined Roadmap", type="primary", use_container_width=True):
         if not project_input.strip():
             st.error("Please provide a project description")
@@ -97,19 +148,14 @@ Target platforms: iOS and Android
         # Processing
         with st.spinner("🤖 AI agents are collaborating on your roadmap..."):
             try:
-                # Initialize API
-                api = ProjectRefinerAPI()
+                api = get_api()
                 
-                # Process project
-                if show_detailed:
-                    result = api.refine_project_detailed(project_input)
-                    roadmap = result['roadmap']
-                    metadata = result['metadata']
-                else:
-                    roadmap = api.refine_project(project_input)
-                    metadata = None
+                # Display the roadmap while the agents write it
+                st.subheader("📋 Your Refined Project Roadmap")
+                extras = {}
+                roadmap = st.write_stream(stream_roadmap(api, project_input, extras))
+                metadata = extras.get('metadata') if show_detailed else None
                 
-                # Display results
                 st.success("✅ Roadmap generated successfully!")
                 
                 # Show metadata if requested
@@ -123,10 +169,6 @@ Target platforms: iOS and Android
                         with col_m3:
                             st.metric("Processing Time", f"{metadata['processing_time']:.1f}s")
                 
-                # Display roadmap
-                st.subheader("📋 Your Refined Project Roadmap")
-                st.markdown(roadmap)
-                
                 # Download option
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"project_roadmap_{timestamp}.md"
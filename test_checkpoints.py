@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for resuming pipeline runs from stage checkpoints
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkpoints import CheckpointStore
+
+def _checkpoint_path() -> str:
+    fd, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    return path
+
+def test_resume_skips_finished_stages():
+    """A second run over the same input serves recorded stages instead of running them"""
+    path = _checkpoint_path()
+    try:
+        CheckpointStore(path).scope("project").run("initial_roadmap", lambda: "roadmap v1")
+
+        calls = []
+        resumed = CheckpointStore(path).scope("project")
+        assert resumed.run("initial_roadmap", lambda: calls.append(1) or "roadmap v2") == "roadmap v1"
+        assert calls == []
+        # Other inputs have their own checkpoints
+        assert CheckpointStore(path).scope("other project").get("initial_roadmap") is None
+    finally:
+        os.remove(path)
+
+def test_resume_after_partial_write():
+    """A line torn by a crash is ignored, and the stages recorded after resuming survive the next resume"""
+    path = _checkpoint_path()
+    try:
+        CheckpointStore(path).scope("project").put("initial_roadmap", "roadmap")
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"hash": "abc", "stage": "refiner_analysis_1", "content": "feedb')
+
+        resumed = CheckpointStore(path).scope("project")
+        assert resumed.get("initial_roadmap") == "roadmap"
+        assert resumed.run("refiner_analysis_1", lambda: "feedback") == "feedback"
+        resumed.put("strategist_refine", "refined")
+
+        again = CheckpointStore(path).scope("project")
+        assert again.get("refiner_analysis_1") == "feedback"
+        assert again.get("strategist_refine") == "refined"
+    finally:
+        os.remove(path)
+
+def test_disabled_store_records_nothing():
+    """Without a path, stages always run and nothing is kept"""
+    scope = CheckpointStore(None).scope("project")
+    assert scope.run("initial_roadmap", lambda: "roadmap") == "roadmap"
+    assert scope.get("initial_roadmap") is None
+
+if __name__ == "__main__":
+    for test in [test_resume_skips_finished_stages, test_resume_after_partial_write, test_disabled_store_records_nothing]:
+        test()
+        print(f"✅ {test.__name__}")
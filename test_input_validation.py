@@ -36,17 +36,20 @@ def test_input_scenarios():
         {
             "name": "Valid Mobile App Project",
             "input": "Build a parking space finder mobile app that helps drivers locate available parking spots in real-time using GPS and crowd-sourced data",
-            "expected_behavior": "Should generate mobile app roadmap"
+            "expected_behavior": "Should generate mobile app roadmap",
+            "expected_type": "mobile_app"
         },
         {
             "name": "Valid IoT Project", 
             "input": "Create a smart aquarium monitoring system with temperature, pH, and water level sensors using ESP32",
-            "expected_behavior": "Should generate IoT hardware roadmap"
+            "expected_behavior": "Should generate IoT hardware roadmap",
+            "expected_type": "iot_hardware"
         },
         {
             "name": "Valid Web Platform",
             "input": "Develop a web-based project management platform with team collaboration features and real-time updates",
-            "expected_behavior": "Should generate web platform roadmap"
+            "expected_behavior": "Should generate web platform roadmap",
+            "expected_type": "web_platform"
         },
         {
             "name": "Non-Project Input",
@@ -58,12 +61,27 @@ def test_input_scenarios():
     print("🧪 Testing AI Project Refiner Input Validation\n")
     print("=" * 60)
     
+    # The orchestrator has no input validation step yet; its scenarios are skipped, not passed
+    has_validation = hasattr(orchestrator, '_validate_user_input')
+    mismatches = []
+    
     for i, test_case in enumerate(test_cases, 1):
         print(f"\n{i}. {test_case['name']}")
         print(f"Input: '{test_case['input']}'")
         print(f"Expected: {test_case['expected_behavior']}")
         print("-" * 40)
         
+        if 'expected_type' in test_case:
+            detected_type = orchestrator._detect_project_type(test_case['input'])
+            print(f"{'✅' if detected_type == test_case['expected_type'] else '❌'} TYPE: {detected_type}")
+            if detected_type != test_case['expected_type']:
+                mismatches.append((test_case['name'], test_case['expected_type'], detected_type))
+        
+        if not has_validation:
+            print("⏭️  VALIDATION: Skipped - orchestrator has no _validate_user_input")
+            print()
+            continue
+        
         try:
             # Test the validation directly
             validation_result = orchestrator._validate_user_input(test_case['input'])
@@ -91,6 +109,7 @@ def test_input_scenarios():
         print()
     
     print("=" * 60)
+    assert not mismatches, f"Project type mismatches: {mismatches}"
     print("✅ Input validation testing completed!")
     print("\nTo test the full system:")
     print("1. Deploy the updated code to Vercel")
@@ -114,6 +133,7 @@ def test_project_type_detection():
     print("\n🎯 Testing Project Type Detection\n")
     print("=" * 50)
     
+    mismatches = []
     for input_text, expected_type in test_inputs:
         detected_type = orchestrator._detect_project_type(input_text)
         status = "✅" if detected_type == expected_type else "❌"
@@ -122,6 +142,10 @@ def test_project_type_detection():
         print(f"   Expected: {expected_type}")
         print(f"   Detected: {detected_type}")
         print()
+        if detected_type != expected_type:
+            mismatches.append((input_text, expected_type, detected_type))
+    
+    assert not mismatches, f"Project type mismatches: {mismatches}"
 
 if __name__ == "__main__":
     print("🚀 AI Project Refiner - Input Validation Test Suite")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the Refiner patch parsing and the section split/merge used to apply it
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_agents import get_strategist_agent, parse_patches, split_sections
+
+ROADMAP = """Intro line before any heading.
+
+## 1. Project Overview
+Build a fitness tracking app.
+
+## 2. Technical Architecture
+React Native client, FastAPI backend.
+
+### Database
+PostgreSQL.
+
+## 3. Timeline
+Six months.
+"""
+
+def test_parse_patches_structured():
+    """A JSON critique, even wrapped in prose or a code fence, yields its section patches"""
+    feedback = 'Here is my review:\n```json\n{"patches": [{"section": "Timeline", "issue": "Too short"}]}\n```'
+    assert parse_patches(feedback) == [{"section": "Timeline", "issue": "Too short"}]
+
+def test_parse_patches_malformed():
+    """Free text, broken or truncated JSON and wrong shapes fall back to the full-refinement path"""
+    for feedback in [
+        "The roadmap looks solid, but the timeline is optimistic.",
+        '{"patches": [{"section": "Timeline", "issue": "Too sh',
+        '{"patches": [{"section": "Timeline"}',
+        '} stray braces {',
+        '{"patches": "Timeline"}',
+        '["Timeline"]',
+        '{"summary": "no patches key"}',
+    ]:
+        assert parse_patches(feedback) is None, feedback
+
+def test_parse_patches_drops_partial_entries():
+    """Entries without a section, or that aren't objects, are skipped"""
+    feedback = '{"patches": [{"section": "Timeline"}, {"issue": "no section"}, {"section": ""}, "Overview"]}'
+    assert parse_patches(feedback) == [{"section": "Timeline"}]
+    assert parse_patches('{"patches": []}') == []
+
+def test_split_sections():
+    """Every heading starts a section; text before the first one is kept under an empty heading"""
+    sections = split_sections(ROADMAP)
+    assert [heading for heading, _ in sections] == [
+        '', '1. project overview', '2. technical architecture', 'database', '3. timeline'
+    ]
+    assert sections[0][1] == "Intro line before any heading.\n\n"
+    assert sections[2][1].startswith("## 2. Technical Architecture\n")
+    assert split_sections("No headings at all.") == []
+
+def test_split_round_trip():
+    """Joining the sections back gives the original roadmap unchanged"""
+    assert "".join(text for _, text in split_sections(ROADMAP)) == ROADMAP
+
+def test_plan_patches_applies_replacements():
+    """Direct replacements keep the section's heading; flagged sections are left for a rewrite"""
+    strategist = get_strategist_agent()
+    feedback = ('{"patches": ['
+                '{"section": "Timeline", "issue": "Too short", "replace_with": "Nine months."},'
+                '{"section": "Technical Architecture", "issue": "No caching", "needs_rewrite": true}'
+                ']}')
+    sections, rewrites = strategist._plan_patches(ROADMAP, feedback)
+    assert sections[4][1] == "## 3. Timeline\nNine months.\n\n"
+    assert rewrites == {2: ["No caching"]}
+
+    # The rewrite comes back as markdown; only the flagged section is replaced
+    strategist._merge_rewrites(sections, rewrites, "## 2. Technical Architecture\nAdd Redis caching.\n")
+    merged = "".join(text for _, text in sections)
+    assert "Add Redis caching." in merged
+    assert "React Native client" not in merged
+    assert "## 1. Project Overview\nBuild a fitness tracking app." in merged
+    assert "Nine months." in merged
+
+def test_plan_patches_unknown_section():
+    """A patch naming a section the roadmap doesn't have falls back to a full refinement"""
+    strategist = get_strategist_agent()
+    assert strategist._plan_patches(ROADMAP, '{"patches": [{"section": "Budget", "replace_with": "x"}]}') is None
+    assert strategist._plan_patches(ROADMAP, "Not JSON") is None
+
+if __name__ == "__main__":
+    for test in [test_parse_patches_structured, test_parse_patches_malformed, test_parse_patches_drops_partial_entries,
+                 test_split_sections, test_split_round_trip, test_plan_patches_applies_replacements,
+                 test_plan_patches_unknown_section]:
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for SingleFlight, which shares one in-flight call between callers with the same key
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from response_cache import SingleFlight
+
+def _run_concurrently(flight: SingleFlight, key: bytes, fn, callers: int = 5):
+    """Call flight.do from several threads at once, returning each caller's result or exception"""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def test_shares_result():
+    """Concurrent callers with the same key get the leader's result from a single execution"""
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)  # Long enough for the other callers to find the call in flight
+        return "roadmap"
+
+    assert _run_concurrently(flight, b"key", fn) == ["roadmap"] * 5
+    assert len(calls) == 1
+
+def test_shares_exception():
+    """A failing call raises the same exception in every caller waiting on it"""
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError("provider down")
+
+    outcomes = _run_concurrently(flight, b"key", fn)
+    assert len(calls) == 1
+    assert all(isinstance(outcome, RuntimeError) and str(outcome) == "provider down" for outcome in outcomes)
+
+def test_finished_calls_are_not_reused():
+    """Once a call finishes its key is free again, so later calls run afresh"""
+    flight = SingleFlight()
+    assert flight.do(b"key", lambda: 1) == 1
+    assert flight.do(b"key", lambda: 2) == 2
+    try:
+        flight.do(b"key", lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert flight.do(b"key", lambda: 3) == 3
+
+def test_distinct_keys_run_separately():
+    """Calls with different keys don't wait on each other"""
+    flight = SingleFlight(timeout=5)
+    assert _run_concurrently(flight, b"a", lambda: "a", callers=2) == ["a", "a"]
+    assert flight.do(b"b", lambda: "b") == "b"
+
+if __name__ == "__main__":
+    for test in [test_shares_result, test_shares_exception, test_finished_calls_are_not_reused,
+                 test_distinct_keys_run_separately]:
+        test()
+        print(f"✅ {test.__name__}")
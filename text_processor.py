@@ -1,12 +1,19 @@
 """
 Text processing utilities for handling large inputs
 """
+from itertools import islice
 from typing import List, Dict
 
+# Characters chunk_text prefers to split after
+_SENTENCE_ENDINGS = ('.', '!', '?')
+# Bullet and numbered-list starts summarize_chunks keeps as key points
+_KEY_LINE_PREFIXES = ('- ', '* ', '1.', '2.', '3.')
+
 class TextProcessor:
-    def __init__(self, chunk_size: int = 3000, overlap_size: int = 200):
+    def __init__(self, chunk_size: int = 3000, overlap_size: int = 200, chunk_threshold_tokens: int = 2000):
         self.chunk_size = chunk_size
         self.overlap_size = overlap_size
+        self.chunk_threshold_tokens = chunk_threshold_tokens
     
     def count_tokens(self, text: str) -> int:
         """Estimate tokens in text using simple word count approximation"""
@@ -29,18 +36,12 @@ class TextProcessor:
             
             # If this is not the last chunk, try to break at a sentence or paragraph
             if end < len(text):
-                # Look for sentence endings within the last 200 characters
+                # Look for the last sentence ending within the last 200 characters (up to and including text[end])
                 search_start = max(end - 200, start)
-                sentence_breaks = ['.', '!', '?', '\n\n']
-                
-                best_break = -1
-                for i in range(end, search_start, -1):
-                    if text[i] in sentence_breaks:
-                        best_break = i + 1
-                        break
+                last_break = max(text.rfind(mark, search_start + 1, end + 1) for mark in _SENTENCE_ENDINGS)
                 
-                if best_break != -1:
-                    end = best_break
+                if last_break != -1:
+                    end = last_break + 1
             
             chunk = text[start:end].strip()
             if chunk:
@@ -62,28 +63,19 @@ class TextProcessor:
         
         summary_parts = []
         for i, chunk in enumerate(chunks):
-            # Extract key points from each chunk
-            lines = chunk.split('\n')
-            key_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line and (
-                    line.startswith('- ') or 
-                    line.startswith('* ') or
-                    line.startswith('1.') or
-                    line.startswith('2.') or
-                    line.startswith('3.') or
-                    len(line) < 100  # Short lines are likely key points
-                ):
-                    key_lines.append(line)
+            # Extract key points from each chunk; short lines are likely key points too
+            stripped = (line.strip() for line in chunk.split('\n'))
+            key_lines = list(islice(
+                (line for line in stripped if line and (line.startswith(_KEY_LINE_PREFIXES) or len(line) < 100)),
+                5  # Top 5 key points
+            ))
             
             if key_lines:
-                summary_parts.append(f"Section {i+1}:\n" + '\n'.join(key_lines[:5]))  # Top 5 key points
+                summary_parts.append(f"Section {i+1}:\n" + '\n'.join(key_lines))
             else:
                 # Fallback: take first few sentences
-                sentences = chunk.split('. ')
-                summary_parts.append(f"Section {i+1}:\n" + '. '.join(sentences[:3]) + '.')
+                sentences = chunk.split('. ', 3)[:3]
+                summary_parts.append(f"Section {i+1}:\n" + '. '.join(sentences) + '.')
         
         return '\n\n'.join(summary_parts)
     
@@ -93,7 +85,7 @@ class TextProcessor:
         """
         token_count = self.count_tokens(user_input)
         
-        if token_count <= 2000:  # Small input, process directly
+        if token_count <= self.chunk_threshold_tokens:  # Small input, process directly
             return {
                 'type': 'direct',
                 'content': user_input,